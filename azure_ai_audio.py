@@ -0,0 +1,229 @@
+"""
+===============================================================================
+Program:      azure_ai_audio.py
+Description:  Audio preprocessing for azure_ai_speech.py. Decodes a WAV file
+              once through a memory-mapped read and converts it to the
+              16 kHz mono 16-bit PCM the Speech service works with, so a
+              single buffer can feed every language's recognizer. Also finds
+              the speech segments in that buffer so long silences are never
+              sent to the service.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+  - numpy
+
+Workflow:
+  1. Memory-map the WAV file and walk its RIFF chunks
+  2. View the samples in place (8/16/24/32-bit PCM or 32/64-bit float)
+  3. Mix down to mono
+  4. Resample to 16 kHz (low-pass filtered when downsampling)
+  5. Return the result as 16-bit little-endian PCM bytes
+  6. Optionally split the buffer into speech segments with an energy-based
+     voice activity detector (detect_speech_segments)
+
+Usage:
+  - Imported by azure_ai_speech.py
+
+Notes:
+  - 16 kHz mono 16-bit files are passed through without conversion
+  - Resampling works in blocks, so memory stays close to the size of the
+    input and output buffers
+  - The voice activity threshold adapts to each file's noise floor; tune the
+    vad_* settings for very noisy recordings
+
+Example:
+  pcm = load_pcm16k('audio/call.wav')
+  for start, end in detect_speech_segments(pcm):
+      segment = memoryview(pcm)[start * 2:end * 2]
+===============================================================================
+"""
+
+import mmap
+import struct
+
+import numpy as np
+
+target_sample_rate = 16000
+bytes_per_second = target_sample_rate * 2  # 16-bit mono
+resample_block = 1 << 20  # output samples per resampling block
+lowpass_taps = 63
+
+# voice activity detection
+vad_frame_ms = 30         # analysis frame length
+vad_margin_db = 10.0      # speech must be this far above the noise floor
+vad_floor_db = -50.0      # anything quieter is never speech
+vad_peak_range_db = 30.0  # anything this close to the loudest frames is speech
+vad_min_silence = 0.6     # seconds of silence that end a segment
+vad_min_speech = 0.2      # shorter bursts are treated as noise
+vad_padding = 0.25        # seconds of context kept on each side of a segment
+vad_max_segment = 30.0    # longer segments are split at their quietest frame
+
+wave_format_pcm = 0x0001
+wave_format_float = 0x0003
+wave_format_extensible = 0xFFFE
+
+
+class WavFormatError(ValueError):
+    pass
+
+
+def parse_wav(buffer):
+    # Return (format tag, channels, sample rate, bits per sample, data offset,
+    # data size) from the RIFF chunks of a WAV file
+    if len(buffer) < 12 or buffer[0:4] != b'RIFF' or buffer[8:12] != b'WAVE':
+        raise WavFormatError("not a RIFF/WAVE file")
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(buffer):
+        chunk_id = buffer[position:position + 4]
+        chunk_size = struct.unpack_from('<I', buffer, position + 4)[0]
+        body = position + 8
+        if chunk_id == b'fmt ':
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', buffer, body)
+            if format_tag == wave_format_extensible and chunk_size >= 40:
+                # the sub-format GUID starts with the real format tag
+                format_tag = struct.unpack_from('<H', buffer, body + 24)[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise WavFormatError("data chunk before fmt chunk")
+            # some writers leave the size at 0 or too large when streaming
+            data_size = min(chunk_size, len(buffer) - body) or len(buffer) - body
+            return fmt + (body, data_size)
+        position = body + chunk_size + (chunk_size & 1)  # chunks are word aligned
+
+    raise WavFormatError("no data chunk found")
+
+
+def samples_as_float(buffer, format_tag, channels, bits, offset, size):
+    # View the sample data in place and return float32 frames in [-1, 1]
+    # with shape (frames, channels)
+    width = bits // 8
+    frames = size // (width * channels)
+    count = frames * channels
+
+    if format_tag == wave_format_float and bits in (32, 64):
+        data = np.frombuffer(buffer, dtype=f'<f{width}', count=count, offset=offset).astype(np.float32)
+    elif format_tag == wave_format_pcm and bits == 8:
+        data = (np.frombuffer(buffer, dtype=np.uint8, count=count, offset=offset).astype(np.float32) - 128) / 128
+    elif format_tag == wave_format_pcm and bits == 16:
+        data = np.frombuffer(buffer, dtype='<i2', count=count, offset=offset).astype(np.float32) / 32768
+    elif format_tag == wave_format_pcm and bits == 24:
+        raw = np.frombuffer(buffer, dtype=np.uint8, count=count * 3, offset=offset).reshape(-1, 3)
+        ints = raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608
+    elif format_tag == wave_format_pcm and bits == 32:
+        data = np.frombuffer(buffer, dtype='<i4', count=count, offset=offset).astype(np.float32) / 2147483648
+    else:
+        raise WavFormatError(f"unsupported WAV encoding (format {format_tag:#06x}, {bits} bits)")
+
+    return data.reshape(frames, channels)
+
+
+def lowpass(samples, cutoff):
+    # Windowed-sinc FIR filter; cutoff is a fraction of the sample rate
+    n = np.arange(lowpass_taps) - (lowpass_taps - 1) / 2
+    taps = np.sinc(2 * cutoff * n) * np.hamming(lowpass_taps)
+    taps = (taps / taps.sum()).astype(np.float32)
+    return np.convolve(samples, taps, mode='same').astype(np.float32)
+
+
+def resample(samples, sample_rate, target_rate=target_sample_rate):
+    # Resample mono float32 samples to target_rate
+    if sample_rate == target_rate or not len(samples):
+        return samples
+    if sample_rate > target_rate:
+        # keep just under the new Nyquist frequency to avoid aliasing
+        samples = lowpass(samples, 0.45 * target_rate / sample_rate)
+        if sample_rate % target_rate == 0:
+            return samples[::sample_rate // target_rate]
+
+    ratio = sample_rate / target_rate
+    out_length = int(len(samples) / ratio)
+    out = np.empty(out_length, dtype=np.float32)
+    source = np.arange(len(samples), dtype=np.float64)
+    for start in range(0, out_length, resample_block):
+        stop = min(out_length, start + resample_block)
+        positions = np.arange(start, stop, dtype=np.float64) * ratio
+        first = int(positions[0])
+        last = min(len(samples), int(positions[-1]) + 2)
+        out[start:stop] = np.interp(positions, source[first:last], samples[first:last])
+    return out
+
+
+def float_to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+
+def load_pcm16k(path):
+    # Decode a WAV file once and return 16 kHz mono 16-bit PCM bytes
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        format_tag, channels, sample_rate, bits, offset, size = parse_wav(buffer)
+
+        if (format_tag, channels, sample_rate, bits) == (wave_format_pcm, 1, target_sample_rate, 16):
+            # already in the target format, copy the samples straight out
+            return buffer[offset:offset + size - (size & 1)]
+
+        frames = samples_as_float(buffer, format_tag, channels, bits, offset, size)
+
+    mono = frames[:, 0] if channels == 1 else frames.mean(axis=1, dtype=np.float32)
+    return float_to_pcm16(resample(mono, sample_rate))
+
+
+def detect_speech_segments(pcm, sample_rate=target_sample_rate):
+    # Return [(start sample, end sample)] for the speech in 16-bit mono PCM,
+    # leaving out silences longer than vad_min_silence
+    samples = np.frombuffer(pcm, dtype='<i2')
+    frame = sample_rate * vad_frame_ms // 1000
+    count = len(samples) // frame
+    if count == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    frames = samples[:count * frame].reshape(count, frame).astype(np.float32) / 32768
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    # the quietest frames estimate the noise floor; the cap keeps files that
+    # are almost all speech (where that estimate is speech too) from being dropped
+    noise_floor = float(np.percentile(energy, 10))
+    peak = float(np.percentile(energy, 99))
+    threshold = max(min(noise_floor + vad_margin_db, peak - vad_peak_range_db), vad_floor_db)
+    voiced = (energy > threshold).astype(np.int8)
+
+    # runs of voiced frames, as [start, end) frame indices
+    edges = np.diff(np.concatenate(([0], voiced, [0])))
+    runs = zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+    # bridge short pauses, then drop bursts too short to be speech
+    gap = int(vad_min_silence * 1000 / vad_frame_ms)
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    min_frames = max(1, int(round(vad_min_speech * 1000 / vad_frame_ms)))
+    merged = [(start, end) for start, end in merged if end - start >= min_frames]
+
+    pad = int(vad_padding * 1000 / vad_frame_ms)
+    max_frames = int(vad_max_segment * 1000 / vad_frame_ms)
+    segments = []
+    for start, end in merged:
+        start = max(0, start - pad, segments[-1][1] if segments else 0)
+        end = min(count, end + pad)
+        while end - start > max_frames:
+            # cut at the quietest frame in the last quarter of the window
+            search = start + max_frames * 3 // 4
+            cut = search + int(np.argmin(energy[search:start + max_frames]))
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, end))
+
+    return [
+        (int(start) * frame, len(samples) if end == count else int(end) * frame)
+        for start, end in segments
+    ]
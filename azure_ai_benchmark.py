@@ -0,0 +1,307 @@
+"""
+===============================================================================
+Program:      azure_ai_benchmark.py
+Description:  Throughput and latency benchmark for the tools in this
+              repository. Runs each tool against the local stand-in servers in
+              azure_ai_mock_servers.py with generated inputs and reports
+              requests/sec, p50/p95/p99 latency and peak memory, and
+              measures cold-start time, so performance regressions show up
+              in numbers.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.7+ (Linux or macOS, peak memory comes from os.wait4)
+  - the dependencies of each tool being benchmarked
+
+Workflow:
+  1. Start the mock server in the background with the requested latency,
+     error rate and 429 injection
+  2. For each tool, generate inputs in a temporary working folder
+  3. Run the tool as a subprocess pointed at the mock server
+  4. Collect request timings from the server and peak RSS from the process
+  5. Time fresh interpreters starting the CLI and importing each tool
+     (cold start)
+  6. Print the results tables and optionally save them as JSON
+
+Input:
+  - None, inputs are generated (sizes set with --rows, --files, --images)
+
+Output:
+  - Results table printed to the console
+  - Optional JSON file with the same numbers (--json)
+
+Usage:
+  - Install the tools' dependencies
+  - Run the script, optionally restricting --tools
+
+Notes:
+  - p50/p95/p99 are service times measured by the mock server, client_*
+    percentiles come from the tool's own metrics (azure_ai_metrics.py)
+  - The JSON output also holds each tool's per-stage totals and counters
+  - Speech is not benchmarked, the mock server does not speak its protocol
+    (its import is still included in the cold-start table)
+  - Cold start is the median of --cold-start-runs fresh processes; a CLI
+    subcommand's --help should cost no more than the bare CLI, since tools
+    are only imported when they run (--cold-start-runs 0 skips it)
+  - Each tool's console output is kept in <workdir>/<tool>.log (--keep)
+
+Example:
+  python azure_ai_benchmark.py --latency 0.05 --throttle-rate 0.02 --json bench.json
+===============================================================================
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import azure_ai_mock_servers
+
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+# tool name -> script in this repository
+tools = {
+    'translate': 'azure_ai_translate.py',
+    'translate-csv': 'azure_ai_translate_csv.py',
+    'bot': 'azure_ai_bot.py',
+    'sentiment': 'azure_ai_social_comments.py',
+    'vision': 'azure_ai_comp_viz.py',
+}
+
+# tool name -> module, for the cold-start measurement
+cold_start_modules = {name: script[:-len('.py')] for name, script in tools.items()}
+cold_start_modules['speech'] = 'azure_ai_speech'
+
+sample_sentences = [
+    "I love this product, it works great.",
+    "The delivery was late and the box was broken.",
+    "Can you tell me when the store opens?",
+    "Worst customer service I have ever had.",
+    "Thanks for the quick reply!",
+    "The new update changed the menu layout.",
+]
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an unsorted list
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def make_png(width, height, seed):
+    # A small valid RGB PNG whose pixels depend on the seed
+    rng = random.Random(seed)
+    base = [rng.randrange(256) for _ in range(3)]
+    rows = []
+    for y in range(height):
+        row = bytearray([0])  # filter type: none
+        for x in range(width):
+            row += bytes(((base[0] + x) % 256, (base[1] + y) % 256, (base[2] + x * y) % 256))
+        rows.append(bytes(row))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(b''.join(rows)))
+        + chunk(b'IEND', b'')
+    )
+
+
+def prepare_inputs(tool, workdir, args):
+    # Generate the inputs a tool expects, relative to its working folder
+    rng = random.Random(args.seed)
+    if tool == 'translate-csv':
+        os.makedirs(os.path.join(workdir, 'data'), exist_ok=True)
+        with open(os.path.join(workdir, 'data', 'interesting_text.csv'), 'w', encoding='utf-8') as f:
+            f.write('text\n')
+            for i in range(args.rows):
+                # roughly half the rows repeat an earlier sentence
+                sentence = rng.choice(sample_sentences)
+                if rng.random() < 0.5:
+                    sentence = f"{sentence} (ref {i})"
+                f.write(json.dumps(sentence) + '\n')
+    elif tool == 'sentiment':
+        folder = os.path.join(workdir, 'data', 'comments', 'input')
+        os.makedirs(folder, exist_ok=True)
+        for i in range(args.files):
+            with open(os.path.join(folder, f"comment_{i:06d}.txt"), 'w', encoding='utf-8') as f:
+                f.write(' '.join(rng.choice(sample_sentences) for _ in range(rng.randint(1, 5))))
+    elif tool == 'vision':
+        folder = os.path.join(workdir, 'data', 'images')
+        os.makedirs(folder, exist_ok=True)
+        for i in range(args.images):
+            with open(os.path.join(folder, f"IMG_{i:05d}.png"), 'wb') as f:
+                f.write(make_png(64, 48, rng.random()))
+
+
+def run_tool(tool, workdir, env):
+    # Run one tool and return (exit code, wall seconds, peak RSS in MB)
+    log_path = os.path.join(workdir, f"{tool}.log")
+    env = dict(env, AZURE_AI_METRICS_FILE=os.path.join(workdir, 'metrics.json'), AZURE_AI_METRICS_FORMAT='json')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(repo_dir, tools[tool])],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status >> 8
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return process.returncode, wall, peak_rss
+
+
+def load_tool_metrics(workdir):
+    # The metrics the tool exported itself (see azure_ai_metrics.py), if any
+    try:
+        with open(os.path.join(workdir, 'metrics.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def summarize(tool, exit_code, wall, peak_rss, timings, tool_metrics):
+    latencies = [seconds * 1000 for _, _, seconds, _ in timings]
+    histograms = tool_metrics.get('histograms', {})
+    client = next((h for name, h in histograms.items() if name.startswith('request_seconds')), {})
+    return {
+        'tool': tool,
+        'exit_code': exit_code,
+        'wall_seconds': round(wall, 3),
+        'requests': len(timings),
+        'throttled': sum(1 for _, status, _, _ in timings if status == 429),
+        'errors': sum(1 for _, status, _, _ in timings if status >= 400 and status != 429),
+        'bytes_sent': sum(size for _, _, _, size in timings),
+        'requests_per_second': round(len(timings) / wall, 2) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'client_p50_ms': round(client.get('p50', 0.0) * 1000, 2),
+        'client_p95_ms': round(client.get('p95', 0.0) * 1000, 2),
+        'client_p99_ms': round(client.get('p99', 0.0) * 1000, 2),
+        'peak_rss_mb': round(peak_rss, 1),
+        'stages': {
+            name[len('stage_seconds{'):-1]: round(h['sum'], 3)
+            for name, h in histograms.items() if name.startswith('stage_seconds')
+        },
+        'counters': tool_metrics.get('counters', {}),
+    }
+
+
+def time_command(command, runs):
+    # (exit code, median and fastest wall milliseconds) of runs fresh processes
+    timings = []
+    exit_code = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        exit_code = subprocess.run(command, cwd=repo_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+        timings.append((time.perf_counter() - started) * 1000)
+    return exit_code, round(percentile(timings, 50), 1), round(min(timings), 1)
+
+
+def measure_cold_start(runs):
+    # Start-up cost of a bare interpreter, of the CLI, and for each tool of
+    # its CLI subcommand's --help and of importing its module
+    python = sys.executable
+    cli = os.path.join(repo_dir, 'azure_ai_cli.py')
+    commands = [('python', [python, '-c', 'pass']), ('azure-ai --help', [python, cli, '--help'])]
+    for tool, module in cold_start_modules.items():
+        commands.append((f"azure-ai {tool} --help", [python, cli, tool, '--help']))
+        commands.append((f"import {module}", [python, '-c', f"import {module}"]))
+
+    results = []
+    for name, command in commands:
+        exit_code, median, fastest = time_command(command, runs)
+        results.append({'command': name, 'exit_code': exit_code, 'median_ms': median, 'min_ms': fastest})
+    return results
+
+
+def print_table(results, columns=None):
+    columns = columns or ['tool', 'exit_code', 'wall_seconds', 'requests', 'throttled', 'errors',
+                          'requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'client_p95_ms', 'peak_rss_mb']
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for result in results:
+        print('  '.join(str(result[c]).ljust(widths[c]) for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Azure AI tools against local stand-ins.')
+    parser.add_argument('--tools', nargs='+', choices=list(tools), default=list(tools))
+    parser.add_argument('--rows', type=int, default=2000, help='CSV rows for translate-csv')
+    parser.add_argument('--files', type=int, default=200, help='comment files for sentiment')
+    parser.add_argument('--images', type=int, default=50, help='images for vision')
+    parser.add_argument('--json', help='save the results to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='keep the working folder and tool logs')
+    parser.add_argument('--cold-start-runs', type=int, default=5, help='fresh processes per cold-start command (0 skips)')
+    azure_ai_mock_servers.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    state = azure_ai_mock_servers.state_from_arguments(args)
+    server, base_url = azure_ai_mock_servers.start_in_background(state)
+    env = dict(os.environ, **azure_ai_mock_servers.tool_environment(base_url))
+    workroot = tempfile.mkdtemp(prefix='azure_ai_bench_')
+
+    results = []
+    try:
+        for tool in args.tools:
+            workdir = os.path.join(workroot, tool)
+            os.makedirs(workdir)
+            prepare_inputs(tool, workdir, args)
+
+            print(f"Running {tool}...")
+            state.take_timings()
+            exit_code, wall, peak_rss = run_tool(tool, workdir, env)
+            results.append(summarize(
+                tool, exit_code, wall, peak_rss, state.take_timings(), load_tool_metrics(workdir)
+            ))
+            if exit_code != 0:
+                with open(os.path.join(workdir, f"{tool}.log"), encoding='utf-8', errors='replace') as log:
+                    tail = log.read().strip().splitlines()[-3:]
+                print(f"  {tool} exited with {exit_code}:")
+                for line in tail:
+                    print(f"    {line}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        if args.keep:
+            print(f"Working folder kept at {workroot}")
+        else:
+            shutil.rmtree(workroot, ignore_errors=True)
+
+    cold_start = []
+    if args.cold_start_runs > 0:
+        print("Measuring cold start...")
+        cold_start = measure_cold_start(args.cold_start_runs)
+
+    print()
+    print_table(results)
+    if cold_start:
+        print()
+        print_table(cold_start, ['command', 'exit_code', 'median_ms', 'min_ms'])
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results, 'cold_start': cold_start}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,15 +11,20 @@ Version:      1.0.0
 Dependencies:
   - Python 3.6+
   - requests
+  - websocket-client
   - python-dotenv
 
 Environment Variables:
-  - DIRECT_LINE_SECRET : Direct Line secret for authenticating with the bot service
+  - DIRECT_LINE_SECRET   : Direct Line secret for authenticating with the bot service
+  - DIRECT_LINE_ENDPOINT : Direct Line base URL
+                           (default: https://directline.botframework.com/v3/directline)
 
 Workflow:
   1. Start a conversation with the bot
   2. Send a text message ("Hello from Python!") to the bot
-  3. Poll for and print any bot responses
+  3. Print bot responses as they arrive on the conversation's streamUrl
+     WebSocket (or, as a fallback, by polling for activities after the last
+     watermark)
 
 Input:
   - No external files required
@@ -29,10 +34,15 @@ Output:
 
 Usage:
   - Ensure .env file contains DIRECT_LINE_SECRET
-  - Run the script to interact with the bot via Direct Line API
+  - Run the script to interact with the bot via Direct Line API, or
+    'azure-ai bot "Where is my order?"'
 
 Notes:
-  - Includes a small delay to allow bot responses
+  - Requests share one keep-alive connection and are retried with jitter
+  - Waits up to reply_timeout seconds for the first reply instead of a
+    fixed delay (see azure_ai_directline.py)
+  - Set AZURE_AI_METRICS_FILE to export timings and counters
+    (see azure_ai_metrics.py)
   - The bot is not yet trained
 
 Example:
@@ -41,53 +51,61 @@ Example:
 """
 
 import os
-import requests
-import time
 from dotenv import load_dotenv
+from azure_ai_directline import DirectLineConversation
+from azure_ai_http import PooledClient
+from azure_ai_metrics import metrics, setup as setup_metrics
 
-# Load environment variables from .env
-load_dotenv()
+# receive replies from the conversation's streamUrl WebSocket as soon as the
+# bot sends them; set use_websocket = False to poll for new activities instead
+# (also used automatically when the stream can't be opened)
+use_websocket = True
+reply_timeout = 10  # seconds to wait for the bot's first reply
 
-# Get secret from environment variable
-DIRECT_LINE_SECRET = os.getenv("DIRECT_LINE_SECRET")
+message_text = "Hello from Python!"
 
-if not DIRECT_LINE_SECRET:
-    raise ValueError("Missing DIRECT_LINE_SECRET. Set it in your .env file.")
+def main(text=None):
+    # Load environment variables from .env
+    load_dotenv()
 
-# 1. Start a conversation
-headers = {
-    "Authorization": f"Bearer {DIRECT_LINE_SECRET}"
-}
-response = requests.post("https://directline.botframework.com/v3/directline/conversations", headers=headers)
-conversation = response.json()
-conversation_id = conversation["conversationId"]
-stream_url = conversation.get("streamUrl")
+    # per-stage timings and counters, exported when AZURE_AI_METRICS_FILE is set
+    setup_metrics('bot')
 
-print("Conversation started. ID:", conversation_id)
+    # Get secret from environment variable
+    DIRECT_LINE_SECRET = os.getenv("DIRECT_LINE_SECRET")
 
-# 2. Send a message to the bot
-message_text = "Hello from Python!"
-activity = {
-    "type": "message",
-    "from": {"id": "user1"},
-    "text": message_text
-}
-requests.post(
-    f"https://directline.botframework.com/v3/directline/conversations/{conversation_id}/activities",
-    headers=headers,
-    json=activity
-)
-print("Message sent:", message_text)
-
-# 3. Poll for bot responses
-time.sleep(2)  # Small delay to let the bot respond
-response = requests.get(
-    f"https://directline.botframework.com/v3/directline/conversations/{conversation_id}/activities",
-    headers=headers
-)
-activities = response.json().get("activities", [])
-for activity in activities:
-    if activity["from"]["id"] != "user1":
-        print("Bot replied:", activity["text"])
-
-# the bot has not yet been trained
+    if not DIRECT_LINE_SECRET:
+        raise ValueError("Missing DIRECT_LINE_SECRET. Set it in your .env file.")
+
+    # can point at a local stand-in (see azure_ai_mock_servers.py)
+    DIRECT_LINE_ENDPOINT = os.getenv("DIRECT_LINE_ENDPOINT", "https://directline.botframework.com/v3/directline")
+
+    client = PooledClient(pool_size=1, service='directline')
+    conversation = DirectLineConversation(client, DIRECT_LINE_ENDPOINT, DIRECT_LINE_SECRET, use_websocket=use_websocket)
+
+    try:
+        # 1. Start a conversation
+        conversation_id = conversation.start()
+        print("Conversation started. ID:", conversation_id)
+
+        # 2. Send a message to the bot
+        text = text or message_text
+        activity_id = conversation.send(text)
+        print("Message sent:", text)
+
+        # 3. Print bot responses as they arrive
+        replies = 0
+        with metrics.stage('wait'):
+            for activity in conversation.replies(activity_id, timeout=reply_timeout):
+                print("Bot replied:", activity.get("text"))
+                replies += 1
+        if not replies:
+            print(f"No reply within {reply_timeout} seconds")
+    finally:
+        conversation.close()
+        client.close()
+
+    # the bot has not yet been trained
+
+if __name__ == '__main__':
+    main()
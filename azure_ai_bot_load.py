@@ -0,0 +1,246 @@
+"""
+===============================================================================
+Program:      azure_ai_bot_load.py
+Description:  Load generator for the Direct Line bot behind azure_ai_bot.py.
+              Runs many simultaneous conversations with scripted multi-turn
+              dialogues and think time, and reports per-turn round-trip
+              latency (p50/p95/p99), error and timeout rates and
+              conversations/sec.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.7+
+  - requests
+  - websocket-client
+  - python-dotenv
+
+Environment Variables (not needed with --mock):
+  - DIRECT_LINE_SECRET   : Direct Line secret for authenticating with the bot service
+  - DIRECT_LINE_ENDPOINT : Direct Line base URL
+                           (default: https://directline.botframework.com/v3/directline)
+
+Workflow:
+  1. Optionally start the local Direct Line stand-in (--mock)
+  2. Start --conversations conversations, --concurrency at a time, spread
+     over --ramp-up seconds
+  3. Each conversation plays one scripted dialogue: send a turn, wait for the
+     bot's first reply, think, send the next turn
+  4. Record each turn's round trip (send to first reply), timeouts (no reply
+     within --reply-timeout) and errors
+  5. Print a summary and optionally save it as JSON
+
+Input:
+  - Optional JSON file of dialogues (--dialogues), a list of lists of
+    messages, e.g. [["Hi", "Where is my order?", "Thanks"], ["Hello"]]
+
+Output:
+  - Summary printed to the console
+  - Optional JSON file with the same numbers (--json)
+
+Usage:
+  - python azure_ai_bot_load.py --mock --conversations 500 --concurrency 200
+  - python azure_ai_bot_load.py --conversations 100 --concurrency 20 --think-time 2
+  - azure-ai bot-load takes the same options
+
+Notes:
+  - Replies are received over each conversation's streamUrl WebSocket;
+    --poll uses watermark polling instead (azure_ai_directline.py)
+  - Think time is drawn from an exponential distribution around the mean
+  - Each conversation uses two threads with streaming (sender and stream
+    reader), so very high concurrency may need a higher ulimit
+  - Load against the real endpoint counts towards the bot's quota
+
+Example:
+  python azure_ai_bot_load.py --mock --bot-delay 0.3 --conversations 300 --concurrency 100 --json load.json
+===============================================================================
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import azure_ai_mock_servers
+from azure_ai_benchmark import percentile
+from azure_ai_directline import DirectLineConversation
+from azure_ai_http import PooledClient
+from azure_ai_metrics import setup as setup_metrics
+
+default_endpoint = "https://directline.botframework.com/v3/directline"
+
+# used when no --dialogues file is given
+default_dialogues = [
+    ["Hello", "What can you do?", "Thanks, bye"],
+    ["Hi there", "I need help with my order", "It hasn't arrived yet", "Thank you"],
+    ["Good morning", "What are your opening hours?"],
+    ["Hey", "Can I change my delivery address?", "It's 12 High Street", "Great", "Bye"],
+]
+
+
+class LoadStats:
+    """
+    Turn latencies and outcome counters shared by the conversation threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turn_seconds = []
+        self.turns = 0
+        self.timeouts = 0
+        self.completed = 0
+        self.failed = 0
+
+    def turn(self, seconds):
+        with self.lock:
+            self.turns += 1
+            if seconds is None:
+                self.timeouts += 1
+            else:
+                self.turn_seconds.append(seconds)
+
+    def conversation(self, ok):
+        with self.lock:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+
+def run_conversation(index, dialogue, client, endpoint, secret, args, stats, metrics, start_at):
+    # Play one dialogue; a failed request ends the conversation as an error
+    rng = random.Random(args.seed + index if args.seed is not None else None)
+    time.sleep(max(0.0, start_at - time.perf_counter()))
+
+    conversation = DirectLineConversation(
+        client, endpoint, secret, user_id=f"load-user-{index}", use_websocket=not args.poll
+    )
+    try:
+        conversation.start()
+        for turn, text in enumerate(dialogue):
+            if turn and args.think_time > 0:
+                time.sleep(rng.expovariate(1 / args.think_time))
+
+            started = time.perf_counter()
+            activity_id = conversation.send(text)
+            seconds = None
+            # the round trip ends at the first reply to this turn; late replies
+            # to an earlier turn can come first and are skipped
+            for reply in conversation.replies(activity_id, timeout=args.reply_timeout, quiet=0):
+                if conversation.is_reply(reply, activity_id):
+                    seconds = time.perf_counter() - started
+                    break
+            stats.turn(seconds)
+            if seconds is not None:
+                metrics.observe('turn_seconds', seconds)
+        stats.conversation(True)
+    except Exception as e:
+        metrics.increment('errors')
+        stats.conversation(False)
+        if args.verbose:
+            print(f"Conversation {index} failed: {e}")
+    finally:
+        conversation.close()
+
+
+def summarize(stats, wall, args, metrics):
+    turns = stats.turns
+    return {
+        'conversations': args.conversations,
+        'concurrency': args.concurrency,
+        'completed': stats.completed,
+        'failed': stats.failed,
+        'turns': turns,
+        'wall_seconds': round(wall, 3),
+        'conversations_per_second': round(stats.completed / wall, 2) if wall else 0.0,
+        'turns_per_second': round(turns / wall, 2) if wall else 0.0,
+        'p50_ms': round(percentile(stats.turn_seconds, 50) * 1000, 1),
+        'p95_ms': round(percentile(stats.turn_seconds, 95) * 1000, 1),
+        'p99_ms': round(percentile(stats.turn_seconds, 99) * 1000, 1),
+        'max_ms': round(max(stats.turn_seconds, default=0.0) * 1000, 1),
+        'timeout_rate': round(stats.timeouts / turns, 4) if turns else 0.0,
+        # failed conversations per conversation started
+        'error_rate': round(stats.failed / args.conversations, 4) if args.conversations else 0.0,
+        'stream_fallbacks': metrics.counters.get('stream_fallbacks', 0),
+        'http_retries': metrics.counters.get('retries', 0),
+    }
+
+
+def print_summary(summary):
+    width = max(len(name) for name in summary)
+    for name, value in summary.items():
+        print(f"  {name.ljust(width)}  {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run concurrent scripted conversations against a Direct Line bot.')
+    parser.add_argument('--conversations', type=int, default=100, help='conversations to run in total')
+    parser.add_argument('--concurrency', type=int, default=20, help='conversations running at the same time')
+    parser.add_argument('--think-time', type=float, default=1.0, help='mean seconds between a reply and the next turn')
+    parser.add_argument('--reply-timeout', type=float, default=10.0, help='seconds to wait for a reply to a turn')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='seconds over which conversations are started')
+    parser.add_argument('--dialogues', help='JSON file with a list of dialogues (lists of messages)')
+    parser.add_argument('--poll', action='store_true', help='poll for activities instead of using the WebSocket stream')
+    parser.add_argument('--mock', action='store_true', help='run against the local Direct Line stand-in')
+    parser.add_argument('--json', help='save the summary to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='print each failed conversation')
+    azure_ai_mock_servers.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    metrics = setup_metrics('bot_load')
+    dialogues = default_dialogues
+    if args.dialogues:
+        with open(args.dialogues, encoding='utf-8') as f:
+            dialogues = json.load(f)
+
+    server = None
+    if args.mock:
+        state = azure_ai_mock_servers.state_from_arguments(args)
+        server, base_url = azure_ai_mock_servers.start_in_background(state)
+        endpoint = f"{base_url}/v3/directline"
+        secret = 'mock-secret'
+    else:
+        load_dotenv()
+        secret = os.getenv("DIRECT_LINE_SECRET")
+        if not secret:
+            raise ValueError("Missing DIRECT_LINE_SECRET. Set it in your .env file or use --mock.")
+        endpoint = os.getenv("DIRECT_LINE_ENDPOINT", default_endpoint)
+
+    print(f"Running {args.conversations} conversations, {args.concurrency} at a time, against {endpoint}")
+    client = PooledClient(pool_size=args.concurrency, service='directline')
+    stats = LoadStats()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for index in range(args.conversations):
+                # with --ramp-up, conversation starts are spread evenly
+                start_at = started + args.ramp_up * index / args.conversations
+                executor.submit(
+                    run_conversation, index, dialogues[index % len(dialogues)],
+                    client, endpoint, secret, args, stats, metrics, start_at
+                )
+        wall = time.perf_counter() - started
+    finally:
+        client.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    summary = summarize(stats, wall, args, metrics)
+    print()
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': summary}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
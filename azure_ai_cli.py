@@ -0,0 +1,195 @@
+"""
+===============================================================================
+Program:      azure_ai_cli.py
+Description:  One command for every tool in this repository. Each subcommand
+              imports its tool only when it runs, so pandas and the Speech,
+              Text Analytics and Computer Vision SDKs are loaded only by the
+              subcommand that needs them and '--help' starts instantly.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.7+
+  - the dependencies of the tool being run
+
+Environment Variables:
+  - the ones each tool reads from .env (see the tool's own header)
+
+Workflow:
+  1. Parse the subcommand and its options (only argparse is imported)
+  2. Import the tool's module and apply the options to its settings
+  3. Run the tool's main()
+
+Input:
+  - Subcommand and options on the command line
+
+Output:
+  - Whatever the tool writes
+
+Usage:
+  - pip install -e .[all]   (installs the 'azure-ai' command)
+  - azure-ai <subcommand> [options], or python azure_ai_cli.py ...
+  - azure-ai <subcommand> --help lists a subcommand's options
+
+Notes:
+  - Subcommands: translate, translate-csv, speech, sentiment, vision, bot,
+    bot-load and benchmark
+  - Options override the module-level settings of the tool; anything not
+    given keeps the tool's default
+  - bot-load and benchmark pass all their arguments through to the tool
+  - Missing credentials or input folders end the run with a one-line error
+
+Example:
+  azure-ai translate "I would like a coffee" --to fr de
+  azure-ai sentiment --input-dir data/comments/input --output-mode jsonl
+===============================================================================
+"""
+
+import argparse
+import sys
+
+# subcommands whose arguments are parsed by the tool itself: name -> (module, help)
+passthrough_commands = {
+    'bot-load': ('azure_ai_bot_load', 'run concurrent conversations against the bot'),
+    'benchmark': ('azure_ai_benchmark', 'benchmark the tools against local stand-ins'),
+}
+
+
+def configure(module, **settings):
+    # Override a tool's module-level settings with the options that were given
+    for name, value in settings.items():
+        if value is not None:
+            setattr(module, name, value)
+
+
+def run_translate(args):
+    import azure_ai_translate as tool
+    configure(tool, use_translation_memory=args.use_translation_memory)
+    tool.main(args.text, args.to, args.source)
+
+
+def run_translate_csv(args):
+    import azure_ai_translate_csv as tool
+    configure(
+        tool, input_csv_file=args.input, output_csv_file=args.output,
+        failures_csv_file=args.failures, use_translation_memory=args.use_translation_memory
+    )
+    tool.main()
+
+
+def run_speech(args):
+    import azure_ai_speech as tool
+    configure(
+        tool, audio_folder=args.audio_folder, transcriptions_folder=args.output_folder,
+        recognition_mode=args.mode, max_workers=args.workers
+    )
+    tool.main()
+
+
+def run_sentiment(args):
+    import azure_ai_social_comments as tool
+    configure(
+        tool, input_dir=args.input_dir, output_dir=args.output_dir, output_mode=args.output_mode,
+        results_file=args.results_file, lexicon_prefilter=args.lexicon_prefilter
+    )
+    tool.main()
+
+
+def run_vision(args):
+    import azure_ai_comp_viz as tool
+    if args.image_folder:
+        tool.set_image_folder(args.image_folder)
+    configure(
+        tool, feature_mode=args.feature_mode, detail_pass=args.detail_pass,
+        detail_patterns=args.detail_patterns, link_mode=args.link_mode, max_workers=args.workers
+    )
+    tool.main()
+
+
+def run_bot(args):
+    import azure_ai_bot as tool
+    configure(tool, use_websocket=args.use_websocket, reply_timeout=args.reply_timeout)
+    tool.main(args.text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='azure-ai', description='Azure AI tools.')
+    commands = parser.add_subparsers(dest='command', metavar='<command>')
+    commands.required = True
+
+    translate = commands.add_parser('translate', help='translate a piece of text into several languages')
+    translate.add_argument('text', nargs='?', help='text to translate (default: the sample sentence)')
+    translate.add_argument('--to', nargs='+', help='target language codes (default: fr zu)')
+    translate.add_argument('--from', dest='source', help='source language code (default: en)')
+    translate.add_argument('--no-memory', dest='use_translation_memory', action='store_false', default=None,
+                           help='always call the API')
+    translate.set_defaults(run=run_translate)
+
+    translate_csv = commands.add_parser('translate-csv', help="translate the 'text' column of a CSV file")
+    translate_csv.add_argument('--input', help='input CSV file')
+    translate_csv.add_argument('--output', help='output CSV file')
+    translate_csv.add_argument('--failures', help='CSV file for rows that could not be translated')
+    translate_csv.add_argument('--no-memory', dest='use_translation_memory', action='store_false', default=None,
+                               help='always call the API')
+    translate_csv.set_defaults(run=run_translate_csv)
+
+    speech = commands.add_parser('speech', help='transcribe a folder of WAV files')
+    speech.add_argument('--audio-folder', help='folder with the .wav files')
+    speech.add_argument('--output-folder', help='folder for the transcriptions')
+    speech.add_argument('--mode', choices=['continuous', 'once'], help='recognition mode')
+    speech.add_argument('--workers', type=int, help='(file, language) pairs transcribed at the same time')
+    speech.set_defaults(run=run_speech)
+
+    sentiment = commands.add_parser('sentiment', help='score the sentiment of a folder of comments')
+    sentiment.add_argument('--input-dir', help='folder with the .txt comment files')
+    sentiment.add_argument('--output-dir', help='folder for the text output mode')
+    sentiment.add_argument('--output-mode', choices=['text', 'jsonl', 'parquet'])
+    sentiment.add_argument('--results-file', help='results file for jsonl/parquet, without extension')
+    sentiment.add_argument('--lexicon-prefilter', action='store_true', default=None,
+                           help='decide obvious comments locally')
+    sentiment.set_defaults(run=run_sentiment)
+
+    vision = commands.add_parser('vision', help='analyze and rename a folder of images')
+    vision.add_argument('--image-folder', help='folder with the images (results go to its analysis subfolder)')
+    vision.add_argument('--feature-mode', choices=['full', 'rename'])
+    vision.add_argument('--detail-pass', action='store_true', default=None,
+                        help='fetch every feature for the images matching --detail-patterns')
+    vision.add_argument('--detail-patterns', nargs='+', metavar='PATTERN',
+                        help="filename wildcards for the detail pass, e.g. '*_hero.jpg'")
+    vision.add_argument('--link-mode', choices=['copy', 'hardlink', 'reflink'])
+    vision.add_argument('--workers', type=int, help='images analyzed at the same time')
+    vision.set_defaults(run=run_vision)
+
+    bot = commands.add_parser('bot', help='send a message to the bot and print its replies')
+    bot.add_argument('text', nargs='?', help='message to send')
+    bot.add_argument('--poll', dest='use_websocket', action='store_false', default=None,
+                     help='poll instead of using the WebSocket stream')
+    bot.add_argument('--reply-timeout', type=float, help='seconds to wait for the first reply')
+    bot.set_defaults(run=run_bot)
+
+    for name, (_, help) in passthrough_commands.items():
+        commands.add_parser(name, help=help, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    if argv and argv[0] in passthrough_commands:
+        # the tool has its own argument parser
+        import importlib
+        module = importlib.import_module(passthrough_commands[argv[0]][0])
+        return module.main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    try:
+        args.run(args)
+    except (ValueError, FileNotFoundError) as e:
+        # missing credentials or inputs
+        sys.exit(f"azure-ai {args.command}: {e}")
+
+
+if __name__ == '__main__':
+    main()
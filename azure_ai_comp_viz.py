@@ -14,6 +14,7 @@ Dependencies:
   - Python 3.6+
   - azure-cognitiveservices-vision-computervision
   - msrest
+  - pillow
   - python-dotenv
 
 Environment Variables (in .env):
@@ -22,63 +23,155 @@ Environment Variables (in .env):
 
 Workflow:
   1. Load Azure credentials from environment
-  2. Analyze each image in the 'data/images' folder with multiple visual features
+  2. Analyze each image in the 'data/images' folder with multiple visual
+     features, up to max_workers images at a time, uploading a downscaled
+     copy of large images
   3. Log detailed analysis info (categories, tags, faces, objects, etc.)
   4. Generate a new filename based on top analysis results
   5. Copy and rename images to 'data/images/analysis/updated_images' folder
-  6. Save a text file with the analysis results
+  6. Append each image's block to the analysis results file as it completes
 
 Input:
   - Image files in 'data/images' folder
 
 Output:
   - Text summary saved to 'data/images/analysis/analysis_results.txt'
+  - With the detail pass, full analyses saved to
+    'data/images/analysis/analysis_details.txt'
   - Renamed image copies saved in 'data/images/analysis/updated_images/'
 
 Usage:
   - Ensure .env contains valid Azure Computer Vision keys
   - Place images to analyze in 'data/images'
-  - Run the script
+  - Run the script, or 'azure-ai vision --image-folder <folder>'
 
 Notes:
-  - Avoids overwriting by appending suffix if filename exists
+  - Avoids overwriting by appending suffix if filename exists; taken names
+    are tracked in memory (seeded from the output folder at start-up)
+  - Set link_mode = "hardlink" or "reflink" to place the renamed images
+    without copying their bytes
+  - Analyses are cached in 'data/images/analysis/analysis_cache.sqlite'
+    (azure_ai_vision_cache.py); cached images still get their report block
+    and renamed copy, and the hit rate is printed at the end
+  - Set near_duplicate_distance (e.g. 5) to reuse analyses of near-duplicate
+    images; their report block says so
+  - feature_mode = "rename" only requests Categories, Tags, Description and
+    Objects (what the new filename is built from); add detail_pass = True
+    and detail_patterns (e.g. ["*_hero.jpg"]) to fetch every feature later
+    for just the images matching them
+  - Images over max_upload_dimension or 4 MB are downscaled and recompressed
+    in memory before upload (no temp files); the renamed copy is always the
+    untouched original, and face, object and brand rectangles are mapped
+    back onto the original's pixels before they are reported or cached
+  - Images are reported and renamed in sorted filename order whatever
+    order the analyses finish in, so reruns give the same names
   - Skips unsupported or invalid images with logged messages
+  - Set AZURE_AI_METRICS_FILE to export timings and counters
+    (see azure_ai_metrics.py)
 
 Example:
   python azure_image_analysis.py
 ===============================================================================
 """
 
+import errno
+import fnmatch
+import io
 import os
 import shutil
 import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from azure.cognitiveservices.vision.computervision import ComputerVisionClient
 from msrest.authentication import CognitiveServicesCredentials
 from azure.cognitiveservices.vision.computervision.models import ComputerVisionErrorResponseException
 from dotenv import load_dotenv
-
-# load environment variables
-load_dotenv()
-
-subscription_key_csv = os.getenv("AZURE_COMPUTERVISION_CSV_KEY")
-endpoint_csv = os.getenv("AZURE_COMPUTERVISION_CSV_ENDPOINT")
-
-if not subscription_key_csv or not endpoint_csv:
-    raise ValueError("Missing Azure Computer Vision CSV credentials in environment variables.")
-
-# authentication
-client = ComputerVisionClient(endpoint_csv, CognitiveServicesCredentials(subscription_key_csv))
+try:
+    import fcntl
+except ImportError:  # Windows, reflink falls back to copying
+    fcntl = None
+from PIL import Image, ImageOps
+from azure_ai_metrics import metrics, setup as setup_metrics
+from azure_ai_vision_cache import AnalysisCache
 
 image_folder = "data/images" # input folder
 analysis_folder = os.path.join(image_folder, "analysis")
 updated_images_folder = os.path.join(analysis_folder, "updated_images") # output folder
 
-os.makedirs(analysis_folder, exist_ok=True)
-os.makedirs(updated_images_folder, exist_ok=True)
-
 output_file = os.path.join(analysis_folder, "analysis_results.txt")
 
-all_outputs = []
+# number of images analyzed at the same time; set to 1 for one at a time
+max_workers = 8
+pending_per_worker = 2  # finished or running analyses held for the ordered report, per worker
+
+# downscale and recompress images in memory before upload; the original file
+# is still what gets copied to updated_images. Set preprocess_images = False
+# to upload the files as they are
+preprocess_images = True
+max_upload_dimension = 2048          # longest side sent to the service
+max_upload_bytes = 4 * 1024 * 1024   # service limit per image
+min_image_dimension = 50             # service minimum, smaller images are sent as they are
+jpeg_quality = 85
+exif_orientation_tag = 0x0112  # EXIF Orientation, undone again on the returned boxes
+
+full_features = [
+    "Categories",
+    "Tags",
+    "Description",
+    "Faces",
+    "Objects",
+    "Color",
+    "Brands",
+    "Adult"
+]
+# the only features derive_filename looks at
+rename_features = ["Categories", "Tags", "Description", "Objects"]
+
+# feature_mode = "rename" requests just rename_features, which is faster and
+# cheaper for bulk renaming; "full" requests every feature for the detailed
+# report. With detail_pass = True a second pass fetches full_features for the
+# images matching detail_patterns (filename wildcards) and writes their
+# detailed blocks to analysis_details.txt. No pattern matches nothing, so the
+# second pass never re-analyzes the whole folder by default
+feature_mode = "full"
+detail_pass = False
+detail_patterns = []
+detail_output_file = os.path.join(analysis_folder, "analysis_details.txt")
+
+# output files: "copy" duplicates each image, "hardlink" links the original
+# (no extra space, but the two names are the same file), "reflink" makes a
+# copy-on-write clone where the filesystem supports it. Both fall back to a
+# copy when linking isn't possible
+link_mode = "copy"
+ficlone = 0x40049409  # Linux FICLONE ioctl
+link_fallback_errors = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EMLINK, errno.ENOSYS}
+
+# analysis cache: results are kept in SQLite by image content hash so reruns
+# skip unchanged images. With near_duplicate_distance > 0 images whose
+# perceptual hash is within that many bits (of 64) of a cached image reuse its
+# analysis, e.g. burst shots. Set use_analysis_cache = False to always call
+# the service
+use_analysis_cache = True
+analysis_cache_file = os.path.join(analysis_folder, "analysis_cache.sqlite")
+near_duplicate_distance = 0
+
+# set up by main()
+client = None
+cache = None
+taken_names = None
+
+def set_image_folder(folder):
+    # Analyze another folder; the report, cache and renamed images go to its
+    # own analysis subfolder
+    global image_folder, analysis_folder, updated_images_folder, output_file
+    global detail_output_file, analysis_cache_file
+    image_folder = folder
+    analysis_folder = os.path.join(image_folder, "analysis")
+    updated_images_folder = os.path.join(analysis_folder, "updated_images")
+    output_file = os.path.join(analysis_folder, "analysis_results.txt")
+    detail_output_file = os.path.join(analysis_folder, "analysis_details.txt")
+    analysis_cache_file = os.path.join(analysis_folder, "analysis_cache.sqlite")
 
 def clean_filename(text):
     # Lowercase, replace non-alphanumeric with underscore, remove leading/trailing underscores
@@ -115,110 +208,363 @@ def derive_filename(analysis, original_ext):
     # 5. Everything fails go with the original name
     return 'image' + original_ext
 
-for filename in os.listdir(image_folder):
+def encode_image(image, quality):
+    # JPEG for photos, PNG when there is transparency to keep
+    buffer = io.BytesIO()
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image.save(buffer, format='PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+def prepare_upload(original):
+    # Return (bytes to send, transform): the file itself and None when it is
+    # already within the limits, otherwise a downscaled, recompressed copy and
+    # what restore_coordinates needs to map its boxes back onto the original
+    if not preprocess_images:
+        return original, None
+
+    try:
+        image = Image.open(io.BytesIO(original))
+        width, height = image.size
+        if min(width, height) < min_image_dimension:
+            return original, None
+        if max(width, height) <= max_upload_dimension and len(original) <= max_upload_bytes:
+            return original, None
+
+        # let the JPEG decoder scale down while decoding, then apply the
+        # EXIF rotation since the re-encoded image has no EXIF
+        orientation = image.getexif().get(exif_orientation_tag, 1)
+        image.draft('RGB', (max_upload_dimension, max_upload_dimension))
+        image = ImageOps.exif_transpose(image)
+        # shrink the longest side to max_upload_dimension, but never the
+        # shortest below min_image_dimension (e.g. panoramas and banners)
+        scale = max(max_upload_dimension / max(image.size), min_image_dimension / min(image.size))
+        if scale < 1:
+            size = tuple(max(min_image_dimension, round(side * scale)) for side in image.size)
+            image = image.resize(size, Image.LANCZOS)
+
+        quality = jpeg_quality
+        data = encode_image(image, quality)
+        while len(data) > max_upload_bytes and min(image.size) > min_image_dimension * 2:
+            # lower the quality first, then the size
+            if quality > 50:
+                quality -= 15
+            else:
+                image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS)
+            data = encode_image(image, quality)
+    except (OSError, ValueError):
+        # not something Pillow can read, let the service decide
+        return original, None
+
+    if len(data) >= len(original):
+        return original, None
+    metrics.increment('bytes_saved', len(original) - len(data))
+    return data, (orientation, (width, height), image.size)
+
+def to_original(x, y, transform):
+    # Map a point of the uploaded copy onto the original file's pixels: undo
+    # the downscale, then the EXIF rotation or flip
+    orientation, (width, height), (upload_width, upload_height) = transform
+    upright_width, upright_height = (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+    x = x * upright_width / upload_width
+    y = y * upright_height / upload_height
+    if orientation == 2:
+        return width - x, y
+    if orientation == 3:
+        return width - x, height - y
+    if orientation == 4:
+        return x, height - y
+    if orientation == 5:
+        return y, x
+    if orientation == 6:
+        return y, height - x
+    if orientation == 7:
+        return width - y, height - x
+    if orientation == 8:
+        return width - y, x
+    return x, y
+
+def map_rectangle(x, y, w, h, transform):
+    # (x, y, w, h) of a box on the uploaded copy, on the original instead
+    x1, y1 = to_original(x, y, transform)
+    x2, y2 = to_original(x + w, y + h, transform)
+    left, top = round(min(x1, x2)), round(min(y1, y2))
+    return left, top, round(max(x1, x2)) - left, round(max(y1, y2)) - top
+
+def restore_coordinates(analysis, transform):
+    # Face, object and brand boxes come back for the uploaded copy; move
+    # them onto the original so the report and the cache describe the file
+    if transform is None:
+        return
+    for face in analysis.faces or []:
+        rect = face.face_rectangle
+        rect.left, rect.top, rect.width, rect.height = map_rectangle(
+            rect.left, rect.top, rect.width, rect.height, transform
+        )
+    for item in (analysis.objects or []) + (analysis.brands or []):
+        rect = item.rectangle
+        rect.x, rect.y, rect.w, rect.h = map_rectangle(rect.x, rect.y, rect.w, rect.h, transform)
+
+def analyze_image(image_path, features):
+    # Return (analysis, near_duplicate), from the cache when possible
+    with metrics.stage('read'), open(image_path, "rb") as f:
+        original = f.read()
+
+    if cache is not None:
+        with metrics.stage('cache'):
+            analysis, near_duplicate = cache.get(original, features)
+        if analysis is not None:
+            return analysis, near_duplicate
+
+    with metrics.stage('read'):
+        data, transform = prepare_upload(original)
+    metrics.increment('requests')
+    metrics.increment('bytes_sent', len(data))
+    started = time.perf_counter()
+    with metrics.stage('service'), io.BytesIO(data) as image_stream:
+        analysis = client.analyze_image_in_stream(image=image_stream, visual_features=features)
+    metrics.observe('request_seconds', time.perf_counter() - started, 'computervision')
+    restore_coordinates(analysis, transform)
+
+    if cache is not None:
+        with metrics.stage('cache'):
+            cache.put(original, features, analysis)
+    return analysis, False
+
+def describe_analysis(analysis):
+    # Report lines for one analysis
+    lines = []
+
+    # categories
+    if analysis.categories:
+        lines.append(" Categories:")
+        for category in analysis.categories:
+            lines.append(f"  - {category.name} (Score: {category.score:.2f})")
+
+    # tags
+    if analysis.tags:
+        tags_list = [tag.name for tag in analysis.tags]
+        lines.append(" Tags:")
+        lines.append(f"  - {', '.join(tags_list)}")
+
+    # description captions
+    if analysis.description and analysis.description.captions:
+        lines.append(" Description Captions:")
+        for caption in analysis.description.captions:
+            lines.append(f"  - {caption.text} (Confidence: {caption.confidence:.2f})")
+
+    # faces
+    if analysis.faces:
+        lines.append(" Faces:")
+        for face in analysis.faces:
+            rect = face.face_rectangle
+            lines.append(f"  - Age: {face.age}, Gender: {face.gender}, Rectangle: {rect}")
+
+    # objects
+    if analysis.objects:
+        lines.append(" Objects:")
+        for obj in analysis.objects:
+            rect = obj.rectangle
+            lines.append(f"  - Object: {obj.object_property}, Confidence: {obj.confidence:.2f}, Rectangle: {rect}")
+
+    # color anlaysis
+    if analysis.color:
+        lines.append(" Color:")
+        lines.append(f"  - Dominant Colors: {', '.join(analysis.color.dominant_colors)}")
+        lines.append(f"  - Accent Color: #{analysis.color.accent_color}")
+        lines.append(f"  - Is BW Image: {analysis.color.is_bw_img}")
+
+    # find brands
+    if analysis.brands:
+        lines.append(" Brands:")
+        for brand in analysis.brands:
+            lines.append(f"  - Brand: {brand.name}, Confidence: {brand.confidence:.2f}")
+
+    # detect adult content
+    if analysis.adult:
+        lines.append(" Adult Content:")
+        lines.append(f"  - Is Adult Content: {analysis.adult.is_adult_content} (Score: {analysis.adult.adult_score:.2f})")
+        lines.append(f"  - Is Racy Content: {analysis.adult.is_racy_content} (Score: {analysis.adult.racy_score:.2f})")
+
+    return lines
+
+def process_image(filename, features):
+    # Worker: analyze one image and return (analysis or None, report lines)
     image_path = os.path.join(image_folder, filename)
-    if os.path.isfile(image_path):
-        print(f"Processing image: {filename}")
-        all_outputs.append(f"Processing image: {filename}\n")
-        try:
-            with open(image_path, "rb") as image_stream:
-                analysis = client.analyze_image_in_stream(
-                    image=image_stream,
-                    visual_features=[
-                        "Categories",
-                        "Tags",
-                        "Description",
-                        "Faces",
-                        "Objects",
-                        "Color",
-                        "Brands",
-                        "Adult"
-                    ]
-                )
-
-            def log_print(text):
-                print(text)
-                all_outputs.append(text + "\n")
-
-            # categories
-            if analysis.categories:
-                log_print(" Categories:")
-                for category in analysis.categories:
-                    log_print(f"  - {category.name} (Score: {category.score:.2f})")
-
-            # tags
-            if analysis.tags:
-                tags_list = [tag.name for tag in analysis.tags]
-                log_print(" Tags:")
-                log_print(f"  - {', '.join(tags_list)}")
-
-            # description captions
-            if analysis.description and analysis.description.captions:
-                log_print(" Description Captions:")
-                for caption in analysis.description.captions:
-                    log_print(f"  - {caption.text} (Confidence: {caption.confidence:.2f})")
-
-            # faces
-            if analysis.faces:
-                log_print(" Faces:")
-                for face in analysis.faces:
-                    rect = face.face_rectangle
-                    log_print(f"  - Age: {face.age}, Gender: {face.gender}, Rectangle: {rect}")
-
-            # objects
-            if analysis.objects:
-                log_print(" Objects:")
-                for obj in analysis.objects:
-                    rect = obj.rectangle
-                    log_print(f"  - Object: {obj.object_property}, Confidence: {obj.confidence:.2f}, Rectangle: {rect}")
-
-            # color anlaysis
-            if analysis.color:
-                log_print(" Color:")
-                log_print(f"  - Dominant Colors: {', '.join(analysis.color.dominant_colors)}")
-                log_print(f"  - Accent Color: #{analysis.color.accent_color}")
-                log_print(f"  - Is BW Image: {analysis.color.is_bw_img}")
-
-            # find brands
-            if analysis.brands:
-                log_print(" Brands:")
-                for brand in analysis.brands:
-                    log_print(f"  - Brand: {brand.name}, Confidence: {brand.confidence:.2f}")
-
-            # detect adult content
-            if analysis.adult:
-                log_print(" Adult Content:")
-                log_print(f"  - Is Adult Content: {analysis.adult.is_adult_content} (Score: {analysis.adult.adult_score:.2f})")
-                log_print(f"  - Is Racy Content: {analysis.adult.is_racy_content} (Score: {analysis.adult.racy_score:.2f})")
-
-            # derive new filename and copy
-            original_ext = os.path.splitext(filename)[1]
-            new_filename = derive_filename(analysis, original_ext)
-
-            # avoid overwrite by adding suffix
-            candidate_name = new_filename
-            counter = 1
-            while os.path.exists(os.path.join(updated_images_folder, candidate_name)):
-                candidate_name = f"{os.path.splitext(new_filename)[0]}_{counter}{original_ext}"
+    try:
+        analysis, near_duplicate = analyze_image(image_path, features)
+        lines = describe_analysis(analysis)
+        if near_duplicate:
+            lines.append(" Analysis reused from a near-duplicate image")
+        return analysis, lines
+    except ComputerVisionErrorResponseException as e:
+        metrics.increment('errors')
+        return None, [f"  Skipped: Invalid image or unsupported format. ({e.message})"]
+    except Exception as e:
+        metrics.increment('errors')
+        return None, [f"  Skipped: Unexpected error: {e}"]
+
+class NameRegistry:
+    """
+    Names taken in the output folder, with a next-suffix counter per derived
+    name, so a collision costs no filesystem calls however many there are.
+    """
+
+    def __init__(self, folder):
+        # seeded once from the folder, later names are only tracked here
+        self.taken = set(os.listdir(folder))
+        self.counters = {}
+
+    def claim(self, filename):
+        # Same names as the old exists() loop: name.ext, name_1.ext, name_2.ext...
+        candidate = filename
+        if candidate in self.taken:
+            base, ext = os.path.splitext(filename)
+            counter = self.counters.get(filename, 1)
+            candidate = f"{base}_{counter}{ext}"
+            while candidate in self.taken:
                 counter += 1
-            new_filename = candidate_name
-
-            shutil.copy2(image_path, os.path.join(updated_images_folder, new_filename))
-            log_print(f" Image saved as: {new_filename}")
-
-        except ComputerVisionErrorResponseException as e:
-            err_msg = f"  Skipped: Invalid image or unsupported format. ({e.message})"
-            print(err_msg)
-            all_outputs.append(err_msg + "\n")
-        except Exception as e:
-            err_msg = f"  Skipped: Unexpected error: {e}"
-            print(err_msg)
-            all_outputs.append(err_msg + "\n")
-
-        all_outputs.append("\n")  # blank line between images for better formatting
-
-with open(output_file, "w", encoding="utf-8") as f:
-    f.writelines(all_outputs)
+                candidate = f"{base}_{counter}{ext}"
+            self.counters[filename] = counter + 1
+        self.taken.add(candidate)
+        return candidate
+
+def reflink(source, destination):
+    # Copy-on-write clone (Linux FICLONE: Btrfs, XFS, bcachefs...)
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+    with open(source, "rb") as src, open(destination, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), ficlone, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+    shutil.copystat(source, destination)
+
+def place_file(source, destination):
+    # Put the original at destination per link_mode, falling back to a full
+    # copy where the filesystem can't link or clone (e.g. across devices)
+    try:
+        if link_mode == "hardlink":
+            os.link(source, destination)
+            return
+        if link_mode == "reflink":
+            reflink(source, destination)
+            return
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in link_fallback_errors:
+            raise
+        metrics.increment('link_fallbacks')
+    shutil.copy2(source, destination)
+
+def save_renamed_copy(filename, analysis):
+    # Runs on the main thread in input order, so collisions get the same
+    # suffixes as a one-at-a-time run
+    image_path = os.path.join(image_folder, filename)
 
-print(f"Analysis complete. Results saved to {output_file}")
-print(f"Renamed images saved to folder: {updated_images_folder}")
+    # derive new filename and copy
+    original_ext = os.path.splitext(filename)[1]
+    new_filename = derive_filename(analysis, original_ext)
+
+    # avoid overwrite by adding suffix
+    new_filename = taken_names.claim(new_filename)
+
+    with metrics.stage('write'):
+        place_file(image_path, os.path.join(updated_images_folder, new_filename))
+    return f" Image saved as: {new_filename}"
+
+def analyze_in_order(filenames, executor, features):
+    # Yield (filename, (analysis, lines)) in input order while up to
+    # max_workers analyses run; at most max_pending results wait in memory.
+    # Worked out here so a max_workers set after import (--workers) counts
+    max_pending = max_workers * pending_per_worker
+    pending = deque()
+    for filename in filenames:
+        pending.append((filename, executor.submit(process_image, filename, features)))
+        if len(pending) >= max_pending:
+            filename, future = pending.popleft()
+            yield filename, future.result()
+    while pending:
+        filename, future = pending.popleft()
+        yield filename, future.result()
+
+def main():
+    global client, cache, taken_names
+
+    # load environment variables
+    load_dotenv()
+
+    # per-stage timings and counters, exported when AZURE_AI_METRICS_FILE is set
+    setup_metrics('vision')
+
+    subscription_key_csv = os.getenv("AZURE_COMPUTERVISION_CSV_KEY")
+    endpoint_csv = os.getenv("AZURE_COMPUTERVISION_CSV_ENDPOINT")
+
+    if not subscription_key_csv or not endpoint_csv:
+        raise ValueError("Missing Azure Computer Vision CSV credentials in environment variables.")
+
+    # authentication
+    client = ComputerVisionClient(endpoint_csv, CognitiveServicesCredentials(subscription_key_csv))
+
+    os.makedirs(analysis_folder, exist_ok=True)
+    os.makedirs(updated_images_folder, exist_ok=True)
+
+    cache = AnalysisCache(analysis_cache_file, max_distance=near_duplicate_distance) if use_analysis_cache else None
+    visual_features = rename_features if feature_mode == "rename" else full_features
+
+    taken_names = NameRegistry(updated_images_folder)
+
+    # sorted so the report and the collision suffixes are the same on every run
+    image_files = sorted(
+        filename for filename in os.listdir(image_folder) if os.path.isfile(os.path.join(image_folder, filename))
+    )
+
+    # each image's block is written and flushed as soon as it and every image
+    # before it are done, so a crash keeps the report up to that point
+    with open(output_file, "w", encoding="utf-8") as report, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for filename, (analysis, result_lines) in analyze_in_order(image_files, executor, visual_features):
+            lines = [f"Processing image: {filename}"] + result_lines
+            if analysis is not None:
+                try:
+                    lines.append(save_renamed_copy(filename, analysis))
+                except Exception as e:
+                    metrics.increment('errors')
+                    lines.append(f"  Skipped: Unexpected error: {e}")
+
+            print('\n'.join(lines))
+            with metrics.stage('write'):
+                report.write(''.join(line + "\n" for line in lines) + "\n")  # blank line between images
+                report.flush()
+
+        # opt-in detail pass: the full feature set, only for the images that need it
+        if detail_pass and visual_features != full_features:
+            detail_files = [
+                filename for filename in image_files
+                if any(fnmatch.fnmatch(filename, pattern) for pattern in detail_patterns)
+            ]
+            if not detail_patterns:
+                print("Detail pass skipped: no detail_patterns given")
+            print(f"Fetching full analysis for {len(detail_files)} images...")
+            with open(detail_output_file, "w", encoding="utf-8") as details:
+                for filename, (_, result_lines) in analyze_in_order(detail_files, executor, full_features):
+                    lines = [f"Processing image: {filename}"] + result_lines
+                    print('\n'.join(lines))
+                    with metrics.stage('write'):
+                        details.write(''.join(line + "\n" for line in lines) + "\n")
+                        details.flush()
+
+    if cache is not None:
+        cache.report()
+        cache.close()
+
+    print(f"Analysis complete. Results saved to {output_file}")
+    if detail_pass and visual_features != full_features:
+        print(f"Detailed results saved to {detail_output_file}")
+    print(f"Renamed images saved to folder: {updated_images_folder}")
+
+if __name__ == '__main__':
+    main()
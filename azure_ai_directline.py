@@ -0,0 +1,242 @@
+"""
+===============================================================================
+Program:      azure_ai_directline.py
+Description:  Direct Line 3.0 conversation client shared by azure_ai_bot.py
+              and azure_ai_bot_load.py. Receives bot activities from the
+              conversation's streamUrl WebSocket as soon as the bot sends
+              them, and falls back to polling with the watermark (so only new
+              activities are transferred) when the stream is unavailable.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+  - requests
+  - websocket-client (streaming; polling is used without it)
+
+Workflow:
+  1. Start a conversation and connect to its streamUrl
+  2. A reader thread adds every streamed activity to the conversation's
+     inbox (activities already seen are skipped by id)
+  3. Send messages through the shared PooledClient
+  4. replies() yields the bot's replies to a message as they arrive; in
+     polling mode it fetches activities since the last watermark, backing
+     off while nothing new arrives
+  5. If the stream drops, the conversation carries on by polling
+
+Usage:
+  - Imported by azure_ai_bot.py and azure_ai_bot_load.py
+
+Notes:
+  - One PooledClient can be shared by many conversations
+  - replies() stops reply_quiet seconds after the last reply, or after
+    timeout when the bot does not answer; replies that arrive later are
+    yielded by the next replies() call (counted as late_replies)
+  - Consumed activities are dropped and only the last seen_window ids are
+    kept for de-duplication, so long conversations stay flat in memory
+  - Stream and polling fallbacks are counted in azure_ai_metrics.metrics
+
+Example:
+  conversation = DirectLineConversation(client, endpoint, secret)
+  conversation.start()
+  activity_id = conversation.send("Hello from Python!")
+  for reply in conversation.replies(activity_id):
+      print(reply["text"])
+  conversation.close()
+===============================================================================
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+try:
+    import websocket
+except ImportError:  # websocket-client not installed, poll instead
+    websocket = None
+
+from azure_ai_metrics import metrics
+
+connect_timeout = 10      # seconds to open the WebSocket
+min_poll_interval = 0.1   # seconds between polls right after activity
+max_poll_interval = 1.0   # polling slows down to this while nothing arrives
+reply_quiet = 0.5         # seconds without another reply that end a turn
+seen_window = 1000        # recent activity ids kept to drop ones delivered twice
+
+
+class DirectLineConversation:
+    """
+    One Direct Line conversation, streamed over WebSocket or polled.
+    """
+
+    def __init__(self, client, endpoint, secret, user_id='user1', use_websocket=True):
+        self.client = client
+        self.endpoint = endpoint.rstrip('/')
+        self.headers = {"Authorization": f"Bearer {secret}"}
+        self.user_id = user_id
+        self.use_websocket = use_websocket and websocket is not None
+
+        self.conversation_id = None
+        self.stream_url = None
+        self.socket = None
+        self.closed = False
+
+        self.watermark = None
+        self.inbox = []        # activities received and not yet seen by replies()
+        self.seen = set()      # ids of the last seen_window activities
+        self.seen_order = deque()
+        self.changed = threading.Condition()
+        self.poll_interval = min_poll_interval
+
+    @property
+    def streaming(self):
+        return self.socket is not None
+
+    def start(self):
+        # Start the conversation and connect to its activity stream
+        response = self.client.post(
+            f"{self.endpoint}/conversations",
+            headers=self.headers,
+            idempotent=False  # a timed out create may still have opened a conversation
+        )
+        response.raise_for_status()
+        conversation = response.json()
+        self.conversation_id = conversation["conversationId"]
+        self.stream_url = conversation.get("streamUrl")
+
+        if self.use_websocket and self.stream_url:
+            try:
+                self.socket = websocket.create_connection(self.stream_url, timeout=connect_timeout)
+                self.socket.settimeout(None)
+            except (OSError, websocket.WebSocketException):
+                metrics.increment('stream_fallbacks')
+                self.socket = None
+            else:
+                threading.Thread(target=self.read_stream, daemon=True).start()
+        return self.conversation_id
+
+    def read_stream(self):
+        # Reader thread: hand every streamed activity set to receive()
+        socket = self.socket
+        try:
+            while not self.closed:
+                message = socket.recv()
+                if not message:
+                    continue  # the service sends empty keep-alive messages
+                data = json.loads(message)
+                self.receive(data.get("activities", []), data.get("watermark"))
+        except (OSError, ValueError, websocket.WebSocketException):
+            if not self.closed:
+                # carry on by polling from the last watermark
+                metrics.increment('stream_fallbacks')
+        with self.changed:
+            self.socket = None
+            self.changed.notify_all()
+
+    def receive(self, activities, watermark):
+        # Add new activities to the inbox; returns how many were new
+        added = 0
+        with self.changed:
+            for activity in activities:
+                activity_id = activity.get("id")
+                if activity_id in self.seen:
+                    continue
+                self.seen.add(activity_id)
+                self.seen_order.append(activity_id)
+                if len(self.seen_order) > seen_window:
+                    self.seen.discard(self.seen_order.popleft())
+                self.inbox.append(activity)
+                added += 1
+            if watermark is not None:
+                self.watermark = watermark
+            if added:
+                self.changed.notify_all()
+        metrics.increment('activities_received', added)
+        return added
+
+    def poll(self):
+        # Fetch only the activities after the last watermark
+        params = {"watermark": self.watermark} if self.watermark is not None else None
+        response = self.client.get(
+            f"{self.endpoint}/conversations/{self.conversation_id}/activities",
+            headers=self.headers, params=params
+        )
+        response.raise_for_status()
+        data = response.json()
+        return self.receive(data.get("activities", []), data.get("watermark"))
+
+    def send(self, text):
+        # Send a message and return its activity id
+        activity = {
+            "type": "message",
+            "from": {"id": self.user_id},
+            "text": text
+        }
+        response = self.client.post(
+            f"{self.endpoint}/conversations/{self.conversation_id}/activities",
+            headers=self.headers,
+            json=activity,
+            idempotent=False  # a timed out send may still have been delivered
+        )
+        response.raise_for_status()
+        return response.json().get("id")
+
+    def is_bot_message(self, activity):
+        return activity.get("type") == "message" and activity.get("from", {}).get("id") != self.user_id
+
+    def is_reply(self, activity, activity_id):
+        return self.is_bot_message(activity) and activity.get("replyToId") in (activity_id, None)
+
+    def replies(self, activity_id, timeout=10.0, quiet=reply_quiet):
+        # Yield the bot's replies to activity_id as they arrive; stops quiet
+        # seconds after the last reply, or after timeout if none arrives.
+        # Late replies to earlier messages (arriving after their own call
+        # ended) are yielded too, but don't extend or end the wait; callers
+        # can tell them apart with is_reply()
+        deadline = time.monotonic() + timeout
+        while True:
+            if not self.streaming:
+                if self.poll():
+                    self.poll_interval = min_poll_interval
+                else:
+                    self.poll_interval = min(max_poll_interval, self.poll_interval * 1.5)
+
+            with self.changed:
+                unread = deque(self.inbox)
+                self.inbox = []
+            try:
+                while unread:
+                    activity = unread.popleft()
+                    if self.is_reply(activity, activity_id):
+                        deadline = time.monotonic() + quiet
+                        yield activity
+                    elif self.is_bot_message(activity):
+                        metrics.increment('late_replies')
+                        yield activity
+            finally:
+                if unread:
+                    # the caller stopped early, keep the rest for the next call
+                    with self.changed:
+                        self.inbox[:0] = unread
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            with self.changed:
+                if self.streaming:
+                    if not self.inbox:
+                        self.changed.wait(remaining)
+                else:
+                    self.changed.wait(min(remaining, self.poll_interval))
+
+    def close(self):
+        self.closed = True
+        socket = self.socket
+        if socket is not None:
+            try:
+                socket.close()
+            except (OSError, websocket.WebSocketException):
+                pass
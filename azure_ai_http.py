@@ -0,0 +1,167 @@
+"""
+===============================================================================
+Program:      azure_ai_http.py
+Description:  Shared HTTP client for the REST-based tools (Translator and
+              Direct Line). Keeps a pool of keep-alive connections so requests
+              reuse TCP+TLS sessions, and adds retries with jitter, gzip,
+              timeouts and a fresh trace ID for every request.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+  - requests
+
+Workflow:
+  1. Create one PooledClient per script (or per worker pool)
+  2. Send requests through client.get / client.post
+  3. Connection errors, timeouts and retryable status codes (429 and 5xx)
+     are retried with exponential backoff and full jitter, honouring
+     Retry-After when the service sends it
+  4. Requests, retries, throttles, bytes sent and service latency are
+     recorded in azure_ai_metrics.metrics
+  5. Close the client at the end of the run
+
+Usage:
+  - Imported by azure_ai_translate.py, azure_ai_translate_csv.py and
+    azure_ai_bot.py
+
+Notes:
+  - Set pool_size to the number of concurrent requests the script makes
+  - Pass retries=0 to handle throttling yourself (e.g. with a rate limiter)
+  - Pass idempotent=False for requests that must not be repeated once sent:
+    they are only retried on 429 or when the connection could not be opened
+  - compress_requests gzips JSON bodies; only enable it for services that
+    accept Content-Encoding: gzip
+
+Example:
+  client = PooledClient(pool_size=8)
+  response = client.post(url, headers=headers, json=body)
+  client.close()
+===============================================================================
+"""
+
+import gzip
+import json
+import random
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from azure_ai_metrics import metrics
+
+default_timeout = (3.05, 30)  # seconds to connect, seconds to read
+default_retry_statuses = (429, 500, 502, 503, 504)
+min_compress_bytes = 1024  # smaller bodies are not worth compressing
+
+
+class PooledClient:
+    """
+    Keep-alive requests session with a bounded connection pool and retries.
+    """
+
+    def __init__(self, pool_size=10, max_retries=3, backoff=0.5, max_backoff=30.0,
+                 timeout=default_timeout, retry_statuses=default_retry_statuses,
+                 compress_requests=False, service='http'):
+        self.service = service  # label for the latency histogram
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.retry_statuses = retry_statuses
+        self.compress_requests = compress_requests
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    def backoff_delay(self, attempt):
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(response):
+        try:
+            return max(0.0, float(response.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def never_sent(error):
+        # True when the connection failed before any of the request was sent
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+    def request(self, method, url, headers=None, json_body=None, retries=None,
+                retry_statuses=None, idempotent=True, trace=True, **kwargs):
+        retries = self.max_retries if retries is None else retries
+        retry_statuses = self.retry_statuses if retry_statuses is None else retry_statuses
+        kwargs.setdefault('timeout', self.timeout)
+
+        headers = dict(headers or {})
+        if trace:
+            # one trace ID per logical request, shared by its retries
+            headers['X-ClientTraceId'] = str(uuid.uuid4())
+        if json_body is not None:
+            data = json.dumps(json_body, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json; charset=UTF-8'
+            if self.compress_requests and len(data) >= min_compress_bytes:
+                data = gzip.compress(data)
+                headers['Content-Encoding'] = 'gzip'
+            kwargs['data'] = data
+
+        body = kwargs.get('data')
+        body_bytes = len(body) if isinstance(body, (bytes, str)) else 0
+
+        for attempt in range(retries + 1):
+            metrics.increment('requests')
+            metrics.increment('bytes_sent', body_bytes)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except requests.ConnectionError as e:
+                metrics.increment('errors')
+                # a dropped connection may mean the request was processed
+                if attempt == retries or not (idempotent or self.never_sent(e)):
+                    raise
+                delay = self.backoff_delay(attempt)
+            except requests.Timeout:
+                metrics.increment('errors')
+                # a read timeout may mean the request was processed
+                if attempt == retries or not idempotent:
+                    raise
+                delay = self.backoff_delay(attempt)
+            else:
+                metrics.observe('request_seconds', time.perf_counter() - started, self.service)
+                if response.status_code in (429, 503):
+                    metrics.increment('throttles')
+                elif response.status_code >= 400:
+                    metrics.increment('errors')
+                # a 5xx may come after the request was processed, a 429 never does
+                retryable = response.status_code in retry_statuses and (idempotent or response.status_code == 429)
+                if not retryable or attempt == retries:
+                    return response
+                delay = self.retry_after(response)
+                if delay is None:
+                    delay = self.backoff_delay(attempt)
+                response.close()
+            metrics.increment('retries')
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, json=None, **kwargs):
+        return self.request('POST', url, json_body=json, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,247 @@
+"""
+===============================================================================
+Program:      azure_ai_metrics.py
+Description:  Lightweight run metrics shared by all tools in this repository.
+              Records per-stage timings (file read, upload, service latency,
+              parse, write), counters (requests, retries, throttles, bytes
+              sent) and latency histograms, and exports them as JSON or
+              Prometheus text at the end of a run and optionally on an
+              interval.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+
+Environment Variables (optional):
+  - AZURE_AI_METRICS_FILE     : file to export metrics to (nothing is written
+                                when unset)
+  - AZURE_AI_METRICS_FORMAT   : 'json' or 'prometheus' (default: from the
+                                file extension, .prom means prometheus)
+  - AZURE_AI_METRICS_INTERVAL : also export every N seconds while running
+
+Workflow:
+  1. A tool calls setup('<tool name>') once at start-up
+  2. Stages are timed with 'with metrics.stage("read"):'
+  3. Counters are bumped with metrics.increment('requests')
+  4. The shared HTTP client records requests, retries, throttles, bytes and
+     service latency automatically
+  5. Metrics are exported when the process exits
+
+Usage:
+  - from azure_ai_metrics import setup
+  - metrics = setup('translate_csv')
+
+Notes:
+  - Histograms use fixed buckets, so memory stays flat on long runs
+  - Percentiles in the JSON export are estimated from the buckets
+
+Example:
+  AZURE_AI_METRICS_FILE=metrics.prom python azure_ai_translate_csv.py
+===============================================================================
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# histogram bucket upper bounds in seconds
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram.
+    """
+
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, pct):
+        # Interpolate within the bucket that holds the requested rank
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                upper = self.max if bound == float('inf') else min(bound, self.max)
+                lower = max(lower, self.min)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'p50': round(self.percentile(50), 6),
+            'p95': round(self.percentile(95), 6),
+            'p99': round(self.percentile(99), 6),
+            'buckets': {('+Inf' if b == float('inf') else f"{b:g}"): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and histograms for one run.
+    Histograms are keyed by name and one optional label (e.g. the stage).
+    """
+
+    def __init__(self, tool='unknown'):
+        self.tool = tool
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.exporter = None
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds, label=None):
+        with self.lock:
+            key = (name, label)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        # Time a block of work as one observation of the given stage
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, name)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'tool': self.tool,
+                'started': self.started,
+                'elapsed_seconds': round(time.time() - self.started, 3),
+                'counters': dict(self.counters),
+                'histograms': {
+                    name if label is None else f"{name}{{{label}}}": histogram.as_dict()
+                    for (name, label), histogram in self.histograms.items()
+                },
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        tool = f'tool="{self.tool}"'
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE azure_ai_{name}_total counter")
+                lines.append(f"azure_ai_{name}_total{{{tool}}} {value}")
+
+            by_name = {}
+            for (name, label), histogram in self.histograms.items():
+                by_name.setdefault(name, []).append((label, histogram))
+            for name, entries in sorted(by_name.items()):
+                lines.append(f"# TYPE azure_ai_{name} histogram")
+                for label, histogram in sorted(entries, key=lambda e: str(e[0])):
+                    labels = tool if label is None else f'{tool},{label_name(name)}="{label}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                        lines.append(f'azure_ai_{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                    lines.append(f"azure_ai_{name}_sum{{{labels}}} {histogram.total:.6f}")
+                    lines.append(f"azure_ai_{name}_count{{{labels}}} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, format=None):
+        # Write to a temporary file first so readers never see a partial export;
+        # each export gets its own, so overlapping exports can't mix their output
+        if format is None:
+            format = 'prometheus' if path.endswith('.prom') else 'json'
+        content = self.to_prometheus() if format == 'prometheus' else self.to_json()
+        folder, name = os.path.split(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=folder, prefix=name + '.',
+                                         suffix='.tmp', delete=False) as f:
+            f.write(content)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+    def start_interval_export(self, path, interval, format=None):
+        # Export every interval seconds from a background thread
+        def run():
+            while not stop.wait(interval):
+                self.export(path, format)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=run, daemon=True)
+        self.exporter = (stop, thread)
+        thread.start()
+
+    def stop_interval_export(self):
+        # Wait for an export in progress, so the final one is written last
+        if self.exporter:
+            stop, thread = self.exporter
+            self.exporter = None
+            stop.set()
+            thread.join()
+
+
+def label_name(histogram_name):
+    # stage_seconds{stage="..."}, request_seconds{service="..."}
+    return 'service' if histogram_name == 'request_seconds' else 'stage'
+
+
+# one registry per process, shared by the tool and azure_ai_http.py
+metrics = Metrics()
+
+
+def setup(tool):
+    # Name the run and export on exit (and on an interval) when configured
+    metrics.tool = tool
+    path = os.getenv('AZURE_AI_METRICS_FILE')
+    if not path:
+        return metrics
+
+    format = os.getenv('AZURE_AI_METRICS_FORMAT') or None
+    interval = float(os.getenv('AZURE_AI_METRICS_INTERVAL') or 0)
+    if interval > 0:
+        metrics.start_interval_export(path, interval, format)
+
+    def export_at_exit():
+        metrics.stop_interval_export()
+        metrics.export(path, format)
+
+    atexit.register(export_at_exit)
+    return metrics
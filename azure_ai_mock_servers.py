@@ -0,0 +1,592 @@
+"""
+===============================================================================
+Program:      azure_ai_mock_servers.py
+Description:  Local stand-ins for the Azure services used by the tools in this
+              repository, so they can be run and load-tested offline without
+              burning quota. Serves the Translator /translate endpoint, Direct
+              Line conversations/activities, Text Analytics sentiment and
+              Computer Vision analyze from a single local HTTP server.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.7+
+
+Endpoints:
+  - POST /translate                                 (Translator v3)
+  - POST /v3/directline/conversations               (Direct Line 3.0)
+  - POST /v3/directline/conversations/{id}/activities
+  - GET  /v3/directline/conversations/{id}/activities?watermark=N
+  - GET  /v3/directline/conversations/{id}/stream   (streamUrl WebSocket)
+  - POST /text/analytics/v3.x/sentiment             (Text Analytics v3)
+  - POST /language/:analyze-text                    (Language API)
+  - POST /vision/v3.x/analyze                       (Computer Vision v3)
+
+Workflow:
+  1. Start the server with the latency and failure settings to simulate
+  2. Point the tools at it through their usual environment variables
+  3. Every request waits for the configured latency, then is answered with
+     a throttle (429 + Retry-After), a server error (500) or a
+     deterministic fake result
+  4. Per-request service times are recorded for the benchmark suite
+
+Usage:
+  - python azure_ai_mock_servers.py --port 8000 --latency 0.05
+  - Set the tool's endpoint variable to http://127.0.0.1:8000 (see output)
+  - Any key/secret value is accepted
+
+Notes:
+  - Results are derived from a hash of the input, so reruns are repeatable
+  - Request limits (elements, characters, documents, image size) follow the
+    real services so batching logic can be exercised
+  - Speech is not covered, the Speech SDK uses its own WebSocket protocol
+
+Example:
+  python azure_ai_mock_servers.py --latency 0.1 --error-rate 0.01 --throttle-rate 0.05
+===============================================================================
+"""
+
+import argparse
+import base64
+import hashlib
+import heapq
+import json
+import random
+import re
+import select
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# request limits of the real services
+translator_max_elements = 1000
+translator_max_chars = 50000
+sentiment_max_documents = 10
+sentiment_max_chars = 5120
+vision_max_image_bytes = 4 * 1024 * 1024
+
+websocket_guid = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'  # RFC 6455 handshake constant
+stream_check_interval = 0.5  # seconds between checks for a closed stream
+
+positive_words = {'love', 'great', 'good', 'excellent', 'amazing', 'happy', 'best', 'awesome', 'nice', 'thanks'}
+negative_words = {'hate', 'bad', 'terrible', 'awful', 'worst', 'poor', 'sad', 'broken', 'angry', 'disappointed'}
+vision_objects = ['person', 'dog', 'cat', 'car', 'bicycle', 'tree', 'building', 'cup', 'laptop', 'chair']
+
+
+def stable_fraction(data, salt=''):
+    # A repeatable number in [0, 1) derived from the input
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    digest = hashlib.sha256(salt.encode('utf-8') + data).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def error_body(code, message):
+    return {'error': {'code': code, 'message': message}}
+
+
+class MockState:
+    """
+    Settings, conversations and recorded request timings shared by all
+    handler threads.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.2, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1.0, bot_delay=0.2, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.bot_delay = bot_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.timings = []
+        self.conversations = {}
+
+    def request_delay(self):
+        with self.lock:
+            spread = self.latency * self.jitter
+            return max(0.0, self.random.uniform(self.latency - spread, self.latency + spread))
+
+    def injected_failure(self):
+        # Return 429, 500 or None for a normal answer
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def record(self, service, status, seconds, request_bytes):
+        with self.lock:
+            self.timings.append((service, status, seconds, request_bytes))
+
+    def take_timings(self):
+        # Return and clear everything recorded so far
+        with self.lock:
+            timings = self.timings
+            self.timings = []
+        return timings
+
+
+class Conversation:
+    """
+    Direct Line conversation with an echo bot that replies after a delay.
+    Activities only ever get appended, so the watermark is the list length.
+    """
+
+    def __init__(self, conversation_id):
+        self.conversation_id = conversation_id
+        self.activities = []
+        self.pending = []  # heap of (ready_at, sequence, activity)
+        self.sequence = 0
+        self.lock = threading.Condition()  # notified when an activity is posted
+
+    def next_id(self):
+        self.sequence += 1
+        return f"{self.conversation_id}|{self.sequence:07d}"
+
+    def release_ready(self):
+        now = time.time()
+        while self.pending and self.pending[0][0] <= now:
+            self.activities.append(heapq.heappop(self.pending)[2])
+
+    def post(self, activity, bot_delay):
+        with self.lock:
+            self.release_ready()
+            activity = dict(activity, id=self.next_id(), conversation={'id': self.conversation_id})
+            self.activities.append(activity)
+            if activity.get('type') == 'message':
+                reply = {
+                    'type': 'message',
+                    'id': self.next_id(),
+                    'from': {'id': 'mock-bot', 'name': 'Mock Bot'},
+                    'conversation': {'id': self.conversation_id},
+                    'replyToId': activity['id'],
+                    'text': f"You said: {activity.get('text', '')}"
+                }
+                heapq.heappush(self.pending, (time.time() + bot_delay, self.sequence, reply))
+            self.lock.notify_all()
+            return activity['id']
+
+    def since(self, watermark):
+        with self.lock:
+            self.release_ready()
+            return self.activities[watermark:], len(self.activities)
+
+    def wait_since(self, watermark, timeout):
+        # Like since(), but wait up to timeout for something new, waking up
+        # when a pending bot reply becomes due
+        deadline = time.time() + timeout
+        with self.lock:
+            while True:
+                self.release_ready()
+                now = time.time()
+                if len(self.activities) > watermark or now >= deadline:
+                    return self.activities[watermark:], len(self.activities)
+                wake = min(deadline, self.pending[0][0]) if self.pending else deadline
+                self.lock.wait(max(0.0, wake - now))
+
+
+def websocket_frame(payload, opcode=0x1):
+    # One unmasked, unfragmented server frame (0x1 text, 0x8 close, 0xA pong)
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def translate(body, query):
+    targets = query.get('to', [])
+    targets = [lang for value in targets for lang in value.split(',')]
+    if not isinstance(body, list) or not targets:
+        return 400, error_body('400000', 'One of the request inputs is not valid.')
+    if len(body) > translator_max_elements:
+        return 400, error_body('400077', 'The maximum array size has been exceeded.')
+    if sum(len(item.get('text', '')) for item in body) * len(targets) > translator_max_chars:
+        return 400, error_body('400050', 'The input text is too long.')
+    return 200, [
+        {'translations': [{'text': f"[{lang}] {item.get('text', '')}", 'to': lang} for lang in targets]}
+        for item in body
+    ]
+
+
+def score_sentiment(text):
+    words = re.findall(r"[a-z']+", text.lower())
+    positive = sum(word in positive_words for word in words)
+    negative = sum(word in negative_words for word in words)
+    total = positive + negative + 1
+    scores = {'positive': positive / total, 'neutral': 1 / total, 'negative': negative / total}
+    sentiment = max(scores, key=scores.get)
+    if positive and negative:
+        sentiment = 'mixed'
+    return sentiment, {k: round(v, 2) for k, v in scores.items()}
+
+
+def analyze_sentiment_documents(documents):
+    results, errors = [], []
+    for document in documents:
+        text = document.get('text', '')
+        if not text.strip() or len(text) > sentiment_max_chars:
+            errors.append({
+                'id': document.get('id'),
+                'error': {
+                    'code': 'InvalidArgument',
+                    'message': 'Invalid document in request.',
+                    'innererror': {
+                        'code': 'InvalidDocument',
+                        'message': 'Document text is empty or exceeds the maximum length.'
+                    }
+                }
+            })
+            continue
+        sentiment, scores = score_sentiment(text)
+        results.append({
+            'id': document.get('id'),
+            'sentiment': sentiment,
+            'confidenceScores': scores,
+            'sentences': [{
+                'text': text,
+                'sentiment': 'neutral' if sentiment == 'mixed' else sentiment,
+                'confidenceScores': scores,
+                'offset': 0,
+                'length': len(text),
+                'targets': [],
+                'assessments': []
+            }],
+            'warnings': []
+        })
+    return results, errors
+
+
+def text_analytics_sentiment(body):
+    documents = (body or {}).get('documents', [])
+    if len(documents) > sentiment_max_documents:
+        return 400, error_body('InvalidRequest', 'Batch request contains too many records.')
+    results, errors = analyze_sentiment_documents(documents)
+    return 200, {'documents': results, 'errors': errors, 'modelVersion': '2022-11-01'}
+
+
+def language_analyze_text(body):
+    documents = ((body or {}).get('analysisInput') or {}).get('documents', [])
+    if (body or {}).get('kind') != 'SentimentAnalysis':
+        return 400, error_body('InvalidRequest', 'Only SentimentAnalysis is mocked.')
+    if len(documents) > sentiment_max_documents:
+        return 400, error_body('InvalidRequest', 'Batch request contains too many records.')
+    results, errors = analyze_sentiment_documents(documents)
+    return 200, {
+        'kind': 'SentimentAnalysisResults',
+        'results': {'documents': results, 'errors': errors, 'modelVersion': '2022-11-01'}
+    }
+
+
+def analyze_image(data, query):
+    if not data:
+        return 400, error_body('InvalidImageFormat', 'Input data is not a valid image.')
+    if len(data) > vision_max_image_bytes:
+        return 400, error_body('InvalidImageSize', 'Image must be less than 4MB.')
+
+    features = {f.lower() for value in query.get('visualFeatures', []) for f in value.split(',')}
+    pick = int(stable_fraction(data) * len(vision_objects))
+    name = vision_objects[pick]
+    confidence = round(0.5 + stable_fraction(data, 'confidence') / 2, 3)
+    rectangle = {'x': 10, 'y': 10, 'w': 100, 'h': 100}
+
+    result = {'requestId': str(uuid.uuid4()), 'metadata': {'width': 640, 'height': 480, 'format': 'Jpeg'}}
+    if 'categories' in features:
+        result['categories'] = [{'name': f"others_{name}", 'score': confidence}]
+    if 'tags' in features:
+        result['tags'] = [{'name': name, 'confidence': confidence}, {'name': 'indoor', 'confidence': 0.5}]
+    if 'description' in features:
+        result['description'] = {
+            'tags': [name],
+            'captions': [{'text': f"a {name} in a room", 'confidence': confidence}]
+        }
+    if 'faces' in features:
+        result['faces'] = [{'age': 30, 'gender': 'Male', 'faceRectangle': {
+            'left': 10, 'top': 10, 'width': 50, 'height': 50
+        }}] if name == 'person' else []
+    if 'objects' in features:
+        result['objects'] = [{'rectangle': rectangle, 'object': name, 'confidence': confidence}]
+    if 'color' in features:
+        result['color'] = {
+            'dominantColorForeground': 'Grey', 'dominantColorBackground': 'White',
+            'dominantColors': ['Grey', 'White'], 'accentColor': '6B5B4C', 'isBwImg': False, 'isBWImg': False
+        }
+    if 'brands' in features:
+        result['brands'] = []
+    if 'adult' in features:
+        result['adult'] = {
+            'isAdultContent': False, 'isRacyContent': False, 'isGoryContent': False,
+            'adultScore': 0.01, 'racyScore': 0.01, 'goreScore': 0.01
+        }
+    return 200, result
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real services
+    state = None  # set by create_server
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if 'chunked' in (self.headers.get('Transfer-Encoding') or '').lower():
+            # the SDKs stream uploads (e.g. images) with chunked encoding
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    self.rfile.readline()  # blank line after the last chunk
+                    return b''.join(parts)
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()  # CRLF after each chunk
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def read_client_frame(self):
+        # Return (opcode, payload) of a masked client frame, or (None, b'') at EOF
+        header = self.rfile.read(2)
+        if len(header) < 2:
+            return None, b''
+        opcode = header[0] & 0x0F
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if header[1] & 0x80 else b'\0\0\0\0'
+        payload = self.rfile.read(length)
+        return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+    def stream_activities(self, conversation, query):
+        # Direct Line streamUrl: upgrade to a WebSocket and push every new
+        # activity set as {"activities": [...], "watermark": "N"}
+        key = self.headers.get('Sec-WebSocket-Key')
+        if not key or 'websocket' not in (self.headers.get('Upgrade') or '').lower():
+            self.send_json(400, error_body('BadArgument', 'Expected a WebSocket upgrade.'))
+            return
+        accept = base64.b64encode(hashlib.sha1((key + websocket_guid).encode('ascii')).digest()).decode('ascii')
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        try:
+            watermark = int(query.get('watermark', [''])[0])
+        except ValueError:
+            # like the real service, a new stream starts at the current end
+            watermark = conversation.since(0)[1]
+
+        try:
+            while True:
+                activities, watermark = conversation.wait_since(watermark, stream_check_interval)
+                if activities:
+                    message = json.dumps({'activities': activities, 'watermark': str(watermark)})
+                    self.wfile.write(websocket_frame(message.encode('utf-8')))
+                    self.wfile.flush()
+                if select.select([self.connection], [], [], 0)[0]:
+                    opcode, payload = self.read_client_frame()
+                    if opcode is None or opcode == 0x8:
+                        self.wfile.write(websocket_frame(b'', 0x8))
+                        return
+                    if opcode == 0x9:
+                        self.wfile.write(websocket_frame(payload, 0xA))
+        except (ConnectionError, OSError):
+            return  # client went away
+
+    def route(self, method, path):
+        # Return the service name for a request, or None if it is unknown
+        if method == 'POST' and path.endswith('/translate'):
+            return 'translator'
+        if '/v3/directline/conversations' in path:
+            return 'directline'
+        if method == 'POST' and re.search(r'/text/analytics/v3\.\d+(-preview\.\d+)?/sentiment$', path):
+            return 'sentiment'
+        if method == 'POST' and path.endswith('/language/:analyze-text'):
+            return 'sentiment'
+        if method == 'POST' and re.search(r'/vision/v3\.\d+/analyze$', path):
+            return 'vision'
+        return None
+
+    def handle_request(self, method):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        raw = self.read_body()
+        service = self.route(method, url.path)
+
+        stream = re.search(r'/conversations/([^/]+)/stream$', url.path)
+        if service == 'directline' and method == 'GET' and stream:
+            conversation = self.state.conversations.get(stream.group(1))
+            if conversation is None:
+                self.send_json(404, error_body('BadArgument', 'Conversation not found.'))
+            else:
+                self.stream_activities(conversation, query)
+            return
+
+        if service is None:
+            status = 404
+            self.send_json(status, error_body('NotFound', f"No mock for {method} {url.path}"))
+            self.state.record('unknown', status, time.perf_counter() - started, len(raw))
+            return
+
+        time.sleep(self.state.request_delay())
+
+        failure = self.state.injected_failure()
+        if failure == 429:
+            status = 429
+            self.send_json(status, error_body('429000', 'Too many requests.'),
+                           {'Retry-After': f"{self.state.retry_after:g}"})
+        elif failure == 500:
+            status = 500
+            self.send_json(status, error_body('500000', 'Injected server error.'))
+        else:
+            status, payload = self.answer(service, method, url.path, query, raw)
+            self.send_json(status, payload)
+
+        self.state.record(service, status, time.perf_counter() - started, len(raw))
+
+    def answer(self, service, method, path, query, raw):
+        if service == 'vision':
+            return analyze_image(raw, query)
+
+        try:
+            body = json.loads(raw.decode('utf-8')) if raw else None
+        except ValueError:
+            return 400, error_body('InvalidRequest', 'Request body is not valid JSON.')
+
+        if service == 'translator':
+            return translate(body, query)
+        if service == 'sentiment':
+            if path.endswith('/language/:analyze-text'):
+                return language_analyze_text(body)
+            return text_analytics_sentiment(body)
+        return self.direct_line(method, path, query, body)
+
+    def direct_line(self, method, path, query, body):
+        conversations = self.state.conversations
+        match = re.search(r'/conversations/([^/]+)/activities$', path)
+        if method == 'POST' and path.endswith('/conversations'):
+            conversation_id = uuid.uuid4().hex
+            with self.state.lock:
+                conversations[conversation_id] = Conversation(conversation_id)
+            stream_url = f"ws://{self.headers.get('Host')}{path}/{conversation_id}/stream?t=mock-token"
+            return 201, {
+                'conversationId': conversation_id, 'token': 'mock-token', 'expires_in': 3600, 'streamUrl': stream_url
+            }
+        if not match or match.group(1) not in conversations:
+            return 404, error_body('BadArgument', 'Conversation not found.')
+
+        conversation = conversations[match.group(1)]
+        if method == 'POST':
+            return 200, {'id': conversation.post(body or {}, self.state.bot_delay)}
+        try:
+            watermark = int(query.get('watermark', ['0'])[0] or 0)
+        except ValueError:
+            watermark = 0
+        activities, watermark = conversation.since(watermark)
+        return 200, {'activities': activities, 'watermark': str(watermark)}
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+def create_server(state, host='127.0.0.1', port=0):
+    # Build a server bound to (host, port); port 0 picks a free port
+    handler = type('BoundMockHandler', (MockHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(state, host='127.0.0.1', port=0):
+    # Start a server thread and return (server, base_url)
+    server = create_server(state, host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def tool_environment(base_url):
+    # Environment variables that point every tool at the stand-in server
+    return {
+        'AZURE_TRANSLATOR_KEY': 'mock-key',
+        'AZURE_TRANSLATOR_ENDPOINT': base_url,
+        'AZURE_TRANSLATOR_LOCATION': 'mock-region',
+        'AZURE_TRANSLATOR_CSV_KEY': 'mock-key',
+        'AZURE_TRANSLATOR_CSV_ENDPOINT': base_url,
+        'AZURE_TRANSLATOR_CSV_REGION': 'mock-region',
+        'DIRECT_LINE_SECRET': 'mock-secret',
+        'DIRECT_LINE_ENDPOINT': f"{base_url}/v3/directline",
+        'AZURE_TEXTANALYTICS_ENDPOINT': base_url,
+        'AZURE_TEXTANALYTICS_KEY': 'mock-key',
+        'AZURE_COMPUTERVISION_CSV_ENDPOINT': base_url,
+        'AZURE_COMPUTERVISION_CSV_KEY': 'mock-key',
+    }
+
+
+def add_arguments(parser):
+    # Mock settings shared with the benchmark suite
+    parser.add_argument('--latency', type=float, default=0.05, help='mean service latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.2, help='latency spread as a fraction of the mean')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429')
+    parser.add_argument('--bot-delay', type=float, default=0.2, help='seconds before the echo bot replies')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for repeatable runs')
+
+
+def state_from_arguments(args):
+    return MockState(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        bot_delay=args.bot_delay, seed=args.seed
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-ins for the Azure AI services.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = create_server(state_from_arguments(args), args.host, args.port)
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"Mock Azure services listening on {base_url}")
+    print("Point the tools at it with:")
+    for name, value in tool_environment(base_url).items():
+        print(f"  {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
@@ -0,0 +1,187 @@
+"""
+===============================================================================
+Program:      azure_ai_sentiment_lexicon.py
+Description:  Local sentiment prefilter for azure_ai_social_comments.py.
+              Scores short comments against a small built-in word list so
+              obviously positive or negative comments ("love it!!!", "worst
+              ever") can be decided in-process, and only ambiguous ones are
+              sent to Azure Cognitive Services Text Analytics.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+
+Workflow:
+  1. Split the comment into words, emoticons and exclamation marks
+  2. Add up positive and negative word weights, flipping words that follow
+     a negation ("not good") and boosting words after an intensifier
+     ("really bad") and in comments with exclamation marks
+  3. Weight the clause after "but" over the clause before it
+  4. Turn the totals into positive/neutral/negative scores; the confidence
+     is the gap between the positive and negative score
+  5. Compare local and Azure labels in a calibration report so the
+     confidence threshold can be tuned; comments above the threshold are
+     only sampled, so they are weighted back up in the shares
+
+Usage:
+  - Imported by azure_ai_social_comments.py
+
+Notes:
+  - Comments longer than max_chars are never decided locally
+  - Comments without any sentiment words get confidence 0
+  - Extend positive_words / negative_words for your own domain
+
+Example:
+  label, confidence, scores = classify('love it!!!')
+  # ('positive', 0.8969, {'positive': 0.8969, 'neutral': 0.1031, 'negative': 0.0})
+===============================================================================
+"""
+
+import re
+
+max_chars = 280  # longer comments are left to the service
+prior = 0.5      # weight of the neutral class, so one mild word is not enough
+
+positive_words = {
+    'love': 3, 'loved': 3, 'loving': 2.5, 'amazing': 3, 'awesome': 3, 'excellent': 3,
+    'fantastic': 3, 'brilliant': 3, 'perfect': 3, 'outstanding': 3, 'wonderful': 3,
+    'best': 2.5, 'great': 2, 'superb': 3, 'delighted': 3, 'thrilled': 3,
+    'good': 1.5, 'nice': 1.5, 'happy': 2, 'glad': 1.5, 'like': 1, 'liked': 1,
+    'enjoy': 2, 'enjoyed': 2, 'recommend': 2, 'recommended': 2, 'thanks': 1.5,
+    'thank': 1.5, 'helpful': 2, 'beautiful': 2.5, 'fun': 1.5, 'cool': 1.5,
+    'impressive': 2.5, 'pleased': 2, 'satisfied': 2, 'easy': 1, 'fast': 1,
+    ':)': 2, ':-)': 2, ':d': 2, '<3': 2.5, '😀': 2, '😍': 3, '👍': 2, '❤️': 2.5, '❤': 2.5,
+}
+
+negative_words = {
+    'hate': 3, 'hated': 3, 'worst': 3, 'terrible': 3, 'awful': 3, 'horrible': 3,
+    'disgusting': 3, 'pathetic': 3, 'useless': 3, 'garbage': 3, 'trash': 2.5,
+    'scam': 3, 'rubbish': 2.5, 'disappointed': 2.5, 'disappointing': 2.5,
+    'bad': 2, 'poor': 2, 'broken': 2, 'angry': 2.5, 'annoying': 2, 'sucks': 2.5,
+    'slow': 1, 'expensive': 1, 'boring': 2, 'waste': 2.5, 'refund': 1.5,
+    'sad': 2, 'fail': 2, 'failed': 2, 'rude': 2.5, 'ugly': 2,
+    ':(': 2, ':-(': 2, "):": 2, '😡': 3, '😠': 3, '👎': 2, '😢': 2,
+}
+
+negations = {'not', 'no', 'never', "don't", 'dont', "doesn't", 'doesnt', "didn't", 'didnt',
+             "isn't", 'isnt', "wasn't", 'wasnt', "can't", 'cant', "won't", 'wont', 'nothing', 'hardly'}
+intensifiers = {'very': 1.5, 'really': 1.5, 'so': 1.3, 'extremely': 2, 'absolutely': 1.8,
+                'totally': 1.5, 'super': 1.5, 'incredibly': 1.8}
+negation_reach = 3  # words after a negation that are flipped
+
+token_pattern = re.compile(r"[:;]-?[()dp]|\):|<3|[\w']+|!|[^\w\s]", re.UNICODE)
+
+
+def tokenize(text):
+    return token_pattern.findall(text.lower())
+
+
+def polarity_totals(text):
+    # Return the (positive, negative) weight totals of a comment
+    tokens = tokenize(text)
+    totals = [0.0, 0.0]
+    negated = 0
+    boost = 1.0
+    clause_weight = 1.0
+    exclaim = 1.0 + 0.15 * min(3, text.count('!'))
+
+    # "but" shifts the weight to what follows it
+    if 'but' in tokens:
+        clause_weight = 0.5
+
+    for token in tokens:
+        if token == 'but':
+            clause_weight = 1.5
+            negated = 0
+            continue
+        if token in negations:
+            negated = negation_reach
+            continue
+        if token in intensifiers:
+            boost = intensifiers[token]
+            continue
+
+        weight = positive_words.get(token, 0.0) - negative_words.get(token, 0.0)
+        if weight:
+            if negated:
+                # "not good" is weaker than "bad"
+                weight = -weight * 0.75
+            weight *= boost * clause_weight * exclaim
+            totals[0 if weight > 0 else 1] += abs(weight)
+        boost = 1.0
+        if negated:
+            negated -= 1
+    return totals
+
+
+def classify(text):
+    # Return (label, confidence, scores) where scores has positive, neutral
+    # and negative keys that add up to 1
+    if len(text) > max_chars:
+        return 'neutral', 0.0, {'positive': 0.0, 'neutral': 1.0, 'negative': 0.0}
+
+    positive, negative = polarity_totals(text)
+    total = positive + negative + prior
+    scores = {
+        'positive': round(positive / total, 4),
+        'neutral': round(prior / total, 4),
+        'negative': round(negative / total, 4),
+    }
+    confidence = abs(scores['positive'] - scores['negative'])
+    if positive > negative:
+        label = 'positive'
+    elif negative > positive:
+        label = 'negative'
+    else:
+        label = 'neutral'
+    return label, confidence, scores
+
+
+def calibration_bands(rows, band_width=0.1, threshold=0.0, sample_rate=1.0):
+    # rows are (local label, local confidence, service label); returns one
+    # dict per confidence band with the agreement in that band and what a
+    # threshold at the bottom of the band would decide locally. Comments at
+    # or above threshold were only compared at sample_rate, so each of those
+    # rows stands for 1 / sample_rate comments in the shares
+    bands = int(round(1 / band_width))
+    counts = [[0, 0, 0.0, 0.0] for _ in range(bands)]  # [compared, agreed, weighted compared, weighted agreed]
+    for local_label, confidence, service_label in rows:
+        band = min(bands - 1, int(confidence / band_width))
+        weight = 1 / sample_rate if confidence >= threshold and sample_rate > 0 else 1.0
+        agreed = local_label == service_label
+        counts[band][0] += 1
+        counts[band][1] += agreed
+        counts[band][2] += weight
+        counts[band][3] += weight * agreed
+
+    report = []
+    total = sum(band[2] for band in counts)
+    above = [0.0, 0.0]
+    for band in reversed(range(bands)):
+        compared, agreed, weighted, weighted_agreed = counts[band]
+        above[0] += weighted
+        above[1] += weighted_agreed
+        report.append({
+            'threshold': round(band * band_width, 2),
+            'compared': compared,
+            'agreement': agreed / compared if compared else None,
+            'local_share': above[0] / total if total else 0.0,
+            'agreement_above': above[1] / above[0] if above[0] else None,
+        })
+    return list(reversed(report))
+
+
+def format_calibration(rows, band_width=0.1, threshold=0.0, sample_rate=1.0):
+    # Text table of calibration_bands for the console
+    lines = [f"{'threshold':>9}  {'compared':>8}  {'agree':>6}  {'local share':>11}  {'agree above':>11}"]
+    for band in calibration_bands(rows, band_width, threshold, sample_rate):
+        agreement = '-' if band['agreement'] is None else f"{band['agreement']:.1%}"
+        agreement_above = '-' if band['agreement_above'] is None else f"{band['agreement_above']:.1%}"
+        lines.append(
+            f"{band['threshold']:>9.2f}  {band['compared']:>8}  {agreement:>6}  "
+            f"{band['local_share']:>11.1%}  {agreement_above:>11}"
+        )
+    return '\n'.join(lines)
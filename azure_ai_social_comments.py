@@ -14,6 +14,8 @@ Dependencies:
   - Python 3.6+
   - azure-ai-textanalytics
   - azure-core
+  - pyarrow (parquet output mode)
+  - aiohttp (async mode)
   - python-dotenv
 
 Environment Variables:
@@ -25,90 +27,563 @@ Input:
 
 Output:
   - Sentiment analysis results saved as text files in 'data/comments/output'
+  - or, with output_mode = "jsonl"/"parquet", one record per input file
+    (file, sentiment, positive, neutral, negative, error) in
+    'data/comments/sentiment_results.jsonl' / '.parquet'
 
 Usage:
   - Ensure .env file contains the required environment variables
-  - Run the script to analyze all input text files automatically
+  - Run the script to analyze all input text files automatically, or
+    'azure-ai sentiment --input-dir <folder> --output-mode jsonl'
 
 Notes:
   - Skips empty files
+  - Files over max_document_chars (the per-document limit) are split at
+    sentence boundaries; the chunks are scored in parallel and combined into
+    one sentiment and set of scores weighted by chunk length (mixed when at
+    least mixed_share of the text is positive and as much is negative)
+  - The jsonl/parquet output modes avoid one file per comment and end with a
+    rollup of the run's sentiment counts and mean scores kept while writing.
+    JSONL results are appended to across runs (append_results = False
+    starts afresh), and a record torn by a crash is dropped on the next run;
+    a Parquet file can't be appended to and is replaced. output_dir is only
+    created in text mode
+  - Set lexicon_prefilter = True to decide obvious comments locally
+    (azure_ai_sentiment_lexicon.py); outputs keep the same format, and a
+    calibration table of local vs Azure labels by confidence is printed and
+    saved to data/comments/lexicon_calibration.csv for tuning
+    lexicon_threshold
+  - Async mode (the default) keeps max_in_flight requests running on one
+    event loop; set it within the resource's transaction quota
+  - Sends comment files in batches of max_batch_documents per request and
+    maps each result back to its file by document id; set batch_mode = False
+    to send one request per file
   - Summarizes sentiment with overall mood description
   - Output filenames replace 'comment_' prefix with 'sentiment_'
+  - Set AZURE_AI_METRICS_FILE to export timings and counters
+    (see azure_ai_metrics.py)
 
 Example:
   python sentiment_analysis.py
 ===============================================================================
 """
 
+import asyncio
+import csv
+import json
 import os
 import glob
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.textanalytics import TextAnalyticsClient
+from azure.ai.textanalytics import AnalyzeSentimentResult, SentimentConfidenceScores, TextAnalyticsClient
+from azure.ai.textanalytics.aio import TextAnalyticsClient as AsyncTextAnalyticsClient
 from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from azure_ai_metrics import metrics, setup as setup_metrics
+import azure_ai_sentiment_lexicon as lexicon
 
 # configure
-endpoint = os.getenv("AZURE_TEXTANALYTICS_ENDPOINT")
-key = os.getenv("AZURE_TEXTANALYTICS_KEY")
-
 input_dir = "data/comments/input"
 output_dir = "data/comments/output"
-input_pattern = os.path.join(input_dir, "*.txt")
 
-client = TextAnalyticsClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+# output mode: "text" writes one formatted .txt file per comment file,
+# "jsonl" or "parquet" stream one record per input file into results_file
+# and print a rollup of sentiment counts and mean scores at the end
+output_mode = "text"
+results_file = "data/comments/sentiment_results"  # extension added from the mode
+parquet_row_group = 10000  # records buffered per Parquet row group
+append_results = True  # jsonl: add to earlier runs' records; False starts the file afresh
 
-os.makedirs(output_dir, exist_ok=True)
+# batching: send up to max_batch_documents comment files in one
+# analyze_sentiment call (10 is the service limit for sentiment);
+# set batch_mode = False to send one request per file
+batch_mode = True
+max_batch_documents = 10
 
-# extract .txt files
-input_files = glob.glob(input_pattern)
+# files longer than the per-document limit are split at sentence boundaries
+# into chunks, scored in parallel and combined weighted by chunk length
+max_document_chars = 5120
+mixed_share = 0.25   # share of the text that must be positive, and also negative, for "mixed"
+analyze_workers = 4  # analyze_sentiment calls in flight at the same time
+sentence_boundary = re.compile(r'(?<=[.!?])\s+|\n+')
 
-if not input_files:
-    raise FileNotFoundError(f"No .txt files found in {input_dir}")
+# async mode: use the aio client, read files and write results on background
+# threads and keep up to max_in_flight analyze_sentiment calls running, writing
+# each file as soon as all of its chunks are scored (in completion order).
+# Set async_mode = False to process windows of files on analyze_workers threads
+async_mode = True
+max_in_flight = 16
+read_ahead = 64  # files read at the same time
 
-for filepath in input_files:
-    with open(filepath, 'r', encoding='utf-8') as f:
-        full_text = f.read().strip()
+# local prefilter: decide obvious comments in-process with the word list in
+# azure_ai_sentiment_lexicon.py and send only the rest to Azure. A
+# calibration_rate share of the locally decided comments is still sent, and
+# every sent comment's local label is compared with Azure's in the
+# calibration report, so lexicon_threshold can be tuned
+lexicon_prefilter = False
+lexicon_threshold = 0.8
+calibration_rate = 0.05
+calibration_file = "data/comments/lexicon_calibration.csv"
+local_labels = {}       # filepath -> (local label, confidence) of sent comments
+calibration_rows = []   # (filepath, local label, confidence, Azure label)
 
-    if not full_text:
-        print(f"Skipping {filepath}: file is empty.")
-        continue
+# set up by main()
+client = None
+executor = None
+sink = None
+batch_size = max_batch_documents
 
-    print(f"Processing {filepath} as a single document...")
+def read_comment(filepath):
+    with metrics.stage('read'), open(filepath, 'r', encoding='utf-8') as f:
+        return f.read().strip()
 
-    # perform sentiment analysis
-    response = client.analyze_sentiment(documents=[full_text])[0]
+def chunk_text(text):
+    # Split text at sentence boundaries into chunks of at most max_document_chars
+    if len(text) <= max_document_chars:
+        return [text]
+
+    pieces = []
+    for sentence in sentence_boundary.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > max_document_chars:
+            # no sentence boundary within the limit, cut at the last space
+            cut = sentence.rfind(' ', 0, max_document_chars + 1)
+            if cut <= 0:
+                cut = max_document_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_document_chars:
+            chunks[-1] += ' ' + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+def combine_results(chunk_results):
+    # Combine (response, chunk length) pairs into one file-level result:
+    # scores are weighted by chunk length and the label follows the weighted
+    # scores, except that the file is mixed when at least mixed_share of its
+    # text is in positive chunks and as much is in negative ones
+    if len(chunk_results) == 1:
+        return chunk_results[0][0]
+    for response, _ in chunk_results:
+        if response.is_error:
+            return response
+
+    total = sum(length for _, length in chunk_results)
+    def weighted(label):
+        return sum(getattr(response.confidence_scores, label) * length for response, length in chunk_results) / total
 
+    def share(label):
+        # mixed chunks count towards both sides
+        return sum(length for response, length in chunk_results if response.sentiment in (label, 'mixed')) / total
+
+    scores = {label: weighted(label) for label in ('positive', 'neutral', 'negative')}
+    if share('positive') >= mixed_share and share('negative') >= mixed_share:
+        sentiment = 'mixed'
+    else:
+        sentiment = max(scores, key=scores.get)
+
+    return AnalyzeSentimentResult(
+        id=chunk_results[0][0].id,
+        sentiment=sentiment,
+        confidence_scores=SentimentConfidenceScores(**scores),
+        sentences=[sentence for response, _ in chunk_results for sentence in response.sentences],
+    )
+
+def prepare_documents(texts):
+    documents = [{"id": str(i), "text": text} for i, text in enumerate(texts)]
+    metrics.increment('requests')
+    metrics.increment('bytes_sent', sum(len(text.encode('utf-8')) for text in texts))
+    return documents
+
+def match_results(documents, results):
+    # results are matched back to their text by document id
+    by_id = {result.id: result for result in results}
+    return [by_id[document["id"]] for document in documents]
+
+def analyze_documents(texts):
+    # Score several texts in one request, returning results in the same order
+    documents = prepare_documents(texts)
+    started = time.perf_counter()
+    with metrics.stage('service'):
+        results = client.analyze_sentiment(documents=documents)
+    metrics.observe('request_seconds', time.perf_counter() - started, 'textanalytics')
+    return match_results(documents, results)
+
+async def analyze_documents_async(async_client, texts):
+    documents = prepare_documents(texts)
+    started = time.perf_counter()
+    with metrics.stage('service'):
+        results = await async_client.analyze_sentiment(documents=documents)
+    metrics.observe('request_seconds', time.perf_counter() - started, 'textanalytics')
+    return match_results(documents, results)
+
+def format_result(filepath, response):
     if response.is_error:
-        output_content = f"Error processing {os.path.basename(filepath)}:\n{response.error.message}\n"
+        return f"Error processing {os.path.basename(filepath)}:\n{response.error.message}\n"
+
+    sentiment = response.sentiment
+    scores = response.confidence_scores
+    output_content = (
+        f"File: {os.path.basename(filepath)}\n"
+        f"Overall Sentiment: {sentiment}\n"
+        f"Scores:\n"
+        f"  Positive: {scores.positive:.2f}\n"
+        f"  Neutral : {scores.neutral:.2f}\n"
+        f"  Negative: {scores.negative:.2f}\n"
+    )
+
+    # summarise
+    if sentiment == 'positive':
+        mood = "The overall mood is optimistic and favorable."
+    elif sentiment == 'negative':
+        mood = "The overall mood is critical or unfavorable."
     else:
-        sentiment = response.sentiment
-        scores = response.confidence_scores
-        output_content = (
-            f"File: {os.path.basename(filepath)}\n"
-            f"Overall Sentiment: {sentiment}\n"
-            f"Scores:\n"
-            f"  Positive: {scores.positive:.2f}\n"
-            f"  Neutral : {scores.neutral:.2f}\n"
-            f"  Negative: {scores.negative:.2f}\n"
+        mood = "The overall mood is neutral or mixed."
+
+    return output_content + f"\nSummary: {mood}\n"
+
+def write_output(filepath, output_content):
+    filename = os.path.basename(filepath).replace("comment_", "sentiment_")
+    output_path = os.path.join(output_dir, filename)
+
+    with metrics.stage('write'), open(output_path, 'w', encoding='utf-8') as out:
+        out.write(output_content)
+    return output_path
+
+def analyze_files(files):
+    # files is a list of (filepath, text); every file becomes one or more
+    # chunk documents, the documents are sent in batches on analyze_workers
+    # threads and one combined result per file is returned in order
+    documents = [(index, chunk) for index, (_, text) in enumerate(files) for chunk in chunk_text(text)]
+    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+    responses = executor.map(lambda batch: analyze_documents([chunk for _, chunk in batch]), batches)
+
+    chunk_results = [[] for _ in files]
+    for batch, batch_responses in zip(batches, responses):
+        for (index, chunk), response in zip(batch, batch_responses):
+            chunk_results[index].append((response, len(chunk)))
+    return [combine_results(results) for results in chunk_results]
+
+def local_result(filepath, full_text):
+    # Return a result decided by the lexicon, or None to send the comment to
+    # Azure (remembering its local label for the calibration report)
+    if not lexicon_prefilter:
+        return None
+    label, confidence, scores = lexicon.classify(full_text)
+    # a stable sample, so reruns compare the same comments
+    sampled = zlib.crc32(filepath.encode('utf-8')) % 10000 < calibration_rate * 10000
+    if confidence >= lexicon_threshold and not sampled:
+        metrics.increment('local_decisions')
+        return AnalyzeSentimentResult(
+            id=filepath, sentiment=label, confidence_scores=SentimentConfidenceScores(**scores), sentences=[]
         )
+    local_labels[filepath] = (label, confidence)
+    return None
+
+def record_calibration(filepath, response):
+    local = local_labels.pop(filepath, None)
+    if local and not response.is_error:
+        calibration_rows.append((filepath, local[0], local[1], response.sentiment))
 
-        # summarise
-        if sentiment == 'positive':
-            mood = "The overall mood is optimistic and favorable."
-        elif sentiment == 'negative':
-            mood = "The overall mood is critical or unfavorable."
+def write_calibration_report():
+    # Per-comment CSV plus a console table of agreement by confidence band
+    if not lexicon_prefilter:
+        return
+    with open(calibration_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file', 'local_label', 'local_confidence', 'azure_label', 'agree'])
+        for filepath, label, confidence, azure_label in calibration_rows:
+            writer.writerow([os.path.basename(filepath), label, f"{confidence:.4f}", azure_label, label == azure_label])
+
+    decided = metrics.counters.get('local_decisions', 0)
+    print(f"\nLexicon prefilter: {decided} comments decided locally, "
+          f"{len(calibration_rows)} compared with Azure (threshold {lexicon_threshold})")
+    # sampled comments above the threshold stand for the ones decided locally
+    print(lexicon.format_calibration(
+        [row[1:] for row in calibration_rows], threshold=lexicon_threshold, sample_rate=calibration_rate
+    ))
+    print(f"Calibration details written to {calibration_file}")
+
+def drop_partial_line(path):
+    # Cut a record left half-written by a crashed run off the end of a JSONL file
+    if not os.path.exists(path):
+        return
+    with open(path, 'r+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+            print(f"Dropped an incomplete last record from {path}")
+
+class ResultSink:
+    """
+    Single results file, one record per input file, with running totals of
+    this run for the end-of-run rollup. JSONL is appended to (with append =
+    True), Parquet can't be extended once closed so it is rewritten.
+    """
+
+    fields = ('file', 'sentiment', 'positive', 'neutral', 'negative', 'error')
+
+    def __init__(self, path, format, append=True):
+        self.path = path
+        self.format = format
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.score_sums = {'positive': 0.0, 'neutral': 0.0, 'negative': 0.0}
+        self.scored = 0
+        self.errors = 0
+        if format == 'parquet':
+            # only needed for this mode
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self.pa = pa
+            self.schema = pa.schema([
+                ('file', pa.string()), ('sentiment', pa.string()), ('positive', pa.float64()),
+                ('neutral', pa.float64()), ('negative', pa.float64()), ('error', pa.string()),
+            ])
+            if os.path.exists(path):
+                print(f"Replacing {path} (Parquet results are rewritten on every run)")
+            self.writer = pq.ParquetWriter(path, self.schema)
+            self.pending = []
         else:
-            mood = "The overall mood is neutral or mixed."
+            if append:
+                drop_partial_line(path)
+            self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def add(self, filepath, response):
+        if response.is_error:
+            record = (os.path.basename(filepath), None, None, None, None, response.error.message)
+        else:
+            scores = response.confidence_scores
+            record = (os.path.basename(filepath), response.sentiment,
+                      scores.positive, scores.neutral, scores.negative, None)
+
+        with self.lock:
+            if response.is_error:
+                self.errors += 1
+            else:
+                self.counts[response.sentiment] = self.counts.get(response.sentiment, 0) + 1
+                for label in self.score_sums:
+                    self.score_sums[label] += getattr(response.confidence_scores, label)
+                self.scored += 1
+
+            if self.format == 'parquet':
+                self.pending.append(record)
+                if len(self.pending) >= parquet_row_group:
+                    self.flush_row_group()
+            else:
+                # one write and a flush per record, so a crash tears at most the last line
+                self.file.write(json.dumps(dict(zip(self.fields, record)), ensure_ascii=False) + '\n')
+                self.file.flush()
 
-        output_content += f"\nSummary: {mood}\n"
+    def flush_row_group(self):
+        columns = list(zip(*self.pending))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        self.pending = []
+
+    def close(self):
+        with self.lock:
+            if self.format == 'parquet':
+                if self.pending:
+                    self.flush_row_group()
+                self.writer.close()
+            else:
+                self.file.close()
+
+    def rollup(self):
+        lines = [f"Results: {self.scored + self.errors} records written to {self.path} in this run"]
+        for sentiment, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+            lines.append(f"  {sentiment:<8}: {count} ({count / self.scored:.1%})")
+        if self.errors:
+            lines.append(f"  errors  : {self.errors}")
+        if self.scored:
+            lines.append("Mean scores:")
+            for label, total in self.score_sums.items():
+                lines.append(f"  {label.capitalize():<8}: {total / self.scored:.2f}")
+        return '\n'.join(lines)
+
+def save_result(filepath, response):
+    # Write one result in the configured output mode and return where it went
+    if response.is_error:
+        metrics.increment('errors')
+    if sink is None:
+        return write_output(filepath, format_result(filepath, response))
+    with metrics.stage('write'):
+        sink.add(filepath, response)
+    return f"{sink.path} ({os.path.basename(filepath)})"
+
+def process_files(files):
+    # files is a list of (filepath, text)
+    if len(files) == 1:
+        print(f"Processing {files[0][0]} as a single document...")
+    else:
+        print(f"Processing {len(files)} files...")
+
+    # perform sentiment analysis
+    responses = analyze_files(files)
 
     # output
-    filename = os.path.basename(filepath).replace("comment_", "sentiment_")
-    output_path = os.path.join(output_dir, filename)
+    for (filepath, _), response in zip(files, responses):
+        record_calibration(filepath, response)
+        output_path = save_result(filepath, response)
+        print(f"✔ Output written to {output_path}")
 
-    with open(output_path, 'w', encoding='utf-8') as out:
-        out.write(output_content)
+async def analyze_all_async(input_files, endpoint, credential):
+    # Read files ahead on worker threads, send their chunks in batches with at
+    # most max_in_flight calls running, and write each file once all of its
+    # chunks are back
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+    chunk_results = {}  # filepath -> [(response, chunk length) or None per chunk]
+
+    async def send(async_client, batch):
+        # batch is a list of (filepath, chunk index, chunk)
+        try:
+            responses = await analyze_documents_async(async_client, [chunk for _, _, chunk in batch])
+        finally:
+            slots.release()
+        for (filepath, index, chunk), response in zip(batch, responses):
+            results = chunk_results[filepath]
+            results[index] = (response, len(chunk))
+            if all(results):
+                del chunk_results[filepath]
+                response = combine_results(results)
+                record_calibration(filepath, response)
+                output_path = await loop.run_in_executor(None, save_result, filepath, response)
+                print(f"✔ Output written to {output_path}")
+
+    async def dispatch(async_client, batch):
+        await slots.acquire()
+        # surface failures from finished calls instead of losing them
+        for task in [task for task in tasks if task.done()]:
+            tasks.discard(task)
+            task.result()
+        tasks.add(asyncio.ensure_future(send(async_client, batch)))
+
+    async with AsyncTextAnalyticsClient(endpoint=endpoint, credential=credential) as async_client:
+        batch = []
+        for start in range(0, len(input_files), read_ahead):
+            paths = input_files[start:start + read_ahead]
+            texts = await asyncio.gather(*(loop.run_in_executor(None, read_comment, path) for path in paths))
+            for filepath, full_text in zip(paths, texts):
+                if not full_text:
+                    print(f"Skipping {filepath}: file is empty.")
+                    continue
+
+                response = local_result(filepath, full_text)
+                if response is not None:
+                    output_path = await loop.run_in_executor(None, save_result, filepath, response)
+                    print(f"✔ Output written to {output_path} (decided locally)")
+                    continue
+
+                print(f"Processing {filepath}...")
+                chunks = chunk_text(full_text)
+                chunk_results[filepath] = [None] * len(chunks)
+                for index, chunk in enumerate(chunks):
+                    batch.append((filepath, index, chunk))
+                    if len(batch) == batch_size:
+                        await dispatch(async_client, batch)
+                        batch = []
+
+        if batch:
+            await dispatch(async_client, batch)
+        await asyncio.gather(*tasks)
+
+def main():
+    global client, executor, sink, batch_size
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # per-stage timings and counters, exported when AZURE_AI_METRICS_FILE is set
+    setup_metrics('sentiment')
+
+    endpoint = os.getenv("AZURE_TEXTANALYTICS_ENDPOINT")
+    key = os.getenv("AZURE_TEXTANALYTICS_KEY")
+    credential = AzureKeyCredential(key)
+
+    client = TextAnalyticsClient(endpoint=endpoint, credential=credential)
+
+    # extract .txt files
+    input_files = glob.glob(os.path.join(input_dir, "*.txt"))
+
+    if not input_files:
+        raise FileNotFoundError(f"No .txt files found in {input_dir}")
+
+    batch_size = max_batch_documents if batch_mode else 1
+
+    if output_mode == "text":
+        os.makedirs(output_dir, exist_ok=True)
+    else:
+        results_folder = os.path.dirname(results_file)
+        if results_folder:
+            os.makedirs(results_folder, exist_ok=True)
+        sink = ResultSink(f"{results_file}.{output_mode}", output_mode, append_results)
+
+    # the sink is closed even when the run fails, so the records already
+    # streamed stay readable (a Parquet file without its footer is not)
+    try:
+        if async_mode:
+            asyncio.run(analyze_all_async(input_files, endpoint, credential))
+        else:
+            # files are collected until they fill a batch for every worker
+            window_documents = batch_size * analyze_workers
+
+            with ThreadPoolExecutor(max_workers=analyze_workers) as executor:
+                files = []
+                documents = 0
+                for filepath in input_files:
+                    full_text = read_comment(filepath)
+
+                    if not full_text:
+                        print(f"Skipping {filepath}: file is empty.")
+                        continue
+
+                    response = local_result(filepath, full_text)
+                    if response is not None:
+                        output_path = save_result(filepath, response)
+                        print(f"✔ Output written to {output_path} (decided locally)")
+                        continue
+
+                    files.append((filepath, full_text))
+                    documents += -(-len(full_text) // max_document_chars)  # at least this many chunks
+                    if documents >= window_documents:
+                        process_files(files)
+                        files = []
+                        documents = 0
+
+                if files:
+                    process_files(files)
+    finally:
+        if sink is not None:
+            sink.close()
+
+    if sink is not None:
+        print(sink.rollup())
+
+    write_calibration_report()
 
-    print(f"✔ Output written to {output_path}")
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ Version:      1.0.0
 Dependencies:
   - Python 3.6+
   - azure-cognitiveservices-speech
+  - numpy
   - python-dotenv
 
 Environment Variables (in .env):
@@ -22,26 +23,45 @@ Environment Variables (in .env):
 Workflow:
   1. Load Azure Speech credentials from environment
   2. For each WAV file in 'audio' folder, transcribe audio to multiple
-     languages (currently English and Portuguese)
-  3. Save transcriptions as text files in 'transcriptions' folder,
+     languages (currently English and Portuguese), running up to
+     max_workers (file, language) pairs at a time with one shared
+     SpeechConfig per language. Each file is decoded once (memory-mapped)
+     into 16 kHz mono PCM and pushed to every language's recognizer
+  3. In continuous mode, stream the whole file and append each recognized
+     segment with its start/end timestamps to the transcript as it arrives.
+     With vad_enabled, long silences are cut out first (azure_ai_audio.py)
+     and up to segment_workers speech segments are recognized at a time;
+     the transcript is written in order on the original file's timeline
+  4. Save transcriptions as text files in 'transcriptions' folder,
      with language suffix in filename
-  4. Provide console output for progress and errors
+  5. Provide console output for progress and errors
 
 Input:
   - WAV audio files in 'audio' folder
 
 Output:
   - Transcription text files in 'transcriptions' folder
-    (filename format: original_name.{language}.txt)
+    (filename format: original_name.{language}.txt), one
+    "[hh:mm:ss.sss --> hh:mm:ss.sss] text" line per segment in continuous mode
 
 Usage:
   - Set Azure credentials in .env
   - Place WAV files in 'audio'
-  - Run the script
+  - Run the script, or 'azure-ai speech --audio-folder <folder>'
 
 Notes:
   - Supports multiple languages by specifying language codes in the script
   - Handles recognition failures and no-match cases with appropriate messages
+  - Only the first utterance is transcribed by default; set
+    recognition_mode = "continuous" (or 'azure-ai speech --mode continuous')
+    to transcribe whole files as timestamped segments
+  - Keep max_workers within the concurrent request limit of the resource
+  - Set decode_once = False to let the SDK read each file per language
+  - Voice activity detection means silences are not billed and long files
+    finish sooner; up to max_workers * segment_workers recognitions can be
+    running at once
+  - Set AZURE_AI_METRICS_FILE to export timings and counters
+    (see azure_ai_metrics.py)
 
 Example:
   python azure_speech_transcription.py
@@ -49,58 +69,290 @@ Example:
 """
 
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import azure.cognitiveservices.speech as speechsdk
 from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-speech_key = os.getenv("AZURE_SPEECH_KEY")
-service_region = os.getenv("AZURE_SPEECH_REGION")
-
-if not speech_key or not service_region:
-    raise ValueError("Missing Azure Speech credentials. Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION in .env.")
+from azure_ai_audio import detect_speech_segments, load_pcm16k
+from azure_ai_metrics import metrics, setup as setup_metrics
 
 # Folders
 audio_folder = "audio" # input audio is stored in this folder
 transcriptions_folder = "transcriptions" # the output transcriptions are placed in this folder
 
-# Create folder if it doesn't exist
-os.makedirs(transcriptions_folder, exist_ok=True)
-
 # specify the languages
 languages = {
     "en-US": "english",
     "pt-BR": "portuguese"
 }
 
-# Transcribe all .wav files in the folder
-for file_name in os.listdir(audio_folder):
-    if file_name.lower().endswith(".wav"):
-        wav_path = os.path.join(audio_folder, file_name)
-        print(f"🎧 Processing {file_name}")
-
-        for lang_code, lang_name in languages.items():
-            print(f"🗣️ Transcribing to {lang_name}...")
-
-            speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
-            speech_config.speech_recognition_language = lang_code
-            audio_config = speechsdk.AudioConfig(filename=wav_path)
-            recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
-
-            result = recognizer.recognize_once()
-
-            # output
-            lang_suffix = f".{lang_name}.txt"
-            output_file = os.path.join(transcriptions_folder, file_name.replace(".wav", lang_suffix))
-
-            with open(output_file, "w") as f:
-                if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                    f.write(result.text)
-                    print(f"Saved: {output_file}")
-                elif result.reason == speechsdk.ResultReason.NoMatch:
-                    f.write("[No speech could be recognized]")
-                    print(f"No match for {lang_name}: {file_name}")
-                else:
-                    f.write("[Speech recognition failed]")
-                    print(f"Failed for {lang_name}: {file_name} — {result.reason}")
+# recognition mode: "once" returns only the first utterance (about 15 seconds
+# at most) as plain text, "continuous" streams the whole file and writes every
+# recognized segment with its timestamps as soon as it arrives
+recognition_mode = "once"
+
+# number of (file, language) transcriptions to run at the same time;
+# set to 1 to process them one after another
+max_workers = 8
+
+# decode each WAV once into 16 kHz mono PCM and push that buffer to every
+# language's recognizer, instead of re-reading the file per language
+decode_once = True
+pcm_stream_format = speechsdk.audio.AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
+push_chunk_bytes = 32000  # one second of audio per write
+ticks_per_sample = 10_000_000 // 16000  # SDK offsets are in 100 ns ticks
+
+# split decoded files at long silences (voice activity detection) and only send
+# the speech; used in continuous mode with decode_once. Set to False to stream
+# whole files
+vad_enabled = True
+segment_workers = 4  # speech segments of one (file, language) recognized at the same time
+
+# one SpeechConfig per language, shared by every recognizer (set up by main())
+speech_configs = {}
+
+def format_timestamp(ticks):
+    # The Speech SDK reports offsets and durations in 100-nanosecond ticks
+    seconds = ticks / 10_000_000
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+def transcribe_once(recognizer, output_file, lang_name, file_name):
+    # Recognize the first utterance only and write it as plain text
+    with metrics.stage('service'):
+        result = recognizer.recognize_once()
+
+    with metrics.stage('write'), open(output_file, "w") as f:
+        if result.reason == speechsdk.ResultReason.RecognizedSpeech:
+            f.write(result.text)
+            print(f"Saved: {output_file}")
+        elif result.reason == speechsdk.ResultReason.NoMatch:
+            f.write("[No speech could be recognized]")
+            metrics.increment('no_match')
+            print(f"No match for {lang_name}: {file_name}")
+        else:
+            f.write("[Speech recognition failed]")
+            metrics.increment('errors')
+            print(f"Failed for {lang_name}: {file_name} — {result.reason}")
+
+def format_segment(offset, duration, text):
+    return f"[{format_timestamp(offset)} --> {format_timestamp(offset + duration)}] {text}\n"
+
+def run_continuous(recognizer, on_segment):
+    # Recognize until the end of the audio, calling on_segment(offset, duration,
+    # text) for every recognized segment; returns the error details if the
+    # service cancelled the session with an error
+    done = threading.Event()
+    state = {"error": None}
+
+    def on_recognized(evt):
+        result = evt.result
+        if result.reason == speechsdk.ResultReason.RecognizedSpeech and result.text:
+            on_segment(result.offset, result.duration, result.text)
+
+    def on_canceled(evt):
+        details = evt.cancellation_details
+        if details.reason == speechsdk.CancellationReason.Error:
+            state["error"] = details.error_details
+        done.set()
+
+    recognizer.recognized.connect(on_recognized)
+    recognizer.session_stopped.connect(lambda evt: done.set())
+    recognizer.canceled.connect(on_canceled)
+
+    with metrics.stage('service'):
+        recognizer.start_continuous_recognition()
+        done.wait()
+        recognizer.stop_continuous_recognition()
+    return state["error"]
+
+def finish_transcript(f, output_file, lang_name, file_name, segments, error):
+    # Append the failure / no-match marker and report the outcome
+    if error:
+        f.write("[Speech recognition failed]")
+        metrics.increment('errors')
+        print(f"Failed for {lang_name}: {file_name} — {error}")
+    elif segments == 0:
+        f.write("[No speech could be recognized]")
+        metrics.increment('no_match')
+        print(f"No match for {lang_name}: {file_name}")
+    else:
+        print(f"Saved: {output_file} ({segments} segments)")
+
+def transcribe_continuous(recognizer, output_file, lang_name, file_name):
+    # Stream the whole file, appending "[start --> end] text" lines to the
+    # transcript as each segment is recognized
+    state = {"segments": 0}
+
+    with open(output_file, "w") as f:
+        def on_segment(offset, duration, text):
+            with metrics.stage('write'):
+                f.write(format_segment(offset, duration, text))
+                f.flush()
+            state["segments"] += 1
+            metrics.increment('segments')
+
+        error = run_continuous(recognizer, on_segment)
+        finish_transcript(f, output_file, lang_name, file_name, state["segments"], error)
+
+def recognize_segment(pcm, start, end, lang_code):
+    # Recognize one speech segment of a decoded file and return its lines,
+    # with timestamps moved back onto the file's own timeline, and any error
+    audio_config = push_stream_config(memoryview(pcm)[start * 2:end * 2])
+    recognizer = speechsdk.SpeechRecognizer(speech_config=speech_configs[lang_code], audio_config=audio_config)
+    shift = start * ticks_per_sample
+    lines = []
+    error = run_continuous(
+        recognizer, lambda offset, duration, text: lines.append(format_segment(shift + offset, duration, text))
+    )
+    return lines, error
+
+def transcribe_segments(pcm, segments, lang_code, output_file, lang_name, file_name):
+    # Recognize up to segment_workers speech segments at a time and write their
+    # lines in audio order, each as soon as every earlier segment is written
+    count = 0
+    error = None
+    with ThreadPoolExecutor(max_workers=segment_workers) as executor, open(output_file, "w") as f:
+        futures = [executor.submit(recognize_segment, pcm, start, end, lang_code) for start, end in segments]
+        for future in futures:
+            try:
+                lines, segment_error = future.result()
+            except Exception as e:
+                # keep writing the other segments; the transcript still ends
+                # with the failure marker
+                lines, segment_error = [], str(e)
+            error = error or segment_error
+            with metrics.stage('write'):
+                f.writelines(lines)
+                f.flush()
+            count += len(lines)
+            metrics.increment('segments', len(lines))
+        finish_transcript(f, output_file, lang_name, file_name, count, error)
+
+# decoded audio shared by the languages of each file:
+# file name -> {"lock", "pcm", "segments", "remaining" languages still to fetch it}
+decoded_audio = {}
+decoded_audio_lock = threading.Lock()
+
+def acquire_pcm(file_name):
+    # Decode the file on first use and hand the same buffer to every language
+    with decoded_audio_lock:
+        entry = decoded_audio.setdefault(
+            file_name, {"lock": threading.Lock(), "pcm": None, "segments": None, "remaining": len(languages)}
+        )
+    with entry["lock"]:
+        if entry["pcm"] is None:
+            with metrics.stage('read'):
+                entry["pcm"] = load_pcm16k(os.path.join(audio_folder, file_name))
+            if vad_enabled and recognition_mode == "continuous":
+                with metrics.stage('vad'):
+                    entry["segments"] = detect_speech_segments(entry["pcm"])
+    return entry["pcm"], entry["segments"]
+
+def release_pcm(file_name):
+    # Drop the cache entry once every language of the file has its buffer
+    with decoded_audio_lock:
+        entry = decoded_audio[file_name]
+        entry["remaining"] -= 1
+        if entry["remaining"] == 0:
+            del decoded_audio[file_name]
+
+def push_stream_config(pcm):
+    # Feed a decoded buffer to a recognizer through a push stream
+    stream = speechsdk.audio.PushAudioInputStream(stream_format=pcm_stream_format)
+    view = memoryview(pcm)
+    for start in range(0, len(view), push_chunk_bytes):
+        stream.write(view[start:start + push_chunk_bytes].tobytes())
+    stream.close()
+    return speechsdk.audio.AudioConfig(stream=stream)
+
+def transcribe_file(file_name, lang_code, lang_name):
+    # Transcribe one (file, language) pair; safe to run from worker threads
+    wav_path = os.path.join(audio_folder, file_name)
+    print(f"🗣️ Transcribing {file_name} to {lang_name}...")
+
+    # output
+    lang_suffix = f".{lang_name}.txt"
+    output_file = os.path.join(transcriptions_folder, file_name.replace(".wav", lang_suffix))
+
+    segments = None
+    if decode_once:
+        try:
+            pcm, segments = acquire_pcm(file_name)
+        except (OSError, ValueError) as e:
+            # a truncated or unsupported WAV still gets its failure marker
+            with metrics.stage('write'), open(output_file, "w") as f:
+                finish_transcript(f, output_file, lang_name, file_name, 0, f"could not decode audio: {e}")
+            return
+        finally:
+            release_pcm(file_name)
+
+    if segments is not None:
+        # only the speech is sent; silences between segments are skipped
+        speech_bytes = sum(end - start for start, end in segments) * 2
+        metrics.increment('requests', len(segments))
+        metrics.increment('bytes_sent', speech_bytes)
+        metrics.increment('bytes_skipped', len(pcm) - speech_bytes)
+        started = time.perf_counter()
+        transcribe_segments(pcm, segments, lang_code, output_file, lang_name, file_name)
+        metrics.observe('request_seconds', time.perf_counter() - started, 'speech')
+        return
+
+    if decode_once:
+        audio_config = push_stream_config(pcm)
+        bytes_sent = len(pcm)
+    else:
+        audio_config = speechsdk.AudioConfig(filename=wav_path)
+        bytes_sent = os.path.getsize(wav_path)
+    recognizer = speechsdk.SpeechRecognizer(speech_config=speech_configs[lang_code], audio_config=audio_config)
+
+    metrics.increment('requests')
+    metrics.increment('bytes_sent', bytes_sent)
+    started = time.perf_counter()
+    if recognition_mode == "continuous":
+        transcribe_continuous(recognizer, output_file, lang_name, file_name)
+    else:
+        transcribe_once(recognizer, output_file, lang_name, file_name)
+    metrics.observe('request_seconds', time.perf_counter() - started, 'speech')
+
+def main():
+    # Load environment variables
+    load_dotenv()
+
+    # per-stage timings and counters, exported when AZURE_AI_METRICS_FILE is set
+    setup_metrics('speech')
+
+    speech_key = os.getenv("AZURE_SPEECH_KEY")
+    service_region = os.getenv("AZURE_SPEECH_REGION")
+
+    if not speech_key or not service_region:
+        raise ValueError("Missing Azure Speech credentials. Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION in .env.")
+
+    # Create folder if it doesn't exist
+    os.makedirs(transcriptions_folder, exist_ok=True)
+
+    for lang_code in languages:
+        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
+        speech_config.speech_recognition_language = lang_code
+        speech_configs[lang_code] = speech_config
+
+    # Transcribe all .wav files in the folder, every (file, language) pair is a task;
+    # the pairs of one file sit next to each other so its decoded audio is short-lived
+    wav_files = [file_name for file_name in os.listdir(audio_folder) if file_name.lower().endswith(".wav")]
+    tasks = [(file_name, lang_code, lang_name) for file_name in wav_files for lang_code, lang_name in languages.items()]
+    print(f"🎧 Processing {len(wav_files)} files in {len(languages)} languages with {max_workers} workers")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(transcribe_file, *task): task for task in tasks}
+        for future in as_completed(futures):
+            file_name, lang_code, lang_name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                metrics.increment('errors')
+                print(f"Failed for {lang_name}: {file_name} — {e}")
+
+if __name__ == '__main__':
+    main()
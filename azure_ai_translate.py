@@ -22,11 +22,14 @@ Workflow:
   1. Load Azure Translator credentials and region from environment variables
   2. Construct request URL and headers for the Translator Text API
   3. Define input text and target languages
-  4. Send POST request to translate text
-  5. Print JSON formatted translation results to console
+  4. Look up each target language in the translation memory
+     (data/translation_memory.sqlite)
+  5. Send POST request to translate text for any languages not in memory
+  6. Print JSON formatted translation results to console
 
 Input:
-  - Hardcoded English text in the script
+  - Hardcoded English text in the script (or the text given to
+    'azure-ai translate')
 
 Output:
   - JSON response printed to console showing translations
@@ -37,31 +40,29 @@ Usage:
 
 Notes:
   - Modify 'body' and 'params' to translate other text or add languages
+  - translate(text, to) can be imported and called from other code; it
+    uses the module's client, constructed_url, headers and memory, which
+    main() sets up once (set them the same way when importing)
   - Designed as a simple example of Translator Text API usage
+  - Requests go through the shared client in azure_ai_http.py
+  - Set AZURE_AI_METRICS_FILE to export timings and counters
+    (see azure_ai_metrics.py)
+  - Set use_translation_memory = False to always call the API
 
 Example:
   python azure_translator_sample.py
+  azure-ai translate "Good morning" --to fr de
 ===============================================================================
 """
 
 import os
-import requests
-import uuid
 import json
 from dotenv import load_dotenv
-load_dotenv()
-
-
-# Load key and endpoint from environment variables
-key = os.getenv("AZURE_TRANSLATOR_KEY")
-endpoint = os.getenv("AZURE_TRANSLATOR_ENDPOINT")
-location = os.getenv("AZURE_TRANSLATOR_LOCATION", "australiaeast")  # default can stay
-
-if not key or not endpoint:
-    raise ValueError("Missing environment variable: please set AZURE_TRANSLATOR_KEY and AZURE_TRANSLATOR_ENDPOINT")
+from azure_ai_http import PooledClient
+from azure_ai_metrics import metrics, setup as setup_metrics
+from azure_ai_translation_memory import TranslationMemory
 
 path = '/translate'
-constructed_url = endpoint + path
 
 # specify languages
 params = {
@@ -70,17 +71,96 @@ params = {
     'to': ['fr', 'zu']
 }
 
-headers = {
-    'Ocp-Apim-Subscription-Key': key,
-    'Ocp-Apim-Subscription-Region': location,
-    'Content-type': 'application/json',
-    'X-ClientTraceId': str(uuid.uuid4())
-}
-
 # simple text to be translated
 body = [{
     'text': 'I would really like to drive your car around the block a few times!'
 }]
 
-response = requests.post(constructed_url, params=params, headers=headers, json=body)
-print(json.dumps(response.json(), indent=4, ensure_ascii=False, sort_keys=True)) # print the translation
+# translation memory shared with azure_ai_translate_csv.py
+use_translation_memory = True
+translation_memory_file = os.path.join('data', 'translation_memory.sqlite')
+
+# set up by main()
+constructed_url = None
+headers = None
+client = None
+memory = None
+
+def load_credentials():
+    # Load key and endpoint from environment variables and return the
+    # request URL and headers
+    load_dotenv()
+    key = os.getenv("AZURE_TRANSLATOR_KEY")
+    endpoint = os.getenv("AZURE_TRANSLATOR_ENDPOINT")
+    location = os.getenv("AZURE_TRANSLATOR_LOCATION", "australiaeast")  # default can stay
+
+    if not key or not endpoint:
+        raise ValueError("Missing environment variable: please set AZURE_TRANSLATOR_KEY and AZURE_TRANSLATOR_ENDPOINT")
+
+    # the client adds Content-Type and a fresh X-ClientTraceId to every request
+    headers = {
+        'Ocp-Apim-Subscription-Key': key,
+        'Ocp-Apim-Subscription-Region': location
+    }
+    return endpoint + path, headers
+
+def translate(text, to=None, source=None):
+    # Translate text into every target language and return the response the
+    # API gives, with any languages found in the translation memory filled in
+    to = list(to or params['to'])
+    source = source or params['from']
+
+    known = {}
+    if memory is not None:
+        with metrics.stage('cache'):
+            for lang in to:
+                translation = memory.get(text, source, lang, params['api-version'])
+                if translation is not None:
+                    known[lang] = translation
+
+    missing = [lang for lang in to if lang not in known]
+    fetched = {}
+    if missing:
+        response = client.post(
+            constructed_url, params={**params, 'from': source, 'to': missing}, headers=headers,
+            json=[{'text': text}]
+        )
+        result = response.json()
+        if isinstance(result, list):
+            # translations come back in the same order as the requested languages
+            fetched = dict(zip(missing, result[0]['translations']))
+    else:
+        # everything came from memory, rebuild the response the API would have sent
+        result = [{'translations': []}]
+
+    if known and isinstance(result, list):
+        translations = {lang: {'text': known[lang], 'to': lang} for lang in known}
+        translations.update(fetched)
+        result[0]['translations'] = [translations[lang] for lang in to if lang in translations]
+
+    if memory is not None:
+        for lang, translation in fetched.items():
+            memory.put(text, translation['text'], source, lang, params['api-version'])
+    return result
+
+def main(text=None, to=None, source=None):
+    global constructed_url, headers, client, memory
+
+    # per-stage timings and counters, exported when AZURE_AI_METRICS_FILE is set
+    setup_metrics('translate')
+
+    constructed_url, headers = load_credentials()
+    client = PooledClient(pool_size=1, service='translator')
+    memory = TranslationMemory(translation_memory_file) if use_translation_memory else None
+    try:
+        result = translate(text or body[0]['text'], to, source)
+        print(json.dumps(result, indent=4, ensure_ascii=False, sort_keys=True)) # print the translation
+        if memory is not None:
+            memory.report()
+    finally:
+        client.close()
+        if memory is not None:
+            memory.close()
+
+if __name__ == '__main__':
+    main()
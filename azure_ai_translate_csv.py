@@ -2,15 +2,16 @@
 ===============================================================================
 Program:      azure_ai_translate_csv.py
 Description:  Reads English texts from a CSV file, translates each text into 
-              Brazilian Portuguese using Azure Cognitive Services Translator API,
-              and saves the translated results back to a new CSV file.
+              Brazilian Portuguese (or any list of target languages) using
+              Azure Cognitive Services Translator API, and saves the translated
+              results back to a new CSV file.
 
 Author:       Murray Pung
 Date:         2025-06-03
 Version:      1.0.0
 
 Dependencies:
-  - Python 3.6+
+  - Python 3.7+
   - requests
   - pandas
   - python-dotenv
@@ -22,92 +23,524 @@ Environment Variables (in .env):
 
 Workflow:
   1. Load Azure Translator CSV credentials from environment variables
-  2. Load English texts from input CSV (column named 'text')
-  3. For each text, send request to Azure Translator API to translate into pt-BR
-  4. Append translated text as a new column 'Portuguese_BR' to the DataFrame
-  5. Save the DataFrame with translations into an output CSV file
-  6. Adds a small delay between API calls to avoid throttling
+  2. Stream English texts from input CSV (column named 'text') in chunks
+  3. Collapse duplicate texts and look them up in the translation memory
+     (data/translation_memory.sqlite), so only unseen text is sent
+  4. Pack the remaining texts into batches under the Translator per-request limits
+     (1,000 elements, 50,000 characters) and send each batch to the
+     Azure Translator API to translate into every target language at once
+  5. Map each translation back to its row and append the results as one
+     column per language (e.g. 'Portuguese_BR') to the DataFrame
+  6. Append each translated chunk to the output CSV file and record a
+     checkpoint, so a rerun resumes at the first untranslated row
+  7. Keeps a bounded number of requests in flight behind an adaptive token
+     bucket that backs off on 429/503 (honouring Retry-After) and speeds
+     back up once throttling stops
+  8. Reports every row that still failed after the retries, plus
+     duplicate and translation memory hit/miss counts
 
 Input:
   - CSV file: data/interesting_text.csv with column 'text'
 
 Output:
-  - CSV file: data/translated_to_portuguese_br.csv including 'Portuguese_BR' column
+  - CSV file: data/translated_to_portuguese_br.csv including a column per
+    target language ('Portuguese_BR' by default)
+  - CSV file: data/translation_failures.csv listing rows that failed (if any)
+  - data/translated_to_portuguese_br.csv.checkpoint.json while a run is in
+    progress (removed once the whole file has been translated)
 
 Usage:
   - Ensure input CSV exists and credentials are set in .env
-  - Run script to generate translated CSV
+  - Run script to generate translated CSV, or
+    'azure-ai translate-csv --input in.csv --output out.csv'
 
 Notes:
-  - Adjust languages and filenames as needed
+  - Adjust languages and filenames as needed; add entries to 'languages' to
+    translate into several languages in a single pass
   - Handles API response errors gracefully by inserting None for failed translations
+  - Requests reuse pooled keep-alive connections from azure_ai_http.py
+  - Set AZURE_AI_METRICS_FILE to export stage timings and counters
+    (see azure_ai_metrics.py)
+  - Set batch_mode = False to fall back to one request per row
+  - Set async_mode = False to send batches one at a time with a fixed delay
+  - Set stream_mode = False to load and write the whole file in one go
+  - Delete the checkpoint file to force a fresh run
+  - Set use_translation_memory = False to always call the API
 
 Example:
   python azure_translator_csv.py
 ===============================================================================
 """
 
+import asyncio
+import json
 import requests
-import uuid
 import pandas as pd
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-
-# load credentials from .env
-load_dotenv()
-
-translator_key_csv = os.getenv("AZURE_TRANSLATOR_CSV_KEY")
-translator_endpoint_csv = os.getenv("AZURE_TRANSLATOR_CSV_ENDPOINT")
-translator_region_csv = os.getenv("AZURE_TRANSLATOR_CSV_REGION")
-
-if not translator_key_csv or not translator_endpoint_csv or not translator_region_csv:
-    raise ValueError("Missing Azure Translator CSV credentials in environment variables.")
+from azure_ai_http import PooledClient
+from azure_ai_metrics import metrics, setup as setup_metrics
+from azure_ai_translation_memory import TranslationMemory
 
 # endpoint and parameters
 path = '/translate'
-constructed_url = translator_endpoint_csv + path
 
-# specify languages
+# specify languages: every target is requested in the same call and written
+# to its own output column
+languages = {
+    'pt-BR': 'Portuguese_BR'  # Brazilian Portuguese
+}
+
 params = {
     'api-version': '3.0',
     'from': 'en',
-    'to': ['pt-BR']  # Brazilian Portuguese
+    'to': list(languages)
 }
 
-headers = {
-    'Ocp-Apim-Subscription-Key': translator_key_csv,
-    'Ocp-Apim-Subscription-Region': translator_region_csv,
-    'Content-type': 'application/json',
-    'X-ClientTraceId': str(uuid.uuid4())
-}
+# batching: pack many rows into each request, staying under the service limits
+batch_mode = True
+max_batch_elements = 1000   # max array elements per request
+max_batch_chars = 50000     # max characters (including spaces) per request,
+                            # counted once for every target language
+
+# async engine: keep several batches in flight and let the request rate follow
+# the quota the resource actually has (only used with batch_mode)
+async_mode = True
+max_in_flight = 8       # concurrent requests
+initial_rate = 5.0      # requests per second to start with
+min_rate = 0.5          # floor when the service keeps throttling
+max_rate = 100.0        # ceiling when there is headroom
+rate_step = 0.5         # requests per second added after each success
+max_retries = 5         # retries for throttled (429/503) and transient errors
+max_backoff = 30        # seconds, cap for retries without Retry-After
+
+# streaming: read and write the CSV in chunks so memory stays flat, with a
+# checkpoint after every chunk so a rerun resumes where the last one stopped
+stream_mode = True
+chunk_rows = 10000
+
+# translation memory: reuse earlier translations instead of paying for them again
+use_translation_memory = True
+translation_memory_max_entries = 1000000  # least recently used entries are evicted beyond this
 
 # file paths
 input_csv_file = os.path.join('data', 'interesting_text.csv')
 output_csv_file = os.path.join('data', 'translated_to_portuguese_br.csv')
+failures_csv_file = os.path.join('data', 'translation_failures.csv')
+checkpoint_suffix = '.checkpoint.json'  # progress file kept next to the output
+translation_memory_file = os.path.join('data', 'translation_memory.sqlite')
+
+# set up by main()
+constructed_url = None
+headers = None
+checkpoint_file = None
+client = None
+memory = None
+duplicate_rows = 0
+
+def has_text(text):
+    # Empty cells come back from pandas as NaN; blank strings have nothing to translate
+    return isinstance(text, str) and bool(text.strip())
+
+def build_batches(texts, max_elements=max_batch_elements, max_chars=None):
+    # Yield lists of (row, text) pairs that fit in a single request.
+    # Rows without text (e.g. empty cells read as NaN) are skipped and stay None;
+    # translate_texts reports them as failures.
+    if max_chars is None:
+        max_chars = max_batch_chars // len(params['to'])
+    batch = []
+    batch_chars = 0
+    for row, text in enumerate(texts):
+        if not has_text(text):
+            continue
+        if batch and (len(batch) >= max_elements or batch_chars + len(text) > max_chars):
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append((row, text))
+        batch_chars += len(text)
+    if batch:
+        yield batch
+
+def parse_translations(item):
+    # Return ({language: translated text}, error) for one element of a response.
+    # Translations come back in the same order as the requested languages.
+    try:
+        translations = dict(zip(params['to'], (t['text'] for t in item['translations'])))
+    except (KeyError, TypeError):
+        return {}, "no translation returned"
+    if len(translations) < len(params['to']):
+        missing = ', '.join(lang for lang in params['to'] if lang not in translations)
+        return translations, f"no translation returned for {missing}"
+    return translations, None
+
+def parse_batch_response(batch, response):
+    # Map a /translate response back to {row: ({language: text}, error)}.
+    # Results come back in the same order as the request body.
+    try:
+        result = response.json()
+    except ValueError:
+        result = None
+
+    if response.status_code != 200 or not isinstance(result, list):
+        try:
+            error = result['error']['message']
+        except (KeyError, TypeError):
+            error = response.text[:200]
+        error = f"HTTP {response.status_code}: {error}"
+        return {row: ({}, error) for row, _ in batch}
+
+    translated = {row: ({}, "no translation returned") for row, _ in batch}
+    for (row, _), item in zip(batch, result):
+        translated[row] = parse_translations(item)
+    return translated
+
+def post_batch(batch, retries=None):
+    body = [{'text': text} for _, text in batch]
+    return client.post(constructed_url, params=params, headers=headers, json=body, retries=retries)
+
+def translate_batch(batch):
+    # Translate one batch and return {row: ({language: text}, error)}.
+    try:
+        response = post_batch(batch)
+    except requests.RequestException as e:
+        return {row: ({}, f"request failed: {e}") for row, _ in batch}
+    with metrics.stage('parse'):
+        return parse_batch_response(batch, response)
+
+def parse_retry_after(value, default):
+    # Retry-After is given in seconds by the Translator service
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to the service: the rate is halved
+    and the bucket paused for Retry-After seconds whenever a request is
+    throttled, then grows again by a fixed step with every success.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, step):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    def throttled(self, retry_after):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+async def translate_batch_async(batch, limiter, semaphore, executor):
+    # Send one batch through the limiter, retrying throttled and transient
+    # failures. Returns {row: ({language: text}, error)}.
+    loop = asyncio.get_running_loop()
+    error = None
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            backoff = min(max_backoff, 2 ** attempt)
+            await limiter.acquire()
+            try:
+                # retries=0: throttling is handled here, not by the client
+                response = await loop.run_in_executor(executor, post_batch, batch, 0)
+            except requests.RequestException as e:
+                error = f"request failed: {e}"
+                metrics.increment('retries')
+                await asyncio.sleep(backoff)
+                continue
+
+            if response.status_code in (429, 503):
+                retry_after = parse_retry_after(response.headers.get('Retry-After'), backoff)
+                limiter.throttled(retry_after)
+                error = f"HTTP {response.status_code}: throttled"
+                metrics.increment('retries')
+                continue
+            if response.status_code >= 500:
+                error = f"HTTP {response.status_code}: server error"
+                metrics.increment('retries')
+                await asyncio.sleep(backoff)
+                continue
+
+            limiter.succeeded()
+            with metrics.stage('parse'):
+                return parse_batch_response(batch, response)
+
+    error = f"{error} (gave up after {max_retries + 1} attempts)"
+    return {row: ({}, error) for row, _ in batch}
+
+async def translate_all_async(texts, limiter):
+    # Translate every batch with a bounded number of requests in flight.
+    semaphore = asyncio.Semaphore(max_in_flight)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        return await asyncio.gather(*(
+            translate_batch_async(batch, limiter, semaphore, executor)
+            for batch in build_batches(texts)
+        ))
+
+def send_texts(texts, loop, limiter):
+    # Send texts to the service and return {index: ({language: text}, error)}.
+    if batch_mode:
+        # translate many texts per request
+        if async_mode:
+            batch_results = loop.run_until_complete(translate_all_async(texts, limiter))
+        else:
+            batch_results = []
+            for batch in build_batches(texts):
+                batch_results.append(translate_batch(batch))
+                time.sleep(0.1)  # add a delay to avoid API throttling
+
+        results = {}
+        for translated in batch_results:
+            results.update(translated)
+        return results
+
+    # translate each text
+    results = {}
+    for index, text in enumerate(texts):
+        body = [{'text': text}]
+        response = client.post(constructed_url, params=params, headers=headers, json=body)
+        result = response.json()
+
+        try:
+            results[index] = parse_translations(result[0])
+        except (IndexError, KeyError, TypeError):
+            results[index] = ({}, "no translation returned")
+
+        time.sleep(0.1)  # add a delay to avoid API throttling
+    return results
+
+def translate_texts(texts, first_row, loop, limiter):
+    # Translate a list of texts into every target language and return
+    # ({language: translations}, failures).
+    # Duplicate texts are collapsed and the translation memory is checked
+    # first, so each unique string goes over the wire at most once.
+    # Failed rows are numbered from first_row so they match the input file.
+    global duplicate_rows
+    unique_texts = list(dict.fromkeys(text for text in texts if has_text(text)))
+    duplicates = sum(has_text(text) for text in texts) - len(unique_texts)
+    duplicate_rows += duplicates
+
+    metrics.increment('rows', len(texts))
+    metrics.increment('duplicate_rows', duplicates)
+
+    known = {lang: {} for lang in params['to']}
+    if memory:
+        with metrics.stage('cache'):
+            for lang in params['to']:
+                known[lang] = memory.get_many(unique_texts, params['from'], lang, params['api-version'])
+    # a text is sent once with all targets if any of its languages is missing
+    pending = [text for text in unique_texts if any(text not in known[lang] for lang in params['to'])]
+
+    errors = {}
+    translated = {lang: {} for lang in params['to']}
+    for index, (text_translations, error) in send_texts(pending, loop, limiter).items():
+        text = pending[index]
+        if error:
+            errors[text] = error
+        for lang, translation in text_translations.items():
+            translated[lang][text] = translation
+    for lang in params['to']:
+        if memory:
+            with metrics.stage('cache'):
+                memory.put_many(translated[lang], params['from'], lang, params['api-version'])
+        known[lang].update(translated[lang])
+
+    translations = {
+        lang: [known[lang].get(text) if has_text(text) else None for text in texts]
+        for lang in params['to']
+    }
+    failures = []
+    for row, text in enumerate(texts):
+        if not has_text(text):
+            failures.append({'row': first_row + row, 'text': text, 'error': "empty cell, nothing to translate"})
+        elif text in errors:
+            failures.append({'row': first_row + row, 'text': text, 'error': errors[text]})
+
+    for failure in failures:
+        print(f"Row {failure['row']} not translated: {failure['error']}")
+    return translations, failures
+
+def load_checkpoint():
+    # Return the saved progress, or None when there is nothing to resume.
+    if not os.path.exists(checkpoint_file) or not os.path.exists(output_csv_file):
+        return None
+    with open(checkpoint_file, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != input_csv_file:
+        return None
+    return checkpoint
+
+def save_checkpoint(checkpoint):
+    # Write to a temporary file first so a crash never leaves a torn checkpoint
+    tmp_file = checkpoint_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, checkpoint_file)
+
+def truncate_file(file_path, size):
+    # Drop anything appended after the last checkpoint
+    if os.path.exists(file_path):
+        with open(file_path, 'r+b') as f:
+            f.truncate(size)
+
+def append_csv(frame, file_path, first_write):
+    # The header (and BOM) only goes at the top of the file
+    with metrics.stage('write'):
+        if first_write:
+            frame.to_csv(file_path, index=False, encoding='utf-8-sig')
+        else:
+            frame.to_csv(file_path, mode='a', header=False, index=False, encoding='utf-8')
+    return os.path.getsize(file_path)
+
+def translate_streaming(loop, limiter):
+    # Translate the input chunk by chunk, appending each finished chunk to the
+    # output and checkpointing so a rerun resumes at the first untranslated row.
+    checkpoint = load_checkpoint()
+    if checkpoint:
+        print(f"Resuming from row {checkpoint['rows_done']}")
+        truncate_file(output_csv_file, checkpoint['output_bytes'])
+        truncate_file(failures_csv_file, checkpoint['failures_bytes'])
+    else:
+        checkpoint = {'input': input_csv_file, 'rows_done': 0, 'output_bytes': 0, 'failures_bytes': 0}
+        for file_path in (output_csv_file, failures_csv_file):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    failed_rows = 0
+    chunk_start = 0
+    # dtype is fixed so a chunk of numeric-looking text isn't read as numbers
+    reader = pd.read_csv(input_csv_file, chunksize=chunk_rows, dtype={'text': str})
+    while True:
+        with metrics.stage('read'):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+
+        chunk_end = chunk_start + len(chunk)
+        if chunk_end <= checkpoint['rows_done']:
+            chunk_start = chunk_end
+            continue  # already translated in an earlier run
+        if chunk_start < checkpoint['rows_done']:
+            chunk = chunk.iloc[checkpoint['rows_done'] - chunk_start:]
+            chunk_start = checkpoint['rows_done']
+
+        translations, failures = translate_texts(chunk['text'].tolist(), chunk_start, loop, limiter)
+        for lang, column in languages.items():
+            chunk[column] = translations[lang]
+
+        checkpoint['output_bytes'] = append_csv(chunk, output_csv_file, checkpoint['output_bytes'] == 0)
+        if failures:
+            failed_rows += len(failures)
+            checkpoint['failures_bytes'] = append_csv(
+                pd.DataFrame(failures), failures_csv_file, checkpoint['failures_bytes'] == 0
+            )
+        checkpoint['rows_done'] = chunk_end
+        save_checkpoint(checkpoint)
+        print(f"Translated rows {chunk_start}-{chunk_end - 1}")
+        chunk_start = chunk_end
+
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    return failed_rows
+
+def translate_whole_file(loop, limiter):
+    # Translate the entire input in memory and write the output at the end.
+    with metrics.stage('read'):
+        df = pd.read_csv(input_csv_file, dtype={'text': str})
+    translations, failures = translate_texts(df['text'].tolist(), 0, loop, limiter)
+
+    # write translation, one column per target language
+    for lang, column in languages.items():
+        df[column] = translations[lang]
+    with metrics.stage('write'):
+        df.to_csv(output_csv_file, index=False, encoding='utf-8-sig')
+
+    if failures:
+        pd.DataFrame(failures).to_csv(failures_csv_file, index=False, encoding='utf-8-sig')
+    return len(failures)
+
+def main():
+    global constructed_url, headers, checkpoint_file, client, memory, duplicate_rows
+
+    # load credentials from .env
+    load_dotenv()
+
+    # per-stage timings and counters, exported when AZURE_AI_METRICS_FILE is set
+    setup_metrics('translate_csv')
+
+    translator_key_csv = os.getenv("AZURE_TRANSLATOR_CSV_KEY")
+    translator_endpoint_csv = os.getenv("AZURE_TRANSLATOR_CSV_ENDPOINT")
+    translator_region_csv = os.getenv("AZURE_TRANSLATOR_CSV_REGION")
+
+    if not translator_key_csv or not translator_endpoint_csv or not translator_region_csv:
+        raise ValueError("Missing Azure Translator CSV credentials in environment variables.")
+
+    constructed_url = translator_endpoint_csv + path
+
+    # the client adds Content-Type and a fresh X-ClientTraceId to every request
+    headers = {
+        'Ocp-Apim-Subscription-Key': translator_key_csv,
+        'Ocp-Apim-Subscription-Region': translator_region_csv
+    }
+    checkpoint_file = output_csv_file + checkpoint_suffix
+
+    # pooled keep-alive connections, one per request in flight
+    client = PooledClient(pool_size=max_in_flight, service='translator')
 
-# load input
-df = pd.read_csv(input_csv_file)
-texts = df['text'].tolist()
-translations_pt = []
+    # translation memory shared with azure_ai_translate.py
+    memory = TranslationMemory(translation_memory_file, translation_memory_max_entries) if use_translation_memory else None
+    duplicate_rows = 0
 
-# translate each text
-for text in texts:
-    body = [{'text': text}]
-    response = requests.post(constructed_url, params=params, headers=headers, json=body)
-    result = response.json()
+    # one event loop and limiter for the whole run, so the learned rate carries
+    # over from chunk to chunk
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    limiter = AdaptiveRateLimiter(initial_rate, min_rate, max_rate, rate_step)
 
     try:
-        pt_text = result[0]['translations'][0]['text']
-    except (IndexError, KeyError, TypeError):
-        pt_text = None
+        if stream_mode:
+            failed_rows = translate_streaming(loop, limiter)
+        else:
+            failed_rows = translate_whole_file(loop, limiter)
+    finally:
+        loop.close()
+        client.close()
 
-    translations_pt.append(pt_text)
-    time.sleep(0.1)  # add a delay to avoid API throttling
+    # report rows that could not be translated
+    if failed_rows:
+        print(f"{failed_rows} failed rows saved to {failures_csv_file}")
 
-# write translation
-df['Portuguese_BR'] = translations_pt
-df.to_csv(output_csv_file, index=False, encoding='utf-8-sig')
+    print(f"Duplicate rows collapsed: {duplicate_rows}")
+    if memory:
+        memory.report()
+        memory.close()
 
+    print(f"Translations saved to {output_csv_file}")
 
-print(f"Translations saved to {output_csv_file}")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+===============================================================================
+Program:      azure_ai_translation_memory.py
+Description:  On-disk translation memory shared by the Translator scripts.
+              Stores previously translated texts in SQLite so repeated text is
+              only sent to Azure Cognitive Services Translator API once.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+
+Workflow:
+  1. Open (or create) the SQLite database
+  2. Look up texts by a hash of (text, from, to, api-version)
+  3. Store new translations returned by the API
+  4. Evict the least recently used entries once the size cap is reached
+  5. Report hit/miss counts at the end of a run
+
+Usage:
+  - Imported by azure_ai_translate.py and azure_ai_translate_csv.py
+
+Notes:
+  - Delete the database file to clear the memory
+  - Only successful translations are stored, failures are retried next run
+
+Example:
+  memory = TranslationMemory('data/translation_memory.sqlite')
+  known = memory.get_many(texts, 'en', 'pt-BR', '3.0')
+  memory.put_many({'Hello': 'Olá'}, 'en', 'pt-BR', '3.0')
+  memory.report()
+  memory.close()
+===============================================================================
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# sqlite limits the number of parameters per statement
+lookup_chunk_size = 500
+
+
+class TranslationMemory:
+    """
+    SQLite-backed cache of translations with least-recently-used eviction.
+    """
+
+    def __init__(self, path, max_entries=1000000):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translation TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self.conn.commit()
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def make_key(text, from_lang, to_lang, api_version):
+        raw = json.dumps([text, from_lang, to_lang, api_version], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts, from_lang, to_lang, api_version):
+        # Return {text: translation} for the texts already in memory
+        keys = {self.make_key(text, from_lang, to_lang, api_version): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), lookup_chunk_size):
+            chunk = key_list[i:i + lookup_chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", chunk
+            )
+            for key, translation in rows:
+                found[keys[key]] = translation
+
+        # mark hits as recently used
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                [(now, self.make_key(text, from_lang, to_lang, api_version)) for text in found]
+            )
+            self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, text, from_lang, to_lang, api_version):
+        return self.get_many([text], from_lang, to_lang, api_version).get(text)
+
+    def put_many(self, translations, from_lang, to_lang, api_version):
+        # Store {text: translation} and evict old entries over the size cap
+        if not translations:
+            return
+        now = time.time()
+        cursor = self.conn.executemany(
+            "INSERT OR IGNORE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+            [
+                (self.make_key(text, from_lang, to_lang, api_version), translation, now)
+                for text, translation in translations.items()
+            ]
+        )
+        self.entries += max(cursor.rowcount, 0)
+        self.evict()
+        self.conn.commit()
+
+    def put(self, text, translation, from_lang, to_lang, api_version):
+        self.put_many({text: translation}, from_lang, to_lang, api_version)
+
+    def evict(self):
+        # Drop the least recently used entries beyond max_entries
+        excess = self.entries - self.max_entries
+        if excess <= 0:
+            return
+        self.conn.execute(
+            "DELETE FROM translations WHERE key IN "
+            "(SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self.entries = self.max_entries
+
+    def report(self):
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        print(
+            f"Translation memory: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.1f}% hit rate), {self.entries} entries in {self.path}"
+        )
+
+    def close(self):
+        self.conn.close()
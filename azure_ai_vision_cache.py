@@ -0,0 +1,234 @@
+"""
+===============================================================================
+Program:      azure_ai_vision_cache.py
+Description:  On-disk cache of Computer Vision analysis results for
+              azure_ai_comp_viz.py. Results are stored in SQLite by a hash
+              of the image content, so unchanged images are only analyzed
+              once, and optionally indexed by a perceptual hash (dHash) so
+              near-duplicates such as burst shots of the same size reuse a
+              neighbour's result.
+
+Author:       Murray Pung
+Date:         2025-06-03
+Version:      1.0.0
+
+Dependencies:
+  - Python 3.6+
+  - numpy
+  - pillow
+
+Workflow:
+  1. Open (or create) the SQLite database and load the perceptual hashes
+  2. Look up an image by the SHA-256 of its bytes and the requested features
+  3. On a miss, look for the cached image of the same width and height
+     with the closest dHash within max_distance bits
+  4. Store new analyses returned by the API with both hashes and the size
+  5. Report hits, near-duplicate hits and API calls saved at the end of a run
+
+Usage:
+  - Imported by azure_ai_comp_viz.py
+
+Notes:
+  - Delete the database file to clear the cache; a database written by an
+    older schema_version is cleared automatically
+  - Results are cached per set of visual features, so a run that asks for
+    more features never reuses a smaller analysis
+  - max_distance = 0 turns the near-duplicate index off; 4-6 bits of 64
+    matches re-saved or slightly shifted copies of the same shot
+  - Only images with the same pixel size are near-duplicates, since the
+    cached face and object boxes are in the image's own pixels
+  - Safe to share between worker threads
+
+Example:
+  cache = AnalysisCache('data/images/analysis/analysis_cache.sqlite', max_distance=5)
+  analysis, near_duplicate = cache.get(data, features)
+  if analysis is None:
+      analysis = analyze(data)
+      cache.put(data, features, analysis)
+  cache.report()
+  cache.close()
+===============================================================================
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+import numpy as np
+from PIL import Image
+from azure.cognitiveservices.vision.computervision.models import ImageAnalysis
+
+dhash_size = 8  # 8x8 gradient bits = 64-bit hash
+
+# bumped when stored analyses are no longer valid; older databases are
+# cleared on open (2: boxes are in the original image's coordinates,
+# 3: image size stored for the near-duplicate index)
+schema_version = 3
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint(data):
+    # (64-bit difference hash, (width, height)) of the image bytes, or None if
+    # Pillow cannot read them: each bit says whether a pixel is brighter than
+    # its right neighbour in a 9x8 grayscale thumbnail
+    try:
+        image = Image.open(io.BytesIO(data))
+        size = image.size
+        image.draft('L', (dhash_size * 4, dhash_size * 4))
+        pixels = np.asarray(image.convert('L').resize((dhash_size + 1, dhash_size), Image.BILINEAR), dtype=np.int16)
+    except (OSError, ValueError):
+        return None
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0]), size
+
+
+def to_signed(value):
+    # sqlite integers are signed 64-bit, dHashes are unsigned
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def features_key(features):
+    return ','.join(sorted(features))
+
+
+class AnalysisCache:
+    """
+    SQLite-backed cache of image analyses with a near-duplicate index.
+    """
+
+    def __init__(self, path, max_distance=0):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.max_distance = max_distance
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != schema_version:
+            self.conn.execute("DROP TABLE IF EXISTS analyses")
+            self.conn.execute(f"PRAGMA user_version = {schema_version}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " content_hash TEXT NOT NULL,"
+            " features TEXT NOT NULL,"
+            " dhash INTEGER,"
+            " width INTEGER,"
+            " height INTEGER,"
+            " analysis TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (content_hash, features))"
+        )
+        self.conn.commit()
+
+        # (features, width, height) -> (array of dHashes, matching content hashes, set of those)
+        self.near_index = {}
+        if max_distance > 0:
+            rows = self.conn.execute(
+                "SELECT features, dhash, width, height, content_hash FROM analyses WHERE dhash IS NOT NULL"
+            )
+            for features, value, width, height, key in rows:
+                self.index((features, width, height), value, key)
+
+    def index(self, group, value, key):
+        hashes, keys, indexed = self.near_index.setdefault(group, (array('Q'), [], set()))
+        if key in indexed:
+            return  # same content, same dHash; a replaced analysis needs no new entry
+        hashes.append(value & 0xFFFFFFFFFFFFFFFF)
+        keys.append(key)
+        indexed.add(key)
+
+    def nearest(self, group, value):
+        # Content hash of the closest indexed image within max_distance bits
+        hashes, keys, _ = self.near_index.get(group, (None, None, None))
+        if not keys:
+            return None
+        distances = np.unpackbits(
+            (np.frombuffer(hashes, dtype=np.uint64) ^ np.uint64(value)).view(np.uint8)
+        ).reshape(-1, 64).sum(axis=1)
+        best = int(np.argmin(distances))
+        return keys[best] if distances[best] <= self.max_distance else None
+
+    def load(self, key, features):
+        row = self.conn.execute(
+            "SELECT analysis FROM analyses WHERE content_hash = ? AND features = ?", (key, features)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute(
+            "UPDATE analyses SET last_used = ? WHERE content_hash = ? AND features = ?", (time.time(), key, features)
+        )
+        self.conn.commit()
+        return ImageAnalysis.deserialize(json.loads(row[0]))
+
+    def get(self, data, features):
+        # Return a cached analysis of these image bytes (or a near-duplicate)
+        # and whether it was a near-duplicate hit, or (None, False)
+        features = features_key(features)
+        key = content_hash(data)
+        with self.lock:
+            analysis = self.load(key, features)
+            if analysis is not None:
+                self.hits += 1
+                return analysis, False
+
+        if self.max_distance > 0:
+            found = fingerprint(data)
+            with self.lock:
+                neighbour = None
+                if found is not None:
+                    value, (width, height) = found
+                    neighbour = self.nearest((features, width, height), value)
+                analysis = self.load(neighbour, features) if neighbour else None
+                if analysis is not None:
+                    self.near_hits += 1
+                    return analysis, True
+
+        with self.lock:
+            self.misses += 1
+        return None, False
+
+    def put(self, data, features, analysis):
+        features = features_key(features)
+        key = content_hash(data)
+        # hashed again rather than kept from get(), so analyses that fail
+        # leave nothing behind
+        value, width, height = None, None, None
+        if self.max_distance > 0:
+            found = fingerprint(data)
+            if found is not None:
+                value, (width, height) = found
+        serialized = json.dumps(analysis.serialize(keep_readonly=True))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO analyses (content_hash, features, dhash, width, height, analysis, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, features, None if value is None else to_signed(value), width, height, serialized, time.time())
+            )
+            self.conn.commit()
+            if value is not None:
+                self.index((features, width, height), value, key)
+
+    def report(self):
+        lookups = self.hits + self.near_hits + self.misses
+        saved = self.hits + self.near_hits
+        hit_rate = (saved / lookups * 100) if lookups else 0.0
+        print(
+            f"Analysis cache: {self.hits} hits, {self.near_hits} near-duplicate hits, {self.misses} misses "
+            f"({hit_rate:.1f}% hit rate, {saved} API calls saved) in {self.path}"
+        )
+
+    def close(self):
+        self.conn.close()
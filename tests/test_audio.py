@@ -0,0 +1,85 @@
+import wave
+
+import numpy as np
+
+import azure_ai_audio as audio
+
+rate = audio.target_sample_rate
+
+
+def signal(*parts, seed=0):
+    # parts are (seconds, amplitude); speech is a tone over low background noise
+    rng = np.random.default_rng(seed)
+    pieces = []
+    for seconds, amplitude in parts:
+        n = int(seconds * rate)
+        piece = rng.normal(0, 30, n)
+        if amplitude:
+            piece += amplitude * np.sin(2 * np.pi * 220 * np.arange(n) / rate)
+        pieces.append(piece)
+    return np.clip(np.concatenate(pieces), -32768, 32767).astype('<i2').tobytes()
+
+
+def seconds(segments):
+    return [(round(start / rate, 2), round(end / rate, 2)) for start, end in segments]
+
+
+def test_silences_between_speech_are_left_out():
+    pcm = signal((2, 0), (1, 8000), (2, 0), (1, 8000), (1, 0))
+    segments = seconds(audio.detect_speech_segments(pcm))
+    assert len(segments) == 2
+    (start1, end1), (start2, end2) = segments
+    # each tone plus about vad_padding of context on either side
+    assert 1.65 <= start1 <= 2.0 and 3.0 <= end1 <= 3.35
+    assert 4.65 <= start2 <= 5.0 and 6.0 <= end2 <= 6.35
+
+
+def test_short_pauses_are_bridged_and_short_bursts_dropped():
+    pcm = signal((1, 0), (1, 8000), (0.3, 0), (1, 8000), (2, 0), (0.06, 8000), (2, 0))
+    assert len(audio.detect_speech_segments(pcm)) == 1
+
+
+def test_a_file_that_is_all_speech_is_kept_whole():
+    pcm = signal((5, 8000))
+    assert audio.detect_speech_segments(pcm) == [(0, 5 * rate)]
+
+
+def test_long_speech_is_split_into_bounded_segments():
+    pcm = signal((70, 8000))
+    segments = audio.detect_speech_segments(pcm)
+    assert len(segments) >= 3
+    assert all(end - start <= audio.vad_max_segment * rate for start, end in segments)
+    # contiguous, covering the whole file
+    assert segments[0][0] == 0 and segments[-1][1] == 70 * rate
+    assert all(a[1] == b[0] for a, b in zip(segments, segments[1:]))
+
+
+def test_silence_and_empty_input():
+    # background noise below vad_floor_db is never speech
+    assert audio.detect_speech_segments(signal((3, 0))) == []
+    assert audio.detect_speech_segments(b'') == []
+
+
+def write_wav(path, samples, sample_rate, channels):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype('<i2').tobytes())
+
+
+def test_target_format_is_copied_straight_out(tmp_path):
+    samples = (np.arange(rate) % 200 - 100).astype('<i2')
+    write_wav(tmp_path / 'mono.wav', samples, rate, 1)
+    assert audio.load_pcm16k(str(tmp_path / 'mono.wav')) == samples.tobytes()
+
+
+def test_stereo_44k_is_downmixed_and_resampled(tmp_path):
+    t = np.arange(44100 * 2) / 44100
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype('<i2')
+    write_wav(tmp_path / 'stereo.wav', np.repeat(tone, 2), 44100, 2)
+
+    pcm = np.frombuffer(audio.load_pcm16k(str(tmp_path / 'stereo.wav')), dtype='<i2')
+    assert abs(len(pcm) - 2 * rate) <= 1
+    # the tone survives at about the same level
+    assert 7000 < np.abs(pcm[1000:-1000]).max() < 9000
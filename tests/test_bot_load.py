@@ -0,0 +1,62 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import azure_ai_bot_load as bot_load
+from azure_ai_metrics import Metrics
+
+
+@pytest.fixture
+def run(tmp_path):
+    # Run bot-load against the mock with two-turn dialogues, return the summary
+    dialogues = tmp_path / 'dialogues.json'
+    dialogues.write_text(json.dumps([["Hi", "Bye"]]), encoding='utf-8')
+
+    def run(*argv):
+        output = tmp_path / 'summary.json'
+        bot_load.main([
+            '--mock', '--conversations', '6', '--concurrency', '3', '--think-time', '0',
+            '--latency', '0', '--seed', '1', '--dialogues', str(dialogues), '--json', str(output), *argv
+        ])
+        return json.loads(output.read_text(encoding='utf-8'))['results']
+    return run
+
+
+@pytest.mark.parametrize('mode', [[], ['--poll']], ids=['stream', 'poll'])
+def test_every_turn_gets_a_reply(run, mode):
+    summary = run('--bot-delay', '0.01', *mode)
+    assert (summary['completed'], summary['failed'], summary['turns']) == (6, 0, 12)
+    assert summary['timeout_rate'] == 0.0 and summary['error_rate'] == 0.0
+    assert summary['conversations_per_second'] == pytest.approx(6 / summary['wall_seconds'], rel=0.01)
+    assert 0 < summary['p50_ms'] <= summary['p99_ms'] <= summary['max_ms']
+
+
+def test_turns_without_a_reply_time_out(run):
+    summary = run('--bot-delay', '1', '--reply-timeout', '0.1')
+    assert (summary['completed'], summary['turns']) == (6, 12)
+    assert summary['timeout_rate'] == 1.0
+    assert summary['max_ms'] == 0.0
+
+
+def test_failed_requests_end_conversations(run):
+    summary = run('--error-rate', '1')
+    assert (summary['completed'], summary['failed'], summary['turns']) == (0, 6, 0)
+    assert summary['error_rate'] == 1.0
+    assert summary['conversations_per_second'] == 0.0
+
+
+def test_summarize():
+    stats = bot_load.LoadStats()
+    for seconds in (0.1, 0.2, None, 0.3):
+        stats.turn(seconds)
+    stats.conversation(True)
+    stats.conversation(False)
+    args = SimpleNamespace(conversations=2, concurrency=2)
+    summary = bot_load.summarize(stats, 2.0, args, Metrics('test'))
+    assert summary['conversations_per_second'] == 0.5
+    assert summary['turns_per_second'] == 2.0
+    assert summary['timeout_rate'] == 0.25
+    assert summary['error_rate'] == 0.5
+    assert summary['max_ms'] == 300.0
+    assert bot_load.summarize(bot_load.LoadStats(), 0, args, Metrics('test'))['conversations_per_second'] == 0.0
@@ -0,0 +1,92 @@
+from concurrent.futures import Future
+
+import pytest
+from PIL import Image
+
+import azure_ai_cli
+import azure_ai_comp_viz as comp_viz
+from azure_ai_mock_servers import MockState, start_in_background, tool_environment
+
+
+class RecordingExecutor:
+    # Runs nothing; every submitted analysis is already finished
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, filename, features):
+        self.submitted += 1
+        future = Future()
+        future.set_result((None, [filename]))
+        return future
+
+
+def run_vision(monkeypatch, argv):
+    # Apply the vision options without running the tool
+    for name in ('max_workers', 'feature_mode', 'detail_pass', 'link_mode'):
+        monkeypatch.setattr(comp_viz, name, getattr(comp_viz, name))
+    monkeypatch.setattr(comp_viz, 'main', lambda: None)
+    azure_ai_cli.main(['vision'] + argv)
+
+
+def test_workers_option_raises_the_pending_limit(monkeypatch):
+    run_vision(monkeypatch, ['--workers', '32'])
+    assert comp_viz.max_workers == 32
+
+    executor = RecordingExecutor()
+    results = comp_viz.analyze_in_order([f"{n}.jpg" for n in range(100)], executor, [])
+    next(results)
+    assert executor.submitted == 32 * comp_viz.pending_per_worker
+
+
+def test_options_not_given_keep_the_defaults(monkeypatch):
+    run_vision(monkeypatch, ['--link-mode', 'hardlink'])
+    assert comp_viz.link_mode == 'hardlink'
+    assert comp_viz.max_workers == 8
+    assert comp_viz.feature_mode == 'full'
+
+
+@pytest.fixture
+def vision_folder(tmp_path, monkeypatch):
+    # A folder of three images and the vision tool pointed at the mock server
+    state = MockState(latency=0.0, jitter=0.0, seed=1)
+    server, url = start_in_background(state)
+    for name, value in tool_environment(url).items():
+        monkeypatch.setenv(name, value)
+    for name in ('image_folder', 'analysis_folder', 'updated_images_folder', 'output_file',
+                 'detail_output_file', 'analysis_cache_file', 'use_analysis_cache',
+                 'max_workers', 'feature_mode', 'detail_pass', 'detail_patterns', 'link_mode'):
+        monkeypatch.setattr(comp_viz, name, getattr(comp_viz, name))
+    monkeypatch.setattr(comp_viz, 'use_analysis_cache', False)
+
+    for n, name in enumerate(['beach.jpg', 'beach_hero.jpg', 'street.jpg']):
+        Image.new('RGB', (80, 60), (n * 80, 100, 200)).save(tmp_path / name)
+
+    calls = []
+    process_image = comp_viz.process_image
+    def recording_process_image(filename, features):
+        calls.append((filename, features))
+        return process_image(filename, features)
+    monkeypatch.setattr(comp_viz, 'process_image', recording_process_image)
+
+    yield str(tmp_path), calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_detail_pass_only_reanalyzes_matching_images(vision_folder):
+    folder, calls = vision_folder
+    azure_ai_cli.main(['vision', '--image-folder', folder, '--feature-mode', 'rename',
+                       '--detail-pass', '--detail-patterns', '*_hero.jpg'])
+
+    full = [filename for filename, features in calls if features == comp_viz.full_features]
+    renamed = [filename for filename, features in calls if features == comp_viz.rename_features]
+    assert renamed == ['beach.jpg', 'beach_hero.jpg', 'street.jpg']
+    assert full == ['beach_hero.jpg']
+    with open(comp_viz.detail_output_file, encoding='utf-8') as f:
+        assert f.read().count("Processing image:") == 1
+
+
+def test_detail_pass_without_patterns_adds_no_calls(vision_folder):
+    folder, calls = vision_folder
+    azure_ai_cli.main(['vision', '--image-folder', folder, '--feature-mode', 'rename', '--detail-pass'])
+    assert len(calls) == 3
@@ -0,0 +1,109 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import azure_ai_comp_viz as comp_viz
+
+
+def test_names_get_the_next_free_suffix(tmp_path):
+    (tmp_path / "cat.jpg").touch()
+    (tmp_path / "cat_1.jpg").touch()
+    names = comp_viz.NameRegistry(tmp_path)
+    assert names.claim("dog.jpg") == "dog.jpg"
+    assert names.claim("cat.jpg") == "cat_2.jpg"
+    assert names.claim("cat.jpg") == "cat_3.jpg"
+    assert names.claim("dog.jpg") == "dog_1.jpg"
+
+
+def test_suffixed_names_are_taken_too(tmp_path):
+    names = comp_viz.NameRegistry(tmp_path)
+    assert names.claim("cat_1.jpg") == "cat_1.jpg"
+    assert names.claim("cat.jpg") == "cat.jpg"
+    assert names.claim("cat.jpg") == "cat_2.jpg"
+
+
+def test_registry_does_not_touch_the_folder_after_seeding(tmp_path):
+    names = comp_viz.NameRegistry(tmp_path)
+    (tmp_path / "cat.jpg").touch()
+    assert names.claim("cat.jpg") == "cat.jpg"
+
+
+def white_square_jpeg(orientation):
+    # 800x400 black image, white square at (100, 50)-(300, 150)
+    image = Image.new('RGB', (800, 400))
+    image.paste((255, 255, 255), (100, 50, 300, 150))
+    exif = Image.Exif()
+    exif[comp_viz.exif_orientation_tag] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('orientation', range(1, 9))
+def test_boxes_are_mapped_back_onto_the_original(monkeypatch, orientation):
+    monkeypatch.setattr(comp_viz, 'max_upload_dimension', 200)
+    data, transform = comp_viz.prepare_upload(white_square_jpeg(orientation))
+    assert transform is not None
+
+    upload = Image.open(io.BytesIO(data)).convert('L')
+    assert max(upload.size) == 200
+    left, top, right, bottom = upload.point(lambda value: 255 if value > 128 else 0).getbbox()
+    box = comp_viz.map_rectangle(left, top, right - left, bottom - top, transform)
+    assert box == pytest.approx((100, 50, 200, 100), abs=6)
+
+
+def test_small_images_are_sent_as_they_are():
+    original = white_square_jpeg(6)
+    assert comp_viz.prepare_upload(original) == (original, None)
+
+
+def test_elongated_images_keep_the_minimum_short_side(monkeypatch):
+    monkeypatch.setattr(comp_viz, 'max_upload_dimension', 2048)
+    image = Image.new('RGB', (8000, 60))
+    image.paste((255, 255, 255), (4000, 10, 4400, 50))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=95)
+
+    data, transform = comp_viz.prepare_upload(buffer.getvalue())
+    upload = Image.open(io.BytesIO(data))
+    assert min(upload.size) >= comp_viz.min_image_dimension
+    assert upload.size == (6667, 50)
+    assert comp_viz.map_rectangle(3333, 8, 333, 33, transform) == pytest.approx((4000, 10, 400, 40), abs=2)
+
+
+def test_results_come_in_input_order_with_bounded_pending(monkeypatch):
+    monkeypatch.setattr(comp_viz, 'max_workers', 4)
+    monkeypatch.setattr(comp_viz, 'pending_per_worker', 2)
+    started = []
+    finished = []
+
+    def process_image(filename, features):
+        # later images finish first
+        started.append(filename)
+        time.sleep(0.002 * (10 - int(filename) % 10))
+        finished.append(filename)
+        return None, [filename]
+
+    monkeypatch.setattr(comp_viz, 'process_image', process_image)
+    filenames = [str(n) for n in range(40)]
+    order = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        submit = executor.submit
+        submitted = []
+
+        def counting_submit(fn, *args):
+            # analyses submitted but not yet handed to the report
+            assert len(submitted) - len(order) < 4 * 2
+            submitted.append(fn)
+            return submit(fn, *args)
+
+        monkeypatch.setattr(executor, 'submit', counting_submit)
+        for filename, (_, lines) in comp_viz.analyze_in_order(filenames, executor, []):
+            order.append(filename)
+            assert lines == [filename]
+
+    assert order == filenames
+    assert finished != filenames
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+import requests
+
+import azure_ai_directline as directline
+from azure_ai_http import PooledClient
+from azure_ai_metrics import metrics
+from azure_ai_mock_servers import MockState, start_in_background
+
+
+@pytest.fixture
+def mock():
+    state = MockState(latency=0.0, jitter=0.0, bot_delay=0.05, seed=1)
+    server, url = start_in_background(state)
+    yield state, f"{url}/v3/directline"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    client = PooledClient(pool_size=2, service='directline')
+    yield client
+    client.close()
+
+
+def open_conversation(client, endpoint, use_websocket):
+    conversation = directline.DirectLineConversation(client, endpoint, 'mock-secret', use_websocket=use_websocket)
+    conversation.start()
+    assert conversation.streaming == use_websocket
+    return conversation
+
+
+@pytest.mark.parametrize('use_websocket', [True, False])
+def test_replies_arrive(mock, client, use_websocket):
+    _, endpoint = mock
+    conversation = open_conversation(client, endpoint, use_websocket)
+    activity_id = conversation.send("hello")
+    replies = list(conversation.replies(activity_id, timeout=5, quiet=0.2))
+    conversation.close()
+
+    assert [reply["text"] for reply in replies] == ["You said: hello"]
+    assert replies[0]["replyToId"] == activity_id
+    assert conversation.inbox == []
+
+
+@pytest.mark.parametrize('use_websocket', [True, False])
+def test_late_replies_come_with_the_next_call(mock, client, use_websocket):
+    state, endpoint = mock
+    state.bot_delay = 0.4
+    conversation = open_conversation(client, endpoint, use_websocket)
+    first = conversation.send("one")
+    assert list(conversation.replies(first, timeout=0.1)) == []
+
+    late = metrics.counters.get('late_replies', 0)
+    second = conversation.send("two")
+    replies = list(conversation.replies(second, timeout=5, quiet=0.2))
+    conversation.close()
+
+    assert [reply["text"] for reply in replies] == ["You said: one", "You said: two"]
+    assert not conversation.is_reply(replies[0], second)
+    assert conversation.is_reply(replies[1], second)
+    assert metrics.counters.get('late_replies', 0) == late + 1
+
+
+def test_stopping_early_keeps_the_rest_for_the_next_call(mock, client):
+    _, endpoint = mock
+    conversation = open_conversation(client, endpoint, False)
+    first = conversation.send("one")
+    second = conversation.send("two")
+    time.sleep(0.2)
+
+    for reply in conversation.replies(first, timeout=5, quiet=0.2):
+        break
+    assert reply["text"] == "You said: one"
+    assert [activity["text"] for activity in conversation.inbox if conversation.is_bot_message(activity)] == ["You said: two"]
+    assert [reply["text"] for reply in conversation.replies(second, timeout=5, quiet=0.2)] == ["You said: two"]
+    conversation.close()
+
+
+def test_seen_ids_are_bounded(monkeypatch, client):
+    monkeypatch.setattr(directline, 'seen_window', 3)
+    conversation = directline.DirectLineConversation(client, 'http://unused', 'mock-secret')
+    activities = [{"id": str(n), "type": "message"} for n in range(10)]
+    assert conversation.receive(activities, 10) == 10
+    assert conversation.receive(activities[-3:], 10) == 0
+    assert conversation.seen == {"7", "8", "9"}
+    assert len(conversation.seen_order) == 3
+
+
+def test_conversation_create_is_not_retried_after_a_timeout(mock):
+    state, endpoint = mock
+    state.latency = 0.5
+    client = PooledClient(pool_size=1, max_retries=3, timeout=0.1, service='directline')
+    conversation = directline.DirectLineConversation(client, endpoint, 'mock-secret')
+    with pytest.raises(requests.Timeout):
+        conversation.start()
+    client.close()
+
+    # the mock has opened the conversation by the time it answers
+    time.sleep(0.6)
+    assert len(state.conversations) == 1
@@ -0,0 +1,130 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import azure_ai_http
+from azure_ai_http import PooledClient
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    # Answers each request with the next (status, headers) in script;
+    # a status of None drops the connection without answering
+    script = []
+    received = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_request(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.received.append((self.command, self.headers.get('X-ClientTraceId')))
+        status, headers = self.script.pop(0) if self.script else (200, {})
+        if status is None:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_GET = do_POST = handle_request
+
+
+@pytest.fixture
+def server():
+    handler = type('Handler', (ScriptedHandler,), {'script': [], 'received': []})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(azure_ai_http.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+@pytest.fixture
+def client():
+    client = PooledClient(pool_size=1, max_retries=3, backoff=0.5, max_backoff=4.0)
+    yield client
+    client.close()
+
+
+def test_retries_with_backoff_until_success(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(503, {}), (500, {}), (200, {})]
+    assert client.get(url).status_code == 200
+    assert len(handler.received) == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+    # the retries share the first attempt's trace id
+    assert len({trace for _, trace in handler.received}) == 1
+
+
+def test_gives_up_after_max_retries(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(504, {})] * 10
+    assert client.get(url).status_code == 504
+    assert len(handler.received) == 4
+
+
+def test_retry_after_is_honoured(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(429, {'Retry-After': '7'}), (200, {})]
+    assert client.get(url).status_code == 200
+    assert sleeps == [7.0]
+
+
+def test_other_errors_are_not_retried(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(400, {})]
+    assert client.get(url).status_code == 400
+    assert len(handler.received) == 1 and sleeps == []
+
+
+def test_non_idempotent_post_is_not_resent_after_a_server_error(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(504, {})] * 10
+    assert client.post(url, json={}, idempotent=False).status_code == 504
+    assert len(handler.received) == 1
+
+
+def test_non_idempotent_post_is_retried_when_throttled(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(429, {'Retry-After': '1'}), (200, {})]
+    assert client.post(url, json={}, idempotent=False).status_code == 200
+    assert len(handler.received) == 2
+
+
+def test_dropped_connection(server, sleeps, client):
+    handler, url = server
+    handler.script[:] = [(None, {}), (200, {})]
+    assert client.post(url, json={}).status_code == 200
+    assert len(handler.received) == 2
+
+    handler.script[:] = [(None, {}), (200, {})]
+    with pytest.raises(requests.ConnectionError):
+        client.post(url, json={}, idempotent=False)
+    assert len(handler.received) == 3
+
+
+def test_non_idempotent_post_is_retried_when_the_connection_cannot_open(sleeps, client):
+    # nothing listens on a port that was just released
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    with pytest.raises(requests.ConnectionError):
+        client.post(f"http://127.0.0.1:{port}/", json={}, idempotent=False)
+    assert len(sleeps) == 3
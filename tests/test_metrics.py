@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from azure_ai_metrics import Metrics
+
+
+def test_overlapping_exports_leave_a_whole_file(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    metrics = Metrics('test')
+    metrics.increment('requests', 3)
+
+    errors = []
+
+    def export_many():
+        try:
+            for _ in range(50):
+                metrics.export(path)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=export_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['counters'] == {'requests': 3}
+    assert os.listdir(tmp_path) == ['metrics.json']
+
+
+def test_stop_waits_for_the_export_thread(tmp_path):
+    metrics = Metrics('test')
+    metrics.start_interval_export(str(tmp_path / 'metrics.prom'), 0.001)
+    _, thread = metrics.exporter
+    metrics.stop_interval_export()
+    assert not thread.is_alive()
+    assert metrics.exporter is None
+
+
+def test_final_export_at_exit_follows_interval_exports(tmp_path):
+    # a run that exits while the interval exporter is busy
+    path = tmp_path / 'metrics.json'
+    script = (
+        "from azure_ai_metrics import setup\n"
+        "import time\n"
+        "metrics = setup('test')\n"
+        "for _ in range(200):\n"
+        "    metrics.increment('requests')\n"
+        "    time.sleep(0.001)\n"
+    )
+    env = dict(os.environ, AZURE_AI_METRICS_FILE=str(path), AZURE_AI_METRICS_INTERVAL='0.001')
+    subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert json.loads(path.read_text(encoding='utf-8'))['counters'] == {'requests': 200}
+    assert os.listdir(tmp_path) == ['metrics.json']
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from azure_ai_translate_csv import AdaptiveRateLimiter, parse_retry_after
+
+
+def test_throttling_halves_the_rate_down_to_the_floor():
+    limiter = AdaptiveRateLimiter(8.0, min_rate=1.5, max_rate=20.0, step=0.5)
+    limiter.throttled(0)
+    assert limiter.rate == 4.0
+    limiter.throttled(0)
+    limiter.throttled(0)
+    assert limiter.rate == 1.5
+
+
+def test_successes_grow_the_rate_up_to_the_ceiling():
+    limiter = AdaptiveRateLimiter(9.0, min_rate=1.0, max_rate=10.0, step=0.5)
+    limiter.succeeded()
+    assert limiter.rate == 9.5
+    for _ in range(5):
+        limiter.succeeded()
+    assert limiter.rate == 10.0
+
+
+def test_acquire_spaces_requests_at_the_rate():
+    async def run():
+        limiter = AdaptiveRateLimiter(20.0, min_rate=1.0, max_rate=20.0, step=0.0)
+        started = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    # the first token is available at once, the next three 50 ms apart
+    assert 0.13 <= asyncio.run(run()) < 0.5
+
+
+def test_acquire_waits_out_retry_after():
+    async def run():
+        limiter = AdaptiveRateLimiter(1000.0, min_rate=1.0, max_rate=1000.0, step=0.0)
+        await limiter.acquire()
+        limiter.throttled(0.2)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3', 10) == 3.0
+    assert parse_retry_after('-1', 10) == 0.0
+    assert parse_retry_after(None, 10) == 10
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT', 10) == 10
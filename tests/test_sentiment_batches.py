@@ -0,0 +1,101 @@
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from azure.ai.textanalytics import AnalyzeSentimentResult, DocumentError, SentimentConfidenceScores, TextAnalyticsError
+
+import azure_ai_social_comments as tool
+
+
+def score(document):
+    # 'good' chunks are positive, 'bad' ones negative, 'broken' ones fail
+    text = document['text']
+    if 'broken' in text:
+        return DocumentError(id=document['id'], error=TextAnalyticsError(code='InvalidDocument', message='broken'))
+    positive = 1.0 if 'good' in text else 0.0
+    negative = 1.0 if 'bad' in text else 0.0
+    return AnalyzeSentimentResult(
+        id=document['id'], sentiment='positive' if positive else 'negative' if negative else 'neutral',
+        sentences=[], is_error=False,
+        confidence_scores=SentimentConfidenceScores(positive=positive, neutral=1 - positive - negative, negative=negative),
+    )
+
+
+class FakeClient:
+    # Scores documents locally and answers in a shuffled order, as ids are
+    # what the results are matched by
+    def __init__(self):
+        self.batches = []
+        self.random = random.Random(1)
+
+    def analyze_sentiment(self, documents):
+        self.batches.append([document['text'] for document in documents])
+        results = [score(document) for document in documents]
+        self.random.shuffle(results)
+        return results
+
+
+class FakeAsyncClient(FakeClient):
+    def __init__(self, endpoint=None, credential=None):
+        super().__init__()
+        FakeAsyncClient.last = self
+
+    async def analyze_sentiment(self, documents):
+        await asyncio.sleep(0)
+        return FakeClient.analyze_sentiment(self, documents)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+# each sentence is a chunk; files span batch boundaries with batch_size 3
+files = {
+    'comment_a.txt': "This part is good. This part is good too.",
+    'comment_b.txt': "Everything here is bad.",
+    'comment_c.txt': "Good start is good. But then it got broken. And more good.",
+    'comment_d.txt': "A bad day overall. Bad bad bad.",
+}
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(tool, 'max_document_chars', 30)
+    monkeypatch.setattr(tool, 'batch_size', 3)
+    monkeypatch.setattr(tool, 'sink', None)
+    monkeypatch.setattr(tool, 'lexicon_prefilter', False)
+
+
+def test_chunk_results_go_back_to_their_files(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(tool, 'client', client)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        monkeypatch.setattr(tool, 'executor', executor)
+        results = tool.analyze_files(list(files.items()))
+
+    assert [len(batch) for batch in client.batches] == [3, 3, 2]
+    assert [result.is_error for result in results] == [False, False, True, False]
+    assert [result.sentiment for result in results if not result.is_error] == ['positive', 'negative', 'negative']
+    assert results[2].error.message == 'broken'
+
+
+def test_async_results_go_back_to_their_files(tmp_path, monkeypatch):
+    for name, text in files.items():
+        (tmp_path / name).write_text(text, encoding='utf-8')
+    output_dir = tmp_path / 'output'
+    output_dir.mkdir()
+    monkeypatch.setattr(tool, 'output_dir', str(output_dir))
+    monkeypatch.setattr(tool, 'AsyncTextAnalyticsClient', FakeAsyncClient)
+
+    paths = [str(tmp_path / name) for name in sorted(files)]
+    asyncio.run(tool.analyze_all_async(paths, 'https://example', None))
+
+    assert [len(batch) for batch in FakeAsyncClient.last.batches] == [3, 3, 2]
+    outputs = {path.name: path.read_text(encoding='utf-8') for path in output_dir.iterdir()}
+    assert "Overall Sentiment: positive" in outputs['sentiment_a.txt']
+    assert "Overall Sentiment: negative" in outputs['sentiment_b.txt']
+    assert outputs['sentiment_c.txt'] == "Error processing comment_c.txt:\nbroken\n"
+    assert "Overall Sentiment: negative" in outputs['sentiment_d.txt']
@@ -0,0 +1,62 @@
+import pytest
+from azure.ai.textanalytics import AnalyzeSentimentResult, DocumentError, SentimentConfidenceScores
+
+import azure_ai_social_comments as tool
+
+
+@pytest.fixture(autouse=True)
+def small_documents(monkeypatch):
+    monkeypatch.setattr(tool, 'max_document_chars', 50)
+
+
+def result(sentiment, positive, neutral, negative):
+    return AnalyzeSentimentResult(
+        id='0', sentiment=sentiment, sentences=[], is_error=False,
+        confidence_scores=SentimentConfidenceScores(positive=positive, neutral=neutral, negative=negative),
+    )
+
+
+def test_short_text_is_one_chunk():
+    assert tool.chunk_text("Short and sweet.") == ["Short and sweet."]
+
+
+def test_chunks_break_at_sentence_boundaries():
+    sentences = ["This is sentence number %d." % i for i in range(6)]
+    chunks = tool.chunk_text(' '.join(sentences))
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert ' '.join(chunks) == ' '.join(sentences)
+    assert all(chunk.endswith('.') for chunk in chunks)
+
+
+def test_a_sentence_over_the_limit_is_cut_at_spaces():
+    text = ' '.join(['word'] * 40)
+    chunks = tool.chunk_text(text)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert ' '.join(chunks) == text
+
+
+def test_a_single_chunk_result_is_returned_as_it_is():
+    response = result('positive', 0.9, 0.05, 0.05)
+    assert tool.combine_results([(response, 10)]) is response
+
+
+def test_scores_are_weighted_by_chunk_length():
+    combined = tool.combine_results([(result('positive', 1.0, 0.0, 0.0), 300), (result('neutral', 0.0, 1.0, 0.0), 100)])
+    assert combined.confidence_scores.positive == pytest.approx(0.75)
+    assert combined.confidence_scores.neutral == pytest.approx(0.25)
+    assert combined.sentiment == 'positive'
+
+
+def test_a_short_negative_aside_does_not_make_the_file_mixed():
+    combined = tool.combine_results([(result('positive', 0.9, 0.05, 0.05), 5000), (result('negative', 0.05, 0.05, 0.9), 100)])
+    assert combined.sentiment == 'positive'
+
+
+def test_substantial_positive_and_negative_parts_are_mixed():
+    combined = tool.combine_results([(result('positive', 0.9, 0.05, 0.05), 300), (result('negative', 0.05, 0.05, 0.9), 200)])
+    assert combined.sentiment == 'mixed'
+
+
+def test_an_error_in_any_chunk_is_the_file_result():
+    error = DocumentError(id='0', error=None)
+    assert tool.combine_results([(result('positive', 1.0, 0.0, 0.0), 10), (error, 10)]) is error
@@ -0,0 +1,62 @@
+import pytest
+
+import azure_ai_sentiment_lexicon as lexicon
+
+
+@pytest.mark.parametrize('text, label', [
+    ("I love this, it is great!", 'positive'),
+    ("Terrible service, I hate it", 'negative'),
+    ("The store opens at nine.", 'neutral'),
+    ("not good", 'negative'),
+    ("The food was great but the service was awful", 'negative'),
+])
+def test_labels(text, label):
+    assert lexicon.classify(text)[0] == label
+
+
+def test_scores_add_up_to_one_and_confidence_is_their_margin():
+    label, confidence, scores = lexicon.classify("Really good, I love it")
+    assert sum(scores.values()) == pytest.approx(1, abs=1e-3)
+    assert confidence == pytest.approx(scores['positive'] - scores['negative'])
+
+
+def test_negation_is_weaker_than_the_opposite_word():
+    assert lexicon.classify("not good")[1] < lexicon.classify("bad")[1]
+
+
+def test_intensifiers_and_exclamations_raise_confidence():
+    plain = lexicon.classify("good")[1]
+    assert lexicon.classify("very good")[1] > plain
+    assert lexicon.classify("good!!")[1] > plain
+
+
+def test_a_single_mild_word_is_not_confident():
+    assert lexicon.classify("good")[1] < 0.8
+
+
+def test_long_comments_are_left_to_the_service():
+    assert lexicon.classify("great " * 100) == ('neutral', 0.0, {'positive': 0.0, 'neutral': 1.0, 'negative': 0.0})
+
+
+def test_calibration_bands():
+    rows = [('positive', 0.95, 'positive'), ('positive', 0.92, 'negative'), ('negative', 0.55, 'negative')]
+    bands = {band['threshold']: band for band in lexicon.calibration_bands(rows)}
+    assert bands[0.9]['compared'] == 2
+    assert bands[0.9]['agreement'] == 0.5
+    assert bands[0.9]['local_share'] == pytest.approx(2 / 3)
+    assert bands[0.5]['agreement_above'] == pytest.approx(2 / 3)
+    assert bands[0.0]['local_share'] == 1.0
+    assert bands[0.3]['agreement'] is None
+
+
+def test_sampled_rows_above_the_threshold_are_weighted_up():
+    # 2 sampled comments above the threshold at a 10% rate stand for 20;
+    # the 10 below it were all compared
+    rows = [('positive', 0.95, 'positive'), ('positive', 0.9, 'negative')]
+    rows += [('negative', 0.4, 'negative')] * 10
+    bands = {band['threshold']: band for band in lexicon.calibration_bands(rows, threshold=0.8, sample_rate=0.1)}
+    assert bands[0.9]['compared'] == 2
+    assert bands[0.9]['local_share'] == pytest.approx(20 / 30)
+    assert bands[0.0]['local_share'] == 1.0
+    assert bands[0.4]['agreement_above'] == pytest.approx(20 / 30)
+    assert bands[0.9]['agreement'] == 0.5
@@ -0,0 +1,121 @@
+import json
+
+import pyarrow.parquet as pq
+import pytest
+from azure.ai.textanalytics import AnalyzeSentimentResult, DocumentError, SentimentConfidenceScores, TextAnalyticsError
+
+import azure_ai_social_comments as tool
+
+
+def result(sentiment, positive, neutral, negative):
+    return AnalyzeSentimentResult(
+        id='0', sentiment=sentiment, sentences=[], is_error=False,
+        confidence_scores=SentimentConfidenceScores(positive=positive, neutral=neutral, negative=negative),
+    )
+
+
+def error(message):
+    return DocumentError(id='0', error=TextAnalyticsError(code='InvalidDocument', message=message))
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def fill(sink):
+    sink.add('in/comment_1.txt', result('positive', 0.8, 0.1, 0.1))
+    sink.add('in/comment_2.txt', result('positive', 0.6, 0.3, 0.1))
+    sink.add('in/comment_3.txt', result('negative', 0.1, 0.1, 0.8))
+    sink.add('in/comment_4.txt', error('Document text is empty.'))
+
+
+def test_jsonl_records_and_rollup(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    sink = tool.ResultSink(path, 'jsonl')
+    fill(sink)
+    # every record is on disk as soon as it is added
+    assert len(read_jsonl(path)) == 4
+    sink.close()
+
+    records = read_jsonl(path)
+    assert records[0] == {'file': 'comment_1.txt', 'sentiment': 'positive', 'positive': 0.8,
+                          'neutral': 0.1, 'negative': 0.1, 'error': None}
+    assert records[3]['error'] == 'Document text is empty.'
+
+    rollup = sink.rollup()
+    assert f"Results: 4 records written to {path} in this run" in rollup
+    assert "positive: 2 (66.7%)" in rollup
+    assert "errors  : 1" in rollup
+    assert "Positive: 0.50" in rollup
+
+
+def test_jsonl_is_appended_to_across_runs(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    for _ in range(2):
+        sink = tool.ResultSink(path, 'jsonl')
+        fill(sink)
+        sink.close()
+    assert len(read_jsonl(path)) == 8
+    assert sink.rollup().startswith(f"Results: 4 records")
+
+    sink = tool.ResultSink(path, 'jsonl', append=False)
+    sink.close()
+    assert read_jsonl(path) == []
+
+
+def test_a_torn_last_record_is_dropped_on_reopen(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text('{"file": "comment_1.txt"}\n{"file": "comm', encoding='utf-8')
+    sink = tool.ResultSink(str(path), 'jsonl')
+    sink.add('in/comment_2.txt', result('neutral', 0.1, 0.8, 0.1))
+    sink.close()
+    assert [record['file'] for record in read_jsonl(path)] == ['comment_1.txt', 'comment_2.txt']
+
+
+@pytest.mark.parametrize('content', [b'', b'{"file": "x"', b'{"file": "x"}\n'])
+def test_drop_partial_line(tmp_path, content):
+    path = tmp_path / 'results.jsonl'
+    path.write_bytes(content)
+    tool.drop_partial_line(str(path))
+    assert path.read_bytes() == content[:content.rfind(b'\n') + 1]
+
+
+def test_parquet_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool, 'parquet_row_group', 3)
+    path = str(tmp_path / 'results.parquet')
+    sink = tool.ResultSink(path, 'parquet')
+    fill(sink)
+    sink.close()
+
+    table = pq.read_table(path)
+    assert pq.ParquetFile(path).num_row_groups == 2
+    assert table.column('file').to_pylist() == [f"comment_{n}.txt" for n in range(1, 5)]
+    assert table.column('sentiment').to_pylist() == ['positive', 'positive', 'negative', None]
+
+
+class FakeClient:
+    def __init__(self, endpoint=None, credential=None):
+        pass
+
+    def analyze_sentiment(self, documents):
+        return [result('positive', 0.9, 0.05, 0.05) for _ in documents]
+
+
+def test_sink_mode_does_not_create_the_output_folder(tmp_path, monkeypatch):
+    (tmp_path / 'input').mkdir()
+    (tmp_path / 'input' / 'comment_1.txt').write_text("Lovely.", encoding='utf-8')
+    monkeypatch.setenv('AZURE_TEXTANALYTICS_ENDPOINT', 'https://example')
+    monkeypatch.setenv('AZURE_TEXTANALYTICS_KEY', 'key')
+    monkeypatch.setattr(tool, 'TextAnalyticsClient', FakeClient)
+    monkeypatch.setattr(tool, 'async_mode', False)
+    monkeypatch.setattr(tool, 'input_dir', str(tmp_path / 'input'))
+    monkeypatch.setattr(tool, 'output_dir', str(tmp_path / 'output'))
+    monkeypatch.setattr(tool, 'output_mode', 'jsonl')
+    monkeypatch.setattr(tool, 'results_file', str(tmp_path / 'results' / 'sentiment'))
+    for name in ('sink', 'client', 'executor', 'batch_size'):
+        monkeypatch.setattr(tool, name, getattr(tool, name))
+
+    tool.main()
+    assert not (tmp_path / 'output').exists()
+    assert [record['file'] for record in read_jsonl(tmp_path / 'results' / 'sentiment.jsonl')] == ['comment_1.txt']
@@ -0,0 +1,35 @@
+import struct
+
+import pytest
+
+import azure_ai_speech as speech
+
+
+def wav_header(format_tag=1, channels=1, rate=16000, bits=16, data_size=32000):
+    fmt = struct.pack('<HHIIHH', format_tag, channels, rate, rate * channels * bits // 8, channels * bits // 8, bits)
+    return (b'RIFF' + struct.pack('<I', 36 + data_size) + b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            + b'data' + struct.pack('<I', data_size))
+
+
+@pytest.fixture
+def folders(tmp_path, monkeypatch):
+    (tmp_path / 'audio').mkdir()
+    (tmp_path / 'out').mkdir()
+    monkeypatch.setattr(speech, 'audio_folder', str(tmp_path / 'audio'))
+    monkeypatch.setattr(speech, 'transcriptions_folder', str(tmp_path / 'out'))
+    monkeypatch.setattr(speech, 'decode_once', True)
+    return tmp_path
+
+
+@pytest.mark.parametrize('content', [
+    b'',                                   # empty file
+    b'RIFF\x10\x00\x00\x00WAVEfmt ',       # cut off in the header
+    wav_header(format_tag=2) + bytes(64),  # ADPCM, not decoded here
+], ids=['empty', 'truncated', 'unsupported'])
+def test_undecodable_files_get_the_failure_marker(folders, content):
+    (folders / 'audio' / 'call.wav').write_bytes(content)
+    for lang_code, lang_name in speech.languages.items():
+        speech.transcribe_file('call.wav', lang_code, lang_name)
+        assert (folders / 'out' / f'call.{lang_name}.txt').read_text() == "[Speech recognition failed]"
+    assert speech.decoded_audio == {}
@@ -0,0 +1,44 @@
+import pytest
+
+import azure_ai_translate as translate
+from azure_ai_http import PooledClient
+from azure_ai_mock_servers import MockState, start_in_background
+from azure_ai_translation_memory import TranslationMemory
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # translate() pointed at the mock server with a fresh translation memory
+    state = MockState(latency=0.0, jitter=0.0)
+    server, url = start_in_background(state)
+    client = PooledClient(pool_size=1, service='translator')
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite'))
+    monkeypatch.setattr(translate, 'constructed_url', url + translate.path)
+    monkeypatch.setattr(translate, 'headers', {'Ocp-Apim-Subscription-Key': 'mock-key'})
+    monkeypatch.setattr(translate, 'client', client)
+    monkeypatch.setattr(translate, 'memory', memory)
+    yield state
+    memory.close()
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def texts(result):
+    return [(item['to'], item['text']) for item in result[0]['translations']]
+
+
+def test_repeated_calls_reuse_the_client_and_memory(service, capsys):
+    first = translate.translate("good morning", ['fr', 'zu'])
+    second = translate.translate("good morning", ['zu', 'fr'])
+    assert texts(first) == [('fr', '[fr] good morning'), ('zu', '[zu] good morning')]
+    assert texts(second) == [('zu', '[zu] good morning'), ('fr', '[fr] good morning')]
+    assert len(service.take_timings()) == 1
+    assert capsys.readouterr().out == ''
+
+
+def test_only_missing_languages_are_requested(service):
+    translate.translate("good morning", ['fr'])
+    result = translate.translate("good morning", ['fr', 'de'])
+    assert texts(result) == [('fr', '[fr] good morning'), ('de', '[de] good morning')]
+    assert len(service.take_timings()) == 2
@@ -0,0 +1,41 @@
+import azure_ai_translate_csv as tool
+
+
+def rows(batches):
+    return [[row for row, _ in batch] for batch in batches]
+
+
+def test_batches_stop_at_the_element_limit():
+    batches = list(tool.build_batches(['a'] * 5, max_elements=2, max_chars=100))
+    assert rows(batches) == [[0, 1], [2, 3], [4]]
+
+
+def test_batches_stop_at_the_character_limit():
+    batches = list(tool.build_batches(['aaaa', 'bbbb', 'cc', 'd'], max_elements=10, max_chars=8))
+    assert rows(batches) == [[0, 1], [2, 3]]
+    assert all(sum(len(text) for _, text in batch) <= 8 for batch in batches)
+
+
+def test_text_longer_than_the_limit_gets_its_own_batch():
+    batches = list(tool.build_batches(['a' * 20, 'b'], max_elements=10, max_chars=8))
+    assert rows(batches) == [[0], [1]]
+
+
+def test_character_budget_is_shared_by_the_target_languages(monkeypatch):
+    monkeypatch.setattr(tool, 'params', dict(tool.params, to=['pt-BR', 'fr']))
+    monkeypatch.setattr(tool, 'max_batch_chars', 10)
+    # 10 characters for two languages leaves 5 per text
+    batches = list(tool.build_batches(['aaa', 'bbb', 'ccc'], max_elements=10))
+    assert rows(batches) == [[0], [1], [2]]
+
+
+def test_rows_without_text_are_skipped_but_keep_their_numbers():
+    batches = list(tool.build_batches(['a', float('nan'), None, 'b'], max_elements=10, max_chars=100))
+    assert batches == [[(0, 'a'), (3, 'b')]]
+
+
+def test_parse_translations_reports_missing_languages(monkeypatch):
+    monkeypatch.setattr(tool, 'params', dict(tool.params, to=['pt-BR', 'fr']))
+    translations, error = tool.parse_translations({'translations': [{'text': 'olá'}]})
+    assert translations == {'pt-BR': 'olá'}
+    assert error == "no translation returned for fr"
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+import azure_ai_translate_csv as tool
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    input_file = tmp_path / 'input.csv'
+    pd.DataFrame({'text': [f"row {i}" for i in range(6)]}).to_csv(input_file, index=False)
+    output_file = str(tmp_path / 'output.csv')
+    monkeypatch.setattr(tool, 'input_csv_file', str(input_file))
+    monkeypatch.setattr(tool, 'output_csv_file', output_file)
+    monkeypatch.setattr(tool, 'failures_csv_file', str(tmp_path / 'failures.csv'))
+    monkeypatch.setattr(tool, 'checkpoint_file', output_file + tool.checkpoint_suffix)
+    monkeypatch.setattr(tool, 'chunk_rows', 2)
+    return output_file
+
+
+def fake_translator(calls, fail_at=None):
+    def translate_texts(texts, first_row, loop, limiter):
+        calls.append(first_row)
+        if first_row == fail_at:
+            raise RuntimeError("connection lost")
+        return {lang: [text.upper() for text in texts] for lang in tool.params['to']}, []
+    return translate_texts
+
+
+def test_rerun_resumes_after_the_last_checkpoint(files, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tool, 'translate_texts', fake_translator(calls, fail_at=4))
+    with pytest.raises(RuntimeError):
+        tool.translate_streaming(None, None)
+    assert calls == [0, 2, 4]
+    assert tool.load_checkpoint()['rows_done'] == 4
+
+    calls.clear()
+    monkeypatch.setattr(tool, 'translate_texts', fake_translator(calls))
+    assert tool.translate_streaming(None, None) == 0
+    assert calls == [4]
+
+    output = pd.read_csv(files, encoding='utf-8-sig')
+    assert output['text'].tolist() == [f"row {i}" for i in range(6)]
+    assert output['Portuguese_BR'].tolist() == [f"ROW {i}" for i in range(6)]
+    assert not os.path.exists(tool.checkpoint_file)
+
+
+def test_output_written_after_the_checkpoint_is_dropped(files, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tool, 'translate_texts', fake_translator(calls, fail_at=4))
+    with pytest.raises(RuntimeError):
+        tool.translate_streaming(None, None)
+    # a chunk appended before the crash, but never checkpointed
+    with open(files, 'a', encoding='utf-8') as f:
+        f.write("row 4,ROW 4\n")
+
+    monkeypatch.setattr(tool, 'translate_texts', fake_translator(calls))
+    tool.translate_streaming(None, None)
+    assert pd.read_csv(files, encoding='utf-8-sig')['text'].tolist() == [f"row {i}" for i in range(6)]
+
+
+def test_checkpoint_for_another_input_is_ignored(files, monkeypatch):
+    tool.save_checkpoint({'input': 'other.csv', 'rows_done': 4, 'output_bytes': 10, 'failures_bytes': 0})
+    open(files, 'w').close()
+    assert tool.load_checkpoint() is None
+
+
+def test_truncate_file(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'header\nrow 1\nrow 2\n')
+    tool.truncate_file(str(path), len(b'header\nrow 1\n'))
+    assert path.read_bytes() == b'header\nrow 1\n'
+    tool.truncate_file(str(tmp_path / 'missing.csv'), 0)
+
+
+def fake_send_texts(texts, loop, limiter):
+    return {index: ({lang: f"{text}!" for lang in tool.params['to']}, None) for index, text in enumerate(texts)}
+
+
+def test_numeric_looking_chunks_are_translated_like_the_whole_file(files, monkeypatch):
+    # the second chunk of two rows only holds numbers, the last has an empty cell
+    pd.DataFrame({'text': ['hello', 'world', '12345', '2024', 'again', None]}).to_csv(tool.input_csv_file, index=False)
+    monkeypatch.setattr(tool, 'send_texts', fake_send_texts)
+    monkeypatch.setattr(tool, 'memory', None)
+
+    assert tool.translate_streaming(None, None) == 1
+    streamed = pd.read_csv(files, encoding='utf-8-sig', dtype=str)
+    streamed_failures = pd.read_csv(tool.failures_csv_file, encoding='utf-8-sig')
+
+    assert tool.translate_whole_file(None, None) == 1
+    whole = pd.read_csv(files, encoding='utf-8-sig', dtype=str)
+
+    assert streamed['Portuguese_BR'].tolist()[:5] == ['hello!', 'world!', '12345!', '2024!', 'again!']
+    assert streamed.equals(whole)
+    assert streamed_failures['row'].tolist() == [5]
@@ -0,0 +1,57 @@
+import itertools
+
+import pytest
+
+import azure_ai_translation_memory
+from azure_ai_translation_memory import TranslationMemory
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # a strictly increasing clock, so least recently used is unambiguous
+    ticks = itertools.count(1)
+    monkeypatch.setattr(azure_ai_translation_memory.time, 'time', lambda: float(next(ticks)))
+
+
+def test_round_trip_is_keyed_by_language_and_api_version(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite'))
+    memory.put('hello', 'bonjour', 'en', 'fr', '3.0')
+    assert memory.get('hello', 'en', 'fr', '3.0') == 'bonjour'
+    assert memory.get('hello', 'en', 'de', '3.0') is None
+    assert memory.get('hello', 'en', 'fr', '4.0') is None
+    assert (memory.hits, memory.misses) == (1, 2)
+    memory.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite'), max_entries=2)
+    memory.put('one', 'um', 'en', 'pt', '3.0')
+    memory.put('two', 'dois', 'en', 'pt', '3.0')
+    memory.get('one', 'en', 'pt', '3.0')  # 'two' is now the oldest
+    memory.put('three', 'três', 'en', 'pt', '3.0')
+
+    assert memory.entries == 2
+    assert memory.get_many(['one', 'two', 'three'], 'en', 'pt', '3.0') == {'one': 'um', 'three': 'três'}
+    memory.close()
+
+
+def test_existing_entries_are_not_counted_twice(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite'), max_entries=2)
+    memory.put_many({'one': 'um', 'two': 'dois'}, 'en', 'pt', '3.0')
+    memory.put_many({'one': 'um', 'two': 'dois'}, 'en', 'pt', '3.0')
+    assert memory.entries == 2
+    assert len(memory.get_many(['one', 'two'], 'en', 'pt', '3.0')) == 2
+    memory.close()
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / 'memory.sqlite')
+    memory = TranslationMemory(path)
+    memory.put_many({f"text {i}": f"texte {i}" for i in range(1200)}, 'en', 'fr', '3.0')
+    memory.close()
+
+    memory = TranslationMemory(path)
+    assert memory.entries == 1200
+    # more keys than one lookup statement takes
+    assert len(memory.get_many([f"text {i}" for i in range(1200)], 'en', 'fr', '3.0')) == 1200
+    memory.close()
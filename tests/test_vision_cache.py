@@ -0,0 +1,123 @@
+import io
+import sqlite3
+
+import pytest
+from PIL import Image
+from azure.cognitiveservices.vision.computervision.models import ImageAnalysis, ImageCaption, ImageDescriptionDetails
+
+import azure_ai_vision_cache as vision_cache
+
+features = ['Description', 'Tags']
+
+
+def gradient_jpeg(quality=90, flip=False, size=(256, 128)):
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    if flip:
+        image = image.transpose(Image.ROTATE_90)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def analysis(caption):
+    return ImageAnalysis(description=ImageDescriptionDetails(captions=[ImageCaption(text=caption, confidence=0.9)]))
+
+
+def caption(result):
+    return result.description.captions[0].text
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = vision_cache.AnalysisCache(str(tmp_path / 'cache.sqlite'), max_distance=5)
+    yield cache
+    cache.close()
+
+
+def test_exact_hit(cache):
+    data = gradient_jpeg()
+    assert cache.get(data, features) == (None, False)
+    cache.put(data, features, analysis('a gradient'))
+    result, near_duplicate = cache.get(data, features)
+    assert caption(result) == 'a gradient' and not near_duplicate
+    assert (cache.hits, cache.near_hits, cache.misses) == (1, 0, 1)
+
+
+def test_near_duplicate_hit(cache):
+    cache.put(gradient_jpeg(quality=90), features, analysis('a gradient'))
+    copy = gradient_jpeg(quality=60)
+    assert vision_cache.content_hash(copy) != vision_cache.content_hash(gradient_jpeg(quality=90))
+    result, near_duplicate = cache.get(copy, features)
+    assert caption(result) == 'a gradient' and near_duplicate
+
+
+def test_different_image_misses(cache):
+    cache.put(gradient_jpeg(), features, analysis('a gradient'))
+    assert cache.get(gradient_jpeg(flip=True), features) == (None, False)
+
+
+def test_near_duplicates_must_have_the_same_size(cache):
+    # the boxes of a cached analysis are in that image's pixels
+    cache.put(gradient_jpeg(size=(256, 128)), features, analysis('a gradient'))
+    resized = gradient_jpeg(size=(512, 256))
+    assert vision_cache.fingerprint(resized)[0] == vision_cache.fingerprint(gradient_jpeg())[0]
+    assert cache.get(resized, features) == (None, False)
+
+
+def test_misses_keep_no_state_until_put(cache):
+    data = gradient_jpeg()
+    cache.get(data, features)
+    assert cache.near_index == {}
+    cache.put(data, features, analysis('a gradient'))
+    assert list(cache.near_index) == [(vision_cache.features_key(features), 256, 128)]
+
+
+def test_near_duplicates_are_off_with_max_distance_zero(tmp_path):
+    cache = vision_cache.AnalysisCache(str(tmp_path / 'cache.sqlite'))
+    cache.put(gradient_jpeg(quality=90), features, analysis('a gradient'))
+    assert cache.get(gradient_jpeg(quality=60), features) == (None, False)
+    cache.close()
+
+
+def test_results_are_kept_per_feature_set(cache):
+    data = gradient_jpeg()
+    cache.put(data, ['Description'], analysis('a gradient'))
+    assert cache.get(data, features) == (None, False)
+    assert caption(cache.get(data, ['Description'])[0]) == 'a gradient'
+
+
+def test_re_put_replaces_without_a_second_index_entry(cache):
+    data = gradient_jpeg()
+    cache.put(data, features, analysis('first'))
+    cache.put(data, features, analysis('second'))
+    _, keys, _ = cache.near_index[(vision_cache.features_key(features), 256, 128)]
+    assert keys == [vision_cache.content_hash(data)]
+    assert caption(cache.get(data, features)[0]) == 'second'
+
+
+def test_index_is_reloaded_on_open(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = vision_cache.AnalysisCache(path, max_distance=5)
+    cache.put(gradient_jpeg(quality=90), features, analysis('a gradient'))
+    cache.close()
+
+    cache = vision_cache.AnalysisCache(path, max_distance=5)
+    result, near_duplicate = cache.get(gradient_jpeg(quality=60), features)
+    assert caption(result) == 'a gradient' and near_duplicate
+    cache.close()
+
+
+def test_older_schema_is_cleared(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = vision_cache.AnalysisCache(path)
+    data = gradient_jpeg()
+    cache.put(data, features, analysis('a gradient'))
+    cache.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA user_version = {vision_cache.schema_version - 1}")
+    conn.close()
+
+    cache = vision_cache.AnalysisCache(path)
+    assert cache.get(data, features) == (None, False)
+    cache.close()